@@ -3,6 +3,7 @@ import logging
 from PyQt6.QtGui import QFont, QFontDatabase, QIcon
 from PyQt6.QtWidgets import QApplication
 
+from src.nimocr.logger import setup_logging
 from src.nimocr.model import ImageListModel
 from src.nimocr.presenter import Presenter
 from src.nimocr.view import MainWindow
@@ -20,7 +21,7 @@ def main() -> None:
     )
     # Set default application fonts
     all_registered_fonts = QFontDatabase.families()
-    logging.info(f"Registered fonts: {all_registered_fonts}")
+    logging.info("Registered fonts: %s", all_registered_fonts)
     app.setFont(QFont("IBM Plex Sans Thai", 12))
     app.setWindowIcon(QIcon("assets/logo.png"))
 
@@ -32,14 +33,11 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    format = "%(filename)s - %(levelname)s - %(funcName)s - %(message)s"
-    logging.basicConfig(
-        filename="user.log",
-        level=logging.INFO,
-        format=format,
-        filemode="w",
-        encoding="utf-8",
-    )
+    # Write the logs from a background thread into a rotating file.
+    listener = setup_logging("user.log", level=logging.INFO)
     logging.info("Logger initialized with INFO level")
 
-    main()
+    try:
+        main()
+    finally:
+        listener.stop()
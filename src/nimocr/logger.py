@@ -0,0 +1,51 @@
+import logging
+import os.path as op
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = "%(filename)s - %(levelname)s - %(funcName)s - %(message)s"
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves the formatting to the listener thread.
+
+    The standard QueueHandler formats the message before queueing it, which puts
+    the string work back on the calling thread. The records are only consumed
+    in-process, so the arguments can be passed along as they are.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Return the record without formatting it."""
+        return record
+
+
+def setup_logging(
+    filename: str = "user.log",
+    level: int = logging.INFO,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 3,
+) -> QueueListener:
+    """
+    Send every log record through a queue to a background thread that writes the
+    rotating log file. Each session starts a new file and keeps the previous ones
+    as backups. Return the listener, which must be stopped to flush the queue.
+    """
+    file_handler = RotatingFileHandler(
+        filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    if op.exists(filename) and op.getsize(filename) > 0:
+        file_handler.doRollover()
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(DeferredQueueHandler(log_queue))
+
+    listener.start()
+    return listener
@@ -1,5 +1,14 @@
 from .file_handler import FileHandler
 from .image_handler import ImageHandler
 from .image_list import ImageListModel
+from .pager import Pager
+from .path_validator import PathValidator, ValidationReport
 
-__all__ = ["ImageListModel", "ImageHandler", "FileHandler"]
+__all__ = [
+    "ImageListModel",
+    "ImageHandler",
+    "FileHandler",
+    "Pager",
+    "PathValidator",
+    "ValidationReport",
+]
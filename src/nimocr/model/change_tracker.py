@@ -0,0 +1,109 @@
+import numpy as np
+
+# Flags of a changed row
+TEXT_CHANGED = 1
+ROTATED = 2
+DELETED = 4
+
+
+class ChangeTracker:
+    """Rows changed since the label file was loaded, with their original values.
+
+    One byte of flags is kept per row, so finding the changed rows is a single
+    scan of a compact array, and the original text and rotation are only kept
+    for the rows that were changed. A row whose text or rotation is set back to
+    its original value is no longer changed. A rotation baked into the image
+    file is kept apart, so the row stays rotated from its original rotation.
+
+    Attributes:
+    ----------
+    flags: np.ndarray
+        The TEXT_CHANGED, ROTATED and DELETED flags of each row.
+    original_texts: dict[int, str]
+        The text of each edited row when the label file was loaded.
+    original_orientations: dict[int, int]
+        The rotation of each rotated row when the label file was loaded.
+    baked_orientations: dict[int, int]
+        The rotation written into the image file of each baked row.
+    """
+
+    def __init__(self, total: int) -> None:
+        """Initialize the tracker of total rows without changes."""
+        self.flags = np.zeros(total, dtype=np.uint8)
+        self.original_texts: dict[int, str] = {}
+        self.original_orientations: dict[int, int] = {}
+        self.baked_orientations: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        """Return the number of changed rows."""
+        return int(np.count_nonzero(self.flags))
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the flags and the original texts."""
+        texts = sum(len(text) for text in self.original_texts.values())
+        return self.flags.nbytes + texts
+
+    def _set_flag(self, index: int, flag: int, is_set: bool) -> None:
+        """Set or clear the flag of the row."""
+        if is_set:
+            self.flags[index] |= flag
+        else:
+            self.flags[index] &= ~np.uint8(flag)
+
+    def set_original(
+        self, index: int, text: str, orientation: int, baked: int = 0
+    ) -> None:
+        """
+        Set the text and rotation of the row when the label file was loaded and
+        the rotation baked since, as kept by a previous session. The flags are
+        then set with the current values.
+        """
+        self.original_texts[index] = text
+        self.original_orientations[index] = orientation
+        if baked:
+            self.baked_orientations[index] = baked
+
+    def set_text(self, index: int, text: str, current: str) -> None:
+        """Record that the text of the row changes from current to text."""
+        original = self.original_texts.setdefault(index, current)
+        self._set_flag(index, TEXT_CHANGED, text != original)
+
+    def set_orientation(self, index: int, orientation: int, current: int) -> None:
+        """Record that the rotation of the row changes from current."""
+        original = self.original_orientations.setdefault(
+            index, self.get_total_orientation(index, current)
+        )
+        total = self.get_total_orientation(index, orientation)
+        self._set_flag(index, ROTATED, total != original)
+
+    def bake_orientation(self, index: int, current: int) -> None:
+        """
+        Record that the current rotation of the row is written into its image
+        file. The rotation of the row is then set to zero with set_orientation.
+        """
+        self.original_orientations.setdefault(
+            index, self.get_total_orientation(index, current)
+        )
+        baked = self.baked_orientations.get(index, 0) + current
+        self.baked_orientations[index] = baked % 360
+
+    def set_deleted(self, index: int, is_deleted: bool) -> None:
+        """Record that the row is deleted or restored."""
+        self._set_flag(index, DELETED, is_deleted)
+
+    def get_changed(self, flags: int = TEXT_CHANGED | ROTATED | DELETED) -> np.ndarray:
+        """Return the sorted indices of the rows with one of the flags."""
+        return np.flatnonzero(self.flags & flags)
+
+    def get_original_text(self, index: int, current: str) -> str:
+        """Return the text of the row when the label file was loaded."""
+        return self.original_texts.get(index, current)
+
+    def get_original_orientation(self, index: int, current: int) -> int:
+        """Return the rotation of the row when the label file was loaded."""
+        return self.original_orientations.get(index, current)
+
+    def get_total_orientation(self, index: int, current: int) -> int:
+        """Return the rotation of the row from its original image file."""
+        return (current + self.baked_orientations.get(index, 0)) % 360
@@ -0,0 +1,79 @@
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# A command is a tuple of the operation code of the journal, the row index and,
+# for the text and rotation, the value before and after the edit.
+Command = tuple
+
+
+class EditHistory:
+    """Undo and redo stacks of the edits of the rows.
+
+    A command only keeps what is needed to revert it, the row index and the
+    value before and after the edit, so the history never copies the rows. The
+    undo stack keeps the last max_commands commands and drops the oldest one
+    past that, so the memory stays bounded over a long session. Pushing a new
+    command clears the redo stack.
+
+    Attributes:
+    ----------
+    max_commands: int
+        The number of commands that can be undone.
+    """
+
+    DEFAULT_MAX_COMMANDS = 10_000
+
+    def __init__(self, max_commands: int = DEFAULT_MAX_COMMANDS) -> None:
+        """Initialize the history."""
+        self.max_commands = max_commands
+        self._undo: deque[Command] = deque(maxlen=max_commands)
+        self._redo: list[Command] = []
+        self._paused = False
+
+    @property
+    def can_undo(self) -> bool:
+        """Return whether a command can be undone."""
+        return bool(self._undo)
+
+    @property
+    def can_redo(self) -> bool:
+        """Return whether an undone command can be redone."""
+        return bool(self._redo)
+
+    def push(self, command: Command) -> None:
+        """Record a command, unless the history is applying one."""
+        if self._paused:
+            return
+        self._undo.append(command)
+        self._redo.clear()
+
+    def undo(self) -> Optional[Command]:
+        """Return the last command to revert, or None if there is none."""
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        self._redo.append(command)
+        return command
+
+    def redo(self) -> Optional[Command]:
+        """Return the last undone command to apply again, or None."""
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        self._undo.append(command)
+        return command
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """Do not record the commands applied by undo and redo."""
+        self._paused = True
+        try:
+            yield
+        finally:
+            self._paused = False
+
+    def clear(self) -> None:
+        """Forget every command."""
+        self._undo.clear()
+        self._redo.clear()
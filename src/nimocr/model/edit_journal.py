@@ -0,0 +1,234 @@
+import logging
+import os
+import os.path as op
+import time
+from typing import BinaryIO, Optional
+
+from .label_format import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Operation codes of the records
+TEXT = "t"
+DELETE = "d"
+RESTORE = "r"
+ORIENTATION = "o"
+
+
+class EditJournal:
+    """Append-only journal of the edits of a label file, for crash recovery.
+
+    Each edit is appended as one short JSON line next to the label file, so an
+    edit costs a few bytes on disk instead of a copy of the label file. The
+    file is synced in batches, either after SYNC_RECORDS records or when a
+    record comes SYNC_SECONDS after the last sync. The first line identifies
+    the version of the label file the row indices refer to, and a journal of
+    another version is moved aside instead of replayed.
+
+    The journal keeps the net effect of its records, which is also what is
+    replayed when the label file is opened again. Once the journal holds many
+    more records than net edits, it is compacted into a new base that only
+    holds the net edits.
+
+    Attributes:
+    ----------
+    path: str
+        The path of the journal.
+    header: dict
+        The description of the label file version, written on the first line.
+    texts: dict[int, str]
+        The edited text by row index.
+    orientations: dict[int, int]
+        The rotation by row index.
+    deleted: set[int]
+        The indices of the deleted rows.
+    records: int
+        The number of records in the journal.
+    """
+
+    VERSION = 1
+    SYNC_RECORDS = 256
+    SYNC_SECONDS = 1.0
+    # Number of records from which the journal may be compacted
+    COMPACT_RECORDS = 10_000
+
+    def __init__(self, path: str, header: dict) -> None:
+        """Initialize the journal."""
+        self.path = path
+        self.header = {"version": EditJournal.VERSION, **header}
+        self.texts: dict[int, str] = {}
+        self.orientations: dict[int, int] = {}
+        self.deleted: set[int] = set()
+        self.records = 0
+        self._file: Optional[BinaryIO] = None
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    @staticmethod
+    def get_path(label_path: str) -> str:
+        """Return the path of the journal of a label file."""
+        return f"{label_path}.journal"
+
+    @staticmethod
+    def make_header(label_path: str, rows: int, column_names: list[str]) -> dict:
+        """
+        Return the header of the current version of a label file, with the
+        number of rows and the working column names the records refer to.
+        """
+        stat = os.stat(label_path)
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "rows": rows,
+            "columns": column_names,
+        }
+
+    @property
+    def is_empty(self) -> bool:
+        """Return whether the journal holds no edit."""
+        return not (self.texts or self.orientations or self.deleted)
+
+    def open(self) -> None:
+        """Read the records of a previous session and open the journal."""
+        if op.exists(self.path):
+            self._read()
+        self._file = open(self.path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(dumps(self.header) + b"\n")
+            self.sync()
+
+    def _read(self) -> None:
+        """Replay the records of the journal, dropping a truncated last record."""
+        end = 0
+        with open(self.path, "rb") as f:
+            header_line = f.readline()
+            try:
+                header = loads(header_line)
+            except ValueError:
+                header = None
+            if header != self.header:
+                f.close()
+                self._move_aside()
+                return
+            end = f.tell()
+            for line in f:
+                try:
+                    # A record cut by a crash has no newline or is invalid.
+                    record = loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    record = None
+                if not self._apply(record):
+                    logger.warning("Drop the journal of %s after %s", self.path, end)
+                    break
+                end += len(line)
+        if end < op.getsize(self.path):
+            os.truncate(self.path, end)
+        logger.info("Replayed %d records of %s", self.records, self.path)
+
+    def _move_aside(self) -> None:
+        """Keep the journal of another version of the label file aside."""
+        stale_path = f"{self.path}.stale"
+        logger.warning(
+            "The label file changed since %s was written, moved to %s",
+            self.path,
+            stale_path,
+        )
+        os.replace(self.path, stale_path)
+
+    def _apply(self, record) -> bool:
+        """Fold the record into the edits. Return whether it is valid."""
+        if not isinstance(record, list) or len(record) < 2:
+            return False
+        operation, row = record[0], record[1]
+        if not isinstance(row, int) or not 0 <= row < self.header["rows"]:
+            return False
+        if operation == TEXT and len(record) == 3:
+            self.texts[row] = record[2]
+        elif operation == ORIENTATION and len(record) == 3:
+            self.orientations[row] = record[2]
+        elif operation == DELETE:
+            self.deleted.add(row)
+        elif operation == RESTORE:
+            self.deleted.discard(row)
+        else:
+            return False
+        self.records += 1
+        return True
+
+    def append(self, operation: str, row: int, *values) -> None:
+        """Append a record, syncing the journal if the batch is complete."""
+        record = [operation, int(row), *values]
+        self._apply(record)
+        self._file.write(dumps(record) + b"\n")
+        self._pending += 1
+        if (
+            self._pending >= EditJournal.SYNC_RECORDS
+            or time.monotonic() - self._synced_at >= EditJournal.SYNC_SECONDS
+        ):
+            self.sync()
+
+    def sync(self) -> None:
+        """Write the pending records to the disk."""
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    def get_records(self) -> list[list]:
+        """Return the records of the net edits."""
+        records = [[TEXT, row, text] for row, text in sorted(self.texts.items())]
+        records += [
+            [ORIENTATION, row, orientation]
+            for row, orientation in sorted(self.orientations.items())
+        ]
+        records += [[DELETE, row] for row in sorted(self.deleted)]
+        return records
+
+    def should_compact(self) -> bool:
+        """Return whether most of the records are overwritten by later ones."""
+        edits = len(self.texts) + len(self.orientations) + len(self.deleted)
+        return self.records >= EditJournal.COMPACT_RECORDS and self.records > 2 * edits
+
+    def compact(self) -> None:
+        """Replace the journal with a new base holding only the net edits."""
+        records = self.get_records()
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(dumps(self.header) + b"\n")
+                for record in records:
+                    f.write(dumps(record) + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.close()
+            os.replace(temp_path, self.path)
+        finally:
+            if op.exists(temp_path):
+                os.remove(temp_path)
+            if self._file is None:
+                self._file = open(self.path, "ab")
+        logger.info("Compacted %d records into %d", self.records, len(records))
+        self.records = len(records)
+
+    def rebase(self, header: dict, records: list[list]) -> None:
+        """
+        Start the journal over for a new version of the label file, holding
+        only the records of the edits that are not in that version.
+        """
+        self.header = {"version": EditJournal.VERSION, **header}
+        self.texts.clear()
+        self.orientations.clear()
+        self.deleted.clear()
+        self.records = 0
+        for record in records:
+            self._apply(record)
+        self.compact()
+
+    def close(self) -> None:
+        """Sync and close the journal."""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
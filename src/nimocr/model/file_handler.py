@@ -1,16 +1,44 @@
+import os
 import os.path as op
+import shutil
+from contextlib import closing, contextmanager
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Iterable, Iterator, Optional, Union
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
+from .label_database import DATABASE_EXTENSIONS, LabelDatabase
+from .label_format import (
+    FORMATS,
+    DelimitedFormat,
+    LabelFormat,
+    detect_compression,
+    get_format,
+    has_module,
+    open_label_file,
+    sniff_format,
+    split_compression,
+)
+from .label_index import LabelIndex
+from .row_store import PathColumn, StringColumn
+
 
 class FileHandler:
+    # Number of rows parsed between two progress reports
+    CHUNK_SIZE = 100_000
+    # Number of rows read to show the columns of a label file
+    SAMPLE_ROWS = 100
+
     def __init__(self) -> None:
         """Initialize the model."""
         self.path: Optional[str] = None
+        # The file the rows of the label file are read from, a copy of the label
+        # file once it is saved over
+        self.source_path: Optional[str] = None
         self.extension: Optional[str] = None
+        self.label_format: Optional[LabelFormat] = None
 
     @staticmethod
     def get_basename(path: str) -> str:
@@ -22,60 +50,502 @@ class FileHandler:
     @staticmethod
     def get_delimiter(extension: str) -> str:
         """Return the delimiter of the file."""
-        if extension == "csv":
-            return ","
-        elif extension == "tsv":
-            return "\t"
-        else:
-            raise ValueError(f"Unknown extension: {extension}")
+        label_format = get_format(extension)
+        if not isinstance(label_format, DelimitedFormat):
+            raise ValueError(f"Extension {extension} has no delimiter.")
+        return label_format.delimiter
 
     @staticmethod
     def get_quotechar(extension: str) -> str:
         """Return the quotechar of the file."""
-        if extension == "csv":
-            return '"'
-        elif extension == "tsv":
-            return ""
-        else:
-            raise ValueError(f"Unknown extension: {extension}")
+        label_format = get_format(extension)
+        if not isinstance(label_format, DelimitedFormat):
+            raise ValueError(f"Extension {extension} has no quotechar.")
+        return label_format.quotechar
 
     @staticmethod
     def get_extension(path: str) -> str:
-        """Return the extension of the file."""
-        return path.split(".")[-1]
+        """Return the extension of the file, without the compression suffix."""
+        stem, _ = split_compression(path)
+        return stem.split(".")[-1]
+
+    @staticmethod
+    def get_label_format(path: str) -> LabelFormat:
+        """Return the format of the extension or of the content of the file."""
+        extension = FileHandler.get_extension(path).lower()
+        if extension in FORMATS:
+            return FORMATS[extension]
+        return sniff_format(path)
+
+    @staticmethod
+    def can_index(path: str) -> bool:
+        """Return whether the rows of the file can be read on demand."""
+        if LabelDatabase.is_database(path):
+            return True
+        label_format = FileHandler.get_label_format(path)
+        is_delimited = isinstance(label_format, DelimitedFormat)
+        return is_delimited and detect_compression(path) is None
+
+    def set_path(self, path: str) -> None:
+        """Set the label file that is read and saved."""
+        self.remove_source_copy()
+        self.path = path
+        self.source_path = path
+        self.extension = FileHandler.get_extension(path)
+        if LabelDatabase.is_database(path):
+            # The rows of a database are read and edited in place.
+            self.label_format = None
+        else:
+            self.label_format = FileHandler.get_label_format(path)
+
+    @staticmethod
+    def read_header(path: str, nrows: int = SAMPLE_ROWS) -> DataFrame:
+        """Return the first rows of the label file to show its columns."""
+        if LabelDatabase.is_database(path):
+            return LabelDatabase.read_header(path, nrows)
+        label_format = FileHandler.get_label_format(path)
+        with open_label_file(path) as (_, stream):
+            return label_format.read_header(stream, nrows)
 
-    def load(self, path: str) -> DataFrame:
-        """Load the label file and return the dataframe."""
+    def load(
+        self,
+        path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        usecols: Optional[list[str]] = None,
+        dtype: Optional[dict[str, type]] = None,
+    ) -> DataFrame:
+        """
+        Load the label file and return the dataframe. Only the usecols are
+        parsed if given. If a progress callback is given, the file is parsed in
+        chunks and the callback receives the number of bytes read and the file
+        size after each chunk. The callback may raise to abort the load. A
+        database is only read on demand with index.
+        """
+        if LabelDatabase.is_database(path):
+            raise ValueError(f"The rows of the database {path} are read on demand.")
+        label_format = FileHandler.get_label_format(path)
+        df = FileHandler._read(path, label_format, progress_callback, usecols, dtype)
+        # The label file only changes once it is read, so a failed or aborted
+        # load keeps the previous one.
+        self.remove_source_copy()
         self.path = path
+        self.source_path = path
         self.extension = FileHandler.get_extension(path)
-        delimiter = FileHandler.get_delimiter(self.extension)
-        df = pd.read_csv(path, sep=delimiter)
+        self.label_format = label_format
         return df
 
-    def normalize_path(self, df: DataFrame, path_column_name: str) -> DataFrame:
-        """Normalize the path to be relative to the label file."""
-        df[path_column_name] = df[path_column_name].apply(
-            lambda x: op.normpath(op.join(op.dirname(self.path), x))
+    @classmethod
+    def _read(
+        cls,
+        path: str,
+        label_format: LabelFormat,
+        progress_callback: Optional[Callable[[int, int], None]],
+        usecols: Optional[list[str]],
+        dtype: Optional[dict[str, type]],
+    ) -> DataFrame:
+        """Read the label file in the format, reporting the progress."""
+        if progress_callback is None:
+            with open_label_file(path) as (_, stream):
+                return label_format.read(stream, usecols, dtype)
+
+        total_bytes = op.getsize(path)
+        progress_callback(0, total_bytes)
+        with open_label_file(path) as (raw, stream):
+            if usecols is not None and has_module("pyarrow"):
+                # The multithreaded parsers are faster but cannot read in chunks.
+                df = label_format.read(stream, usecols, dtype)
+                progress_callback(total_bytes, total_bytes)
+                return df
+
+            chunks = []
+            for chunk in label_format.read_chunks(
+                stream, cls.CHUNK_SIZE, usecols, dtype
+            ):
+                chunks.append(chunk)
+                # The compressed bytes read tell the progress of any format.
+                progress_callback(raw.tell(), total_bytes)
+        df = pd.concat(chunks, ignore_index=True)
+        progress_callback(total_bytes, total_bytes)
+        return df
+
+    def index(
+        self,
+        path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> Union[LabelIndex, LabelDatabase]:
+        """
+        Return the byte offset index of the label file, to read its rows on
+        demand instead of loading it. Only uncompressed delimited files can be
+        indexed, and a database is opened as it is. The progress callback
+        receives the number of bytes scanned and the file size, and may raise
+        to abort. The label file of the handler is left unchanged, it is set
+        with set_path once the index is used.
+        """
+        if LabelDatabase.is_database(path):
+            return LabelDatabase.open(path)
+        if not FileHandler.can_index(path):
+            raise ValueError(f"The rows of {path} cannot be read on demand.")
+        columns = tuple(FileHandler.read_header(path, nrows=0).columns)
+        label_format = FileHandler.get_label_format(path)
+        return LabelIndex.build(
+            path,
+            label_format.delimiter,
+            columns,
+            progress_callback,
+            label_format.quotechar,
+        )
+
+    @staticmethod
+    def split_paths(paths: Iterable[str]) -> tuple[np.ndarray, list[str], np.ndarray]:
+        """
+        Split the paths at their last separator. Return the directory id of each
+        path, the distinct directories without their trailing separator and the
+        file names.
+        """
+        parts = [path.rpartition(op.sep) for path in paths]
+        directory_ids, directories = pd.factorize(
+            np.array([head + separator for head, separator, _ in parts], dtype=object)
         )
+        names = np.empty(len(parts), dtype=object)
+        names[:] = [name for _, _, name in parts]
+        # Keep the root directory, which is only a separator, and use the current
+        # directory for the bare file names.
+        directories = [
+            directory.rstrip(op.sep) or directory or op.curdir
+            for directory in directories
+        ]
+        return directory_ids, directories, names
+
+    @staticmethod
+    def _join_paths(
+        prefixes: list[str], directory_ids: np.ndarray, names: np.ndarray
+    ) -> np.ndarray:
+        """Concatenate the prefix of the directory of each path with its name."""
+        prefix_array = np.empty(len(prefixes), dtype=object)
+        prefix_array[:] = prefixes
+        return prefix_array[directory_ids] + names
+
+    @staticmethod
+    def _get_irregular_names(names: np.ndarray) -> np.ndarray:
+        """
+        Return the positions of the names that change when the path is
+        normalized, which must be handled one path at a time.
+        """
+        irregular = pd.Series(names, dtype=object).isin(["", op.curdir, op.pardir])
+        irregular = irregular.to_numpy()
+        if op.altsep is not None:
+            irregular |= np.array([op.altsep in name for name in names], dtype=bool)
+        return np.flatnonzero(irregular)
+
+    @staticmethod
+    def _get_prefix(directory: str) -> str:
+        """Return the string to put before a file name of the directory."""
+        if directory == op.curdir:
+            return ""
+        if directory.endswith(op.sep):
+            return directory
+        return directory + op.sep
+
+    def normalize_path(self, df: DataFrame, path_column_name: str) -> DataFrame:
+        """
+        Normalize the path to be relative to the label file. Each directory is
+        normalized once and joined with the file names of its paths.
+        """
+        label_directory = op.dirname(self.path)
+        paths = df[path_column_name].tolist()
+        directory_ids, directories, names = FileHandler.split_paths(paths)
+        prefixes = [
+            FileHandler._get_prefix(op.normpath(op.join(label_directory, directory)))
+            for directory in directories
+        ]
+        normalized = FileHandler._join_paths(prefixes, directory_ids, names)
+        for index in FileHandler._get_irregular_names(names):
+            normalized[index] = self.normalize(paths[index])
+        df[path_column_name] = normalized
         return df
 
+    def normalize_column(self, paths: PathColumn) -> PathColumn:
+        """
+        Return the path column normalized to be relative to the label file. Each
+        directory is normalized once, and only the paths whose name changes
+        when normalized are rebuilt one at a time.
+        """
+        label_directory = op.dirname(self.path)
+
+        def normalize_directory(directory: str) -> str:
+            directory = directory.rstrip(op.sep) or directory or op.curdir
+            return FileHandler._get_prefix(
+                op.normpath(op.join(label_directory, directory))
+            )
+
+        normalized = paths.map_directories(normalize_directory)
+        irregular = FileHandler._get_irregular_rows(paths.names)
+        if len(irregular) == 0:
+            return normalized
+
+        directories = list(normalized.directories)
+        positions = {directory: i for i, directory in enumerate(directories)}
+        directory_ids = normalized.directory_ids.copy()
+        names = normalized.names.to_numpy()
+        for index in irregular:
+            head, separator, name = self.normalize(paths.get(index)).rpartition(op.sep)
+            directory = head + separator
+            if directory not in positions:
+                positions[directory] = len(directories)
+                directories.append(directory)
+            directory_ids[index] = positions[directory]
+            names[index] = name
+        return PathColumn(directories, directory_ids, StringColumn.from_strings(names))
+
+    @staticmethod
+    def _get_irregular_rows(names: StringColumn) -> np.ndarray:
+        """
+        Return the rows of the names that change when the path is normalized,
+        reading only the names short enough to be a relative directory.
+        """
+        lengths = np.diff(names.offsets) - 1
+        candidates = np.flatnonzero(lengths <= 2)
+        irregular = [
+            index
+            for index in candidates
+            if names.get(index) in ("", op.curdir, op.pardir)
+        ]
+        if op.altsep is not None:
+            irregular = FileHandler._get_irregular_names(names.to_numpy())
+        return np.asarray(irregular, dtype=np.int64)
+
+    def normalize(self, path: str) -> str:
+        """Normalize a single path to be relative to the label file."""
+        return op.normpath(op.join(op.dirname(self.path), path))
+
+    def relative(self, path: str) -> str:
+        """Return a normalized path relative to the directory of the label file."""
+        return op.relpath(path, op.dirname(self.path) or op.curdir)
+
     def common_path(self, df: DataFrame, path_column_name: str) -> DataFrame:
-        """Remove the common path from the path."""
+        """
+        Return the dataframe with the common path removed from the paths. The
+        common path and the relative path are computed once for each directory.
+        The given dataframe is left unchanged.
+        """
+        paths = df[path_column_name].tolist()
+        if not paths:
+            return df
+        directory_ids, directories, names = FileHandler.split_paths(paths)
         # Get the common path
-        common_path = op.commonpath(df[path_column_name].tolist())
+        common_path = op.commonpath(directories)
         # Remove the common path
-        df[path_column_name] = df[path_column_name].apply(
-            lambda x: op.relpath(x, common_path)
-        )
-        return df
+        prefixes = [
+            FileHandler._get_prefix(op.relpath(directory, common_path))
+            for directory in directories
+        ]
+        relative = FileHandler._join_paths(prefixes, directory_ids, names)
+        for index in FileHandler._get_irregular_names(names):
+            relative[index] = op.relpath(paths[index], common_path)
+        return df.assign(**{path_column_name: relative})
 
-    def save(self, df: DataFrame, filename: Optional[str] = None) -> None:
-        """Save the dataframe to a file."""
+    def get_save_filename(self, suffix: str = "") -> str:
+        """
+        Return a save filename based on the label file, the suffix and the
+        time.
+        """
+        current_time = datetime.now().strftime("%Y%m%d_%H%M")
+        base_name = FileHandler.get_basename(self.path)
+        filename = f"{base_name}{suffix}_{current_time}.{self.extension}"
+        if split_compression(self.path)[1] is not None:
+            # Keep the compression suffix of the label file.
+            filename += "." + self.path.rpartition(".")[2]
+        return filename
+
+    def save(
+        self,
+        df: DataFrame,
+        filename: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """
+        Save the dataframe to a file. The format and compression follow the
+        extension of the file, or the label file if the extension is unknown.
+        The progress callback receives the number of rows written and the
+        number of rows, and may raise to abort the save.
+        """
         if filename is None:
             # Create a save filename if not provided
-            current_time = datetime.now().strftime("%Y%m%d_%H%M")
-            base_name = FileHandler.get_basename(self.path)
-            filename = f"{base_name}_{current_time}.{self.extension}"
+            filename = self.get_save_filename()
+
+        def get_chunks() -> Iterator[DataFrame]:
+            # Always write the first chunk, which holds the header.
+            for start in range(0, max(len(df), 1), self.CHUNK_SIZE):
+                if progress_callback is not None:
+                    progress_callback(start, len(df))
+                yield df.iloc[start : start + self.CHUNK_SIZE]
+            if progress_callback is not None:
+                progress_callback(len(df), len(df))
+
+        self.write(get_chunks(), filename)
+
+    def save_with_source(
+        self,
+        df: DataFrame,
+        live_mask: np.ndarray,
+        column_names: list[str],
+        filename: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """
+        Save the dataframe together with the columns that were not loaded. The
+        dataframe holds the kept rows of the loaded columns and the live mask
+        tells which rows of the label file are kept. The other columns are
+        streamed from the label file chunk by chunk and written as they were
+        read, in the order of the column names.
+        """
+        source_columns = [name for name in column_names if name not in df.columns]
+        written = 0
+
+        def merge(chunk: DataFrame, start: int) -> DataFrame:
+            nonlocal written
+            chunk = chunk[live_mask[start : start + len(chunk)]]
+            chunk = chunk.reset_index(drop=True)
+            rows = df.iloc[written : written + len(chunk)].reset_index(drop=True)
+            written += len(chunk)
+            return pd.concat([chunk, rows], axis=1)
+
+        self.save_chunks(
+            source_columns,
+            live_mask,
+            column_names,
+            merge,
+            filename,
+            progress_callback,
+        )
+
+    def save_chunks(
+        self,
+        usecols: Optional[list[str]],
+        live_mask: np.ndarray,
+        column_names: list[str],
+        update: Callable[[DataFrame, int], DataFrame],
+        filename: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        database: Optional[LabelDatabase] = None,
+    ) -> None:
+        """
+        Save the label file chunk by chunk. Each chunk of the usecols is read as
+        stored and passed with the index of its first row to update, which
+        returns the kept rows of the chunk to write. Raise ValueError if the
+        number of rows of the label file does not match the live mask anymore.
+        The progress callback receives the number of rows of the label file
+        copied and the number of rows, and may raise to abort the save. If the
+        label file is a database, the chunks are read from the given database,
+        or from the label file if none is given.
+        """
+        if filename is None:
+            filename = self.get_save_filename()
+
+        def get_chunks() -> Iterator[DataFrame]:
+            start = 0
+            with self.read_source_chunks(usecols, database) as chunks:
+                for chunk in chunks:
+                    if start + len(chunk) > len(live_mask):
+                        raise ValueError("The label file changed since it was loaded.")
+                    yield update(chunk, start).reindex(columns=column_names)
+                    start += len(chunk)
+                    if progress_callback is not None:
+                        progress_callback(start, len(live_mask))
+            if start != len(live_mask):
+                raise ValueError("The label file changed since it was loaded.")
+            if start == 0:
+                # The label file has no rows, only write the header.
+                yield DataFrame(columns=column_names)
+
+        self.write(get_chunks(), filename)
+
+    @contextmanager
+    def read_source_chunks(
+        self,
+        usecols: Optional[list[str]] = None,
+        database: Optional[LabelDatabase] = None,
+    ) -> Iterator[Iterator[DataFrame]]:
+        """Yield the chunks of the usecols of the label file, as stored."""
+        if self.label_format is not None:
+            with open_label_file(self.source_path) as (_, stream):
+                # The reader is closed before the stream, even when aborted.
+                with closing(
+                    self.label_format.read_chunks(
+                        stream, self.CHUNK_SIZE, usecols, raw=True
+                    )
+                ) as chunks:
+                    yield chunks
+        elif database is not None:
+            yield database.read_chunks(self.CHUNK_SIZE, usecols)
+        else:
+            database = LabelDatabase.open(self.path)
+            try:
+                yield database.read_chunks(self.CHUNK_SIZE, usecols)
+            finally:
+                database.close()
+
+    def write(self, chunks: Iterable[DataFrame], filename: str) -> None:
+        """
+        Write the chunks to a file in the format and compression of its
+        extension, or to a new database for a database extension. The label
+        file may be the output, so the chunks are written to a temporary file
+        that replaces the file at the end, and the label file is kept as a copy
+        to read its rows from afterwards. A database is edited in place and
+        cannot be the output.
+        """
+        extension = FileHandler.get_extension(filename).lower()
+        is_database = extension in DATABASE_EXTENSIONS
+        source = None if self.path is None else op.abspath(self.path)
+        if self.label_format is None and op.abspath(filename) == source:
+            raise ValueError(f"The database {filename} already holds every edit.")
+        label_format = FORMATS.get(extension, self.label_format)
+        if label_format is None and not is_database:
+            raise ValueError(f"Unknown label file extension: {extension}")
+        _, compression = split_compression(filename)
+        temp_path = f"{filename}.tmp"
+        is_kept = False
+        try:
+            if is_database:
+                LabelDatabase.create(temp_path, chunks)
+            else:
+                with open_label_file(temp_path, "wb", compression) as (_, stream):
+                    label_format.write(chunks, stream)
+            if op.abspath(filename) == source and self.source_path == self.path:
+                self.keep_source()
+                is_kept = True
+            os.replace(temp_path, filename)
+        except BaseException:
+            if op.exists(temp_path):
+                os.remove(temp_path)
+            if is_kept:
+                self.remove_source_copy()
+            raise
+
+    @staticmethod
+    def get_source_copy_path(path: str) -> str:
+        """Return the path of the copy of a label file that was saved over."""
+        return f"{path}.source"
+
+    def keep_source(self) -> None:
+        """
+        Keep the label file as a copy before it is saved over, so the columns
+        that were not loaded are still read from the rows the model refers to.
+        The copy is a hard link where the file system allows it.
+        """
+        copy_path = FileHandler.get_source_copy_path(self.path)
+        if op.exists(copy_path):
+            # Left by a session that was not closed.
+            os.remove(copy_path)
+        try:
+            os.link(self.path, copy_path)
+        except OSError:
+            shutil.copyfile(self.path, copy_path)
+        self.source_path = copy_path
 
-        delimiter = FileHandler.get_delimiter(self.extension)
-        df.to_csv(filename, sep=delimiter, index=False)
+    def remove_source_copy(self) -> None:
+        """Remove the copy of the label file, once its rows are not needed."""
+        if self.source_path is not None and self.source_path != self.path:
+            if op.exists(self.source_path):
+                os.remove(self.source_path)
+        self.source_path = self.path
@@ -0,0 +1,128 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    """Least-recently-used cache of decoded images bounded by memory size.
+
+    Entries are keyed by ``(path, mtime, *extra)`` so that a file modified on disk
+    never returns a stale image. All variants of a path can be dropped at once with
+    ``invalidate``. The cache is safe to share with prefetching worker threads.
+
+    Attributes:
+    ----------
+    max_bytes: int
+        The maximum number of bytes of decoded pixels kept in the cache.
+    current_bytes: int
+        The number of bytes of decoded pixels currently in the cache.
+    hits: int
+        The number of lookups that were served from the cache.
+    misses: int
+        The number of lookups that were not found in the cache.
+    """
+
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        """Initialize the cache."""
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[
+            tuple, tuple[Union[Image.Image, np.ndarray], int]
+        ] = OrderedDict()
+        self._keys_by_path: dict[str, set[tuple]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        """Return the number of cached images."""
+        return len(self._entries)
+
+    def __contains__(self, key: tuple) -> bool:
+        """Return whether the key is cached without touching the counters."""
+        return key in self._entries
+
+    @staticmethod
+    def make_key(path: str, mtime: float, *extra: Hashable) -> tuple:
+        """Return the cache key of an image."""
+        return (path, mtime, *extra)
+
+    @staticmethod
+    def image_nbytes(image: Union[Image.Image, np.ndarray]) -> int:
+        """Return the approximate number of bytes used by the decoded pixels."""
+        if isinstance(image, np.ndarray):
+            return image.nbytes
+        width, height = image.size
+        return width * height * len(image.getbands())
+
+    def get(self, key: tuple) -> Optional[Union[Image.Image, np.ndarray]]:
+        """Return the cached image and mark it as recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: tuple, image: Union[Image.Image, np.ndarray]) -> None:
+        """Add the image to the cache and evict the least recently used images."""
+        nbytes = self.image_nbytes(image)
+        if nbytes > self.max_bytes:
+            logger.debug("Image %s is larger than the cache capacity", key[0])
+            return
+
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (image, nbytes)
+            self._keys_by_path.setdefault(key[0], set()).add(key)
+            self.current_bytes += nbytes
+            self._evict()
+
+    def invalidate(self, path: str) -> None:
+        """Remove every cached variant of the path."""
+        with self._lock:
+            for key in self._keys_by_path.pop(path, set()):
+                _, nbytes = self._entries.pop(key)
+                self.current_bytes -= nbytes
+
+    def clear(self) -> None:
+        """Remove every image from the cache."""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_path.clear()
+            self.current_bytes = 0
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        """Set the capacity of the cache and evict images that no longer fit."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _discard(self, key: tuple) -> None:
+        """Remove a single entry if it exists."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self.current_bytes -= entry[1]
+        keys = self._keys_by_path[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._keys_by_path[key[0]]
+
+    def _evict(self) -> None:
+        """Evict the least recently used images until the cache fits."""
+        while self.current_bytes > self.max_bytes and self._entries:
+            oldest_key = next(iter(self._entries))
+            self._discard(oldest_key)
@@ -1,13 +1,25 @@
 import logging
 import math
+import os
 import os.path as op
+import shutil
+import subprocess
+from typing import Optional
 
-from PIL import Image
+import numpy as np
+from PIL import Image, JpegImagePlugin
 
 logger = logging.getLogger(__name__)
 
 
 class ImageHandler:
+    # Counterclockwise rotations that only reorder pixels.
+    TRANSPOSES = {
+        90: Image.Transpose.ROTATE_90,
+        180: Image.Transpose.ROTATE_180,
+        270: Image.Transpose.ROTATE_270,
+    }
+
     @staticmethod
     def open(path: str) -> Image.Image:
         """Return the current image."""
@@ -20,12 +32,119 @@ class ImageHandler:
         rgb_image = image.convert("RGB")
         return rgb_image
 
+    @staticmethod
+    def open_for_display(
+        path: str, target_size: Optional[tuple[int, int]] = None
+    ) -> Image.Image:
+        """
+        Return the image decoded at roughly the resolution needed to fit
+        the target size, or at full resolution if no target size is given.
+        """
+        if target_size is None:
+            return ImageHandler.open(path)
+
+        if not op.exists(path):
+            return FileNotFoundError(
+                f"File not found: {path}, Please browse directory to solve this."
+            )
+
+        image = Image.open(path)
+        fit_size = ImageHandler.get_fit_size(image.size, target_size)
+        if image.format == "JPEG":
+            # Let libjpeg scale the DCT blocks while decoding (1/2, 1/4 or 1/8).
+            # The decoded image is never smaller than the requested size.
+            image.draft("RGB", fit_size)
+
+        rgb_image = image.convert("RGB")
+        # Shrink other formats, or what remains of the JPEG, by whole factors.
+        factor = min(rgb_image.width // fit_size[0], rgb_image.height // fit_size[1])
+        if factor > 1:
+            rgb_image = rgb_image.reduce(factor)
+        return rgb_image
+
+    @staticmethod
+    def get_fit_size(
+        size: tuple[int, int], target_size: tuple[int, int]
+    ) -> tuple[int, int]:
+        """Return the size that fits inside the target size with aspect ratio."""
+        width, height = size
+        target_width, target_height = target_size
+        scale = min(target_width / width, target_height / height, 1.0)
+        return (max(math.ceil(width * scale), 1), max(math.ceil(height * scale), 1))
+
+    @staticmethod
+    def to_array(image: Image.Image) -> np.ndarray:
+        """Return the RGB pixels as a read-only C-contiguous uint8 array."""
+        array = np.asarray(image.convert("RGB") if image.mode != "RGB" else image)
+        array = np.ascontiguousarray(array)
+        array.flags.writeable = False
+        return array
+
     @staticmethod
     def rotate(image: Image.Image, degree: int = 90) -> Image.Image:
         """Rotate the current image."""
         rotated_image = image.rotate(degree, expand=True)
         return rotated_image
 
+    @staticmethod
+    def transpose(image: Image.Image, degree: int) -> Image.Image:
+        """Rotate the image counterclockwise by a multiple of 90 degrees."""
+        degree %= 360
+        if degree == 0:
+            return image
+        if degree not in ImageHandler.TRANSPOSES:
+            raise ValueError(f"Rotation must be a multiple of 90 degrees: {degree}")
+        return image.transpose(ImageHandler.TRANSPOSES[degree])
+
+    @staticmethod
+    def bake_rotation(path: str, degree: int) -> None:
+        """
+        Rotate the image file counterclockwise by a multiple of 90 degrees.
+        JPEG files are transposed losslessly with jpegtran when it is installed,
+        otherwise they are re-encoded with their original quantization tables.
+        """
+        degree %= 360
+        if degree == 0:
+            return
+
+        temp_path = f"{path}.rotating"
+        try:
+            if not ImageHandler._jpegtran_rotate(path, temp_path, degree):
+                with Image.open(path) as image:
+                    image_format = image.format
+                    save_kwargs = {}
+                    if image_format == "JPEG":
+                        save_kwargs = {
+                            "qtables": image.quantization,
+                            "subsampling": JpegImagePlugin.get_sampling(image),
+                        }
+                    rotated_image = ImageHandler.transpose(image, degree)
+                rotated_image.save(temp_path, format=image_format, **save_kwargs)
+            os.replace(temp_path, path)
+        finally:
+            if op.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _jpegtran_rotate(path: str, output_path: str, degree: int) -> bool:
+        """Rotate a JPEG file losslessly and return whether it succeeded."""
+        jpegtran = shutil.which("jpegtran")
+        if jpegtran is None:
+            return False
+        with Image.open(path) as image:
+            if image.format != "JPEG":
+                return False
+
+        # jpegtran rotates clockwise and -perfect refuses partial edge blocks.
+        clockwise_degree = str(360 - degree)
+        command = [jpegtran, "-copy", "all", "-perfect", "-rotate", clockwise_degree]
+        command += ["-outfile", output_path, path]
+        result = subprocess.run(command, capture_output=True)
+        if result.returncode != 0:
+            logger.info("Lossless rotation is not possible for %s", path)
+            return False
+        return True
+
     @staticmethod
     def resize(image: Image.Image, size: tuple[int, int]) -> Image.Image:
         """Resize the current image."""
@@ -48,8 +167,8 @@ class ImageHandler:
         """Fit the current image to target size with aspect ratio."""
         width, height = image.size
         container_width, container_height = size
-        logger.info(f"Image size: {width}x{height}")
-        logger.info(f"Container size: {container_width}x{container_height}")
+        logger.debug("Image size: %dx%d", width, height)
+        logger.debug("Container size: %dx%d", container_width, container_height)
 
         # Calculate the aspect ratio of the image and container
         aspect_ratio = width / height
@@ -66,7 +185,7 @@ class ImageHandler:
             target_width = math.floor(target_height * aspect_ratio)
 
         # Resize the image to the target size
-        logger.info(f"Target size: {target_width}x{target_height}")
+        logger.debug("Target size: %dx%d", target_width, target_height)
         resized_image = image.resize((target_width, target_height))
 
         return resized_image
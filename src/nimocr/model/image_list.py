@@ -1,102 +1,609 @@
 import logging
-import os.path as op
+import os
 from dataclasses import dataclass, field
-from typing import Iterable
+from functools import partial
+from typing import Callable, Optional, Union
 
+import numpy as np
 import pandas as pd
 from PIL import Image
 
+from .change_tracker import DELETED, ROTATED, TEXT_CHANGED, ChangeTracker
+from .edit_history import Command, EditHistory
+from .edit_journal import DELETE, ORIENTATION, RESTORE, TEXT, EditJournal
 from .file_handler import FileHandler
+from .image_cache import ImageCache
 from .image_handler import ImageHandler
+from .label_database import LabelDatabase
+from .label_index import LabelIndex, LazyColumn
+from .path_validator import PathValidator, ValidationReport
+from .prefetcher import ImagePrefetcher
+from .row_cache import RowCache
+from .row_store import RowStore
+from .snapshot import ImageListSnapshot
+from .thumbnail_cache import ThumbnailCache
 
 logger = logging.getLogger(__name__)
 
+# Errors of an image file that cannot be read or decoded. Pillow raises
+# SyntaxError for some malformed files.
+DECODE_ERRORS = (OSError, SyntaxError, Image.DecompressionBombError)
+
 
 @dataclass
 class ImageListModel:
     """Model for the image list.
 
     This class is used to store the image list and the labels. It will load image from the path only when needed.
+    Rows are addressed by their position in the label file. Deleted rows stay in the
+    dataframe and are only marked as deleted in the live mask until the file is saved.
 
     Attributes:
     ----------
     df: pd.DataFrame
-        The dataframe that stores the image path and the text.
+        The dataframe of the label file. Once the types are cast, the path, text
+        and orientation columns are moved to the row store and the dataframe only
+        keeps the other columns. If the file was loaded with its column names,
+        only the path, text and orientation columns are read and the other
+        columns are copied from the label file when it is saved. A streamed
+        file keeps an empty dataframe with one row per row of the file.
+    rows: RowStore
+        The compact store of the path, text and orientation of every row. For a
+        streamed file, the path and text are parsed from the file when read.
+    is_streaming: bool
+        Whether the label file is read on demand instead of loaded, which is
+        the case for files larger than STREAMING_BYTES and for label databases.
+        The edits of a label database are written to it as they are made.
     path_column_name: str
         The column name for the path.
     text_column_name: str
         The column name for the text.
+    orientation_column_name: str
+        The column name for the counterclockwise rotation of the image in degrees.
+        The rotation is applied when the image is displayed and only written into
+        the image file when the file is saved with bake_rotation.
+    live_mask: np.ndarray
+        The boolean mask of the rows that are not deleted.
+    changes: ChangeTracker
+        The rows changed since the label file was loaded, with their original
+        text and rotation.
+    validation_report: Optional[ValidationReport]
+        The rows whose image is missing or unreadable, once the paths are validated.
 
     Methods:
     --------
     length() -> int
-        Return the length of the dataframe.
+        Return the number of rows that are not deleted.
     columns() -> tuple[str, ...]
-        Return the columns of the dataframe.
+        Return the columns of the label file.
+    read_columns(path: str) -> tuple[str, ...]
+        Return the columns of a label file without loading it.
+    to_frame() -> pd.DataFrame
+        Return the dataframe of the loaded columns, including the deleted rows.
+    snapshot() -> ImageListSnapshot
+        Return the current rows, unaffected by the edits made afterwards.
     get_image(index: int) -> Image.Image
-        Return the image at the given index.
+        Return the full resolution image at the given index.
+    get_display_image(index: int, size: tuple[int, int]) -> np.ndarray
+        Return the pixels at the given index decoded to fit the display size.
+    load_image(path: str, orientation: int) -> Image.Image
+        Return the full resolution image of the path, using the image cache.
+    load_display_image(path: str, size: tuple[int, int], orientation: int,
+                       create_thumbnail: bool)
+        Return the display pixels of the path, using the image cache.
+    prefetch(indices: list[int], size: tuple[int, int]) -> None
+        Decode the images at the given indices in the background.
     get_text(index: int) -> str
         Return the text at the given index.
     get_path(index: int) -> str
         Return the path at the given index.
-    rotate_image(index: int) -> None
+    get_paths(indices: np.ndarray) -> list[str]
+        Return the paths at the given indices.
+    get_live_indices() -> np.ndarray
+        Return the indices of the rows that are not deleted.
+    get_edited_indices() -> np.ndarray
+        Return the indices of the rows whose text or rotation was changed.
+    export_changes(path: str) -> int
+        Save the changed rows with their original values to a file.
+    validate_paths(progress_callback: Callable[[int, int], None]) -> ValidationReport
+        Find the rows whose image is missing or unreadable.
+    get_orientation(index: int) -> int
+        Return the rotation of the image at the given index.
+    rotate_image(index: int, degree: int) -> None
         Rotate image at the given index.
+    set_orientation(index: int, orientation: int) -> None
+        Set the rotation of the image at the given index.
     delete_item(index: int) -> None
         Delete the row at the given index.
+    restore_item(index: int) -> None
+        Restore the deleted row at the given index.
+    is_deleted(index: int) -> bool
+        Return whether the row at the given index is deleted.
     change_text(text: str) -> None
         Set the text of the current image.
-    load_file(path: str) -> None
+    undo() -> Optional[Command]
+        Revert the last edit.
+    redo() -> Optional[Command]
+        Apply the last reverted edit again.
+    open_journal() -> int
+        Replay the journaled edits and journal the next edits.
+    rebase_label_file(snapshot: ImageListSnapshot, path: str) -> None
+        Follow the label file once a snapshot was saved over it.
+    sync_journal() -> None
+        Write the journaled edits to the disk and compact the journal.
+    load_file(path: str, progress_callback: Callable[[int, int], None],
+              path_column_name: str, text_column_name: str,
+              streaming: Optional[bool]) -> None
         Set the label path and reload the csv file.
-    save_file(path: str) -> None
+    save_file(path: str, bake_rotation: bool,
+              progress_callback: Callable[[int, int], None]) -> None
         Save the current list to a csv file.
     set_path_column_name(path_column_name: str) -> None
         Set the path column name.
     set_text_column_name(text_column_name: str) -> None
         Set the text column name.
+    set_cache_capacity(max_bytes: int) -> None
+        Set the memory budget of the decoded image cache.
+    close() -> None
+        Stop the background workers.
     """
 
     df: pd.DataFrame = None
     path_column_name: str = "path"
     text_column_name: str = "text"
+    orientation_column_name: str = "orientation"
     _file_handler: FileHandler = field(default_factory=FileHandler)
     _image_handler: ImageHandler = field(default_factory=ImageHandler)
+    _image_cache: ImageCache = field(default_factory=ImageCache)
+    _thumbnail_cache: Optional[ThumbnailCache] = field(default_factory=ThumbnailCache)
+    _prefetcher: ImagePrefetcher = field(init=False, repr=False)
+    _live: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+    _rows: Optional[RowStore] = field(default=None, init=False, repr=False)
+    _column_names: tuple[str, ...] = field(default=(), init=False, repr=False)
+    _file_columns: tuple[str, ...] = field(default=(), init=False, repr=False)
+    _path_validator: PathValidator = field(default_factory=PathValidator)
+    _index: Optional[Union[LabelIndex, LabelDatabase]] = field(
+        default=None, init=False, repr=False
+    )
+    _row_cache: Optional[RowCache] = field(default_factory=RowCache)
+    _source_stat: Optional[os.stat_result] = field(default=None, init=False, repr=False)
+    _is_prepared: bool = field(default=False, init=False, repr=False)
+    _journal: Optional[Union[EditJournal, LabelDatabase]] = field(
+        default=None, init=False, repr=False
+    )
+    # The journal row of each row once a save replaced the label file, -1 for
+    # the rows the saved file does not hold
+    _journal_rows: Optional[np.ndarray] = field(default=None, init=False, repr=False)
+    _changes: Optional[ChangeTracker] = field(default=None, init=False, repr=False)
+    _history: EditHistory = field(default_factory=EditHistory, repr=False)
+    validation_report: Optional[ValidationReport] = field(default=None, init=False)
+
+    # Label files from this size on are streamed instead of loaded
+    STREAMING_BYTES = 1024 * 1024 * 1024
+
+    def __post_init__(self) -> None:
+        # Only the prefetch workers create the missing thumbnails.
+        self._prefetcher = ImagePrefetcher(
+            partial(self.load_display_image, create_thumbnail=True)
+        )
+
+    @property
+    def live_mask(self) -> np.ndarray:
+        """Return the boolean mask of the rows that are not deleted."""
+        if self._live is None:
+            self._live = np.ones(len(self.df), dtype=bool)
+        return self._live
+
+    @property
+    def changes(self) -> ChangeTracker:
+        """Return the rows changed since the label file was loaded."""
+        if self._changes is None:
+            self._changes = ChangeTracker(len(self.live_mask))
+        return self._changes
+
+    @property
+    def is_streaming(self) -> bool:
+        """Return whether the rows are read from the label file on demand."""
+        return self._index is not None
 
     @property
     def length(self) -> int:
-        """Return the length of the dataframe."""
-        return len(self.df)
+        """Return the number of rows that are not deleted."""
+        return int(np.count_nonzero(self.live_mask))
 
     @property
     def columns(self) -> tuple[str, ...]:
-        """Return the columns of the dataframe."""
-        return tuple(self.df.columns)
+        """Return the columns of the label file."""
+        if self._rows is None:
+            return tuple(self.df.columns)
+        return self._column_names
+
+    @property
+    def rows(self) -> RowStore:
+        """Return the row store, moving the working columns into it if needed."""
+        if self._rows is None:
+            self._build_rows()
+        return self._rows
+
+    def _build_rows(self) -> None:
+        """Move the path, text and orientation columns into the row store."""
+        self._column_names = self._file_columns or tuple(self.df.columns)
+        if self.orientation_column_name not in self._column_names:
+            self._column_names += (self.orientation_column_name,)
+        self._rows = RowStore.from_frame(
+            self.df,
+            self.path_column_name,
+            self.text_column_name,
+            self.orientation_column_name,
+        )
+        working_columns = {
+            self.path_column_name,
+            self.text_column_name,
+            self.orientation_column_name,
+        }
+        self.df = self.df.drop(columns=list(working_columns & set(self.df.columns)))
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the dataframe of the loaded columns, including the deleted rows."""
+        snapshot = self.snapshot()
+        try:
+            return snapshot.to_frame()
+        finally:
+            snapshot.release()
+
+    def snapshot(self) -> ImageListSnapshot:
+        """Return the current rows, unaffected by the edits made afterwards."""
+        # Building the rows drops the working columns from the dataframe.
+        rows = self.rows
+        return ImageListSnapshot.take(
+            self._file_handler,
+            self.df,
+            rows,
+            self.live_mask,
+            self.columns,
+            self.path_column_name,
+            self.text_column_name,
+            self.orientation_column_name,
+            self.is_streaming,
+            self._index if isinstance(self._index, LabelDatabase) else None,
+        )
 
     @property
     def paths(self) -> list[str]:
-        """Return the paths in the dataframe."""
-        return self.df[self.path_column_name].tolist()
+        """Return the paths of the rows that are not deleted."""
+        return self.rows.paths.to_numpy()[self.live_mask].tolist()
+
+    def read_columns(self, path: str) -> tuple[str, ...]:
+        """Return the columns of a label file without loading it."""
+        return tuple(self._file_handler.read_header(path).columns)
+
+    def load_file(
+        self,
+        path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        path_column_name: Optional[str] = None,
+        text_column_name: Optional[str] = None,
+        streaming: Optional[bool] = None,
+    ) -> None:
+        """
+        Set the label path and reload the csv file. The progress callback
+        receives the number of bytes read and the file size. If the column names
+        are given, only the path, text and orientation columns are read, or
+        their prepared rows are read from the row cache. With streaming, only
+        the row offsets are read and each row is parsed when it is shown. By
+        default, uncompressed delimited files of STREAMING_BYTES or more are
+        streamed, and a label database is always streamed.
+        """
+        has_columns = path_column_name is not None and text_column_name is not None
+        if LabelDatabase.is_database(path):
+            streaming = True
+        elif streaming is None:
+            streaming = (
+                has_columns
+                and os.path.getsize(path) >= self.STREAMING_BYTES
+                and self._file_handler.can_index(path)
+            )
+        if streaming:
+            if not has_columns:
+                raise ValueError("A label file is only streamed with its columns.")
+            self._load_index(
+                path, progress_callback, path_column_name, text_column_name
+            )
+            return
+
+        usecols = None
+        dtype = None
+        file_columns = ()
+        # Keep the version of the file that is read for the row cache.
+        source_stat = os.stat(path)
+        if has_columns:
+            file_columns = self.read_columns(path)
+            self._check_columns(file_columns, path_column_name, text_column_name)
+            working_columns = (
+                path_column_name,
+                text_column_name,
+                self.orientation_column_name,
+            )
+            rows = None
+            if self._row_cache is not None:
+                rows = self._row_cache.get(path, working_columns)
+            if rows is not None:
+                self._file_handler.set_path(path)
+                self._set_file(pd.DataFrame(index=pd.RangeIndex(len(rows))))
+                self.path_column_name = path_column_name
+                self.text_column_name = text_column_name
+                self._set_rows(rows, file_columns)
+                # The cached rows are already cast and normalized.
+                self._is_prepared = True
+                return
+            usecols = [name for name in file_columns if name in working_columns]
+            dtype = {path_column_name: str, text_column_name: str}
+
+        # Read the whole file before replacing the current dataframe, so an
+        # aborted load leaves the model untouched.
+        df = self._file_handler.load(path, progress_callback, usecols, dtype)
+        self._set_file(df, file_columns)
+        if has_columns:
+            self.path_column_name = path_column_name
+            self.text_column_name = text_column_name
+            self._source_stat = source_stat
+
+    def _load_index(
+        self,
+        path: str,
+        progress_callback: Optional[Callable[[int, int], None]],
+        path_column_name: str,
+        text_column_name: str,
+    ) -> None:
+        """Index the rows of the label file to read them on demand."""
+        label_index = self._file_handler.index(path, progress_callback)
+        try:
+            orientations, deleted = self._read_index_state(
+                label_index, path, path_column_name, text_column_name
+            )
+        except Exception:
+            label_index.close()
+            raise
+        columns = label_index.columns
+
+        # The index is complete, so the label file can be replaced.
+        self._file_handler.set_path(path)
+        self._set_file(pd.DataFrame(index=pd.RangeIndex(len(label_index))))
+        self._index = label_index
+        self.path_column_name = path_column_name
+        self.text_column_name = text_column_name
+        rows = RowStore(
+            LazyColumn(label_index, columns.index(path_column_name)),
+            LazyColumn(label_index, columns.index(text_column_name)),
+            orientations.astype(np.int16),
+        )
+        self._set_rows(rows, columns)
+        if deleted is not None:
+            self.live_mask[deleted] = False
+        if isinstance(label_index, LabelDatabase):
+            # The changes of the previous sessions are kept in the database.
+            self._changes = label_index.read_changes()
+
+    def _read_index_state(
+        self,
+        label_index: Union[LabelIndex, LabelDatabase],
+        path: str,
+        path_column_name: str,
+        text_column_name: str,
+    ) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Check the columns of the indexed label file and return the rotation of
+        every row and the indices of the deleted rows, if they are stored.
+        """
+        self._check_columns(label_index.columns, path_column_name, text_column_name)
+        if isinstance(label_index, LabelDatabase):
+            # The rotations and deletions are read from the partial indices.
+            label_index.set_working_columns(
+                text_column_name, self.orientation_column_name
+            )
+            return label_index.read_orientations(), label_index.read_deleted()
+        if self.orientation_column_name not in label_index.columns:
+            return np.zeros(len(label_index)), None
+        # The rotations of a previous session are needed for every row.
+        orientations = self._file_handler.load(
+            path, usecols=[self.orientation_column_name]
+        )[self.orientation_column_name]
+        return RowStore.parse_orientations(orientations), None
 
     @staticmethod
-    def _validate_paths(paths: Iterable[str]) -> bool:
-        """Validate the paths."""
-        return all(op.exists(path) for path in paths)
-
-    def load_file(self, path: str) -> None:
-        """Set the label path and reload the csv file."""
-        self.df = self._file_handler.load(path)
-        path_valid = self._validate_paths(self.df[self.path_column_name])
-        if not path_valid:
-            return FileExistsError(
-                "Some of the paths do not exist or the relative path is incorrect."
+    def _check_columns(
+        columns: tuple[str, ...], path_column_name: str, text_column_name: str
+    ) -> None:
+        """Raise ValueError if the path or text column is not in the columns."""
+        for column_name in (path_column_name, text_column_name):
+            if column_name not in columns:
+                raise ValueError(
+                    f"Column {column_name} not found in columns {columns}."
+                )
+
+    def _set_file(self, df: pd.DataFrame, file_columns: tuple[str, ...] = ()) -> None:
+        """Replace the loaded file and forget everything about the previous one."""
+        self._close_journal()
+        self._close_index()
+        self.df = df
+        self._file_columns = file_columns
+        self._source_stat = None
+        self._is_prepared = False
+        self._live = None
+        self._changes = None
+        self._history.clear()
+        self._rows = None
+        self._prefetcher.cancel()
+        self._image_cache.clear()
+        self.validation_report = None
+
+    def _set_rows(self, rows: RowStore, file_columns: tuple[str, ...]) -> None:
+        """Use rows that were not read into the dataframe."""
+        self._file_columns = file_columns
+        self._column_names = file_columns
+        if self.orientation_column_name not in file_columns:
+            self._column_names += (self.orientation_column_name,)
+        self._rows = rows
+
+    def _close_index(self) -> None:
+        """Release the label file of a streamed file."""
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def open_journal(self) -> int:
+        """
+        Replay the edits journaled in a previous session and journal the next
+        edits next to the label file. Return the number of recovered edits.
+        A label database is its own journal, each edit is committed to it.
+        """
+        self._close_journal()
+        if isinstance(self._index, LabelDatabase):
+            self._journal = self._index
+            return 0
+        label_path = self._file_handler.path
+        rows = self.rows
+        working_columns = [
+            self.path_column_name,
+            self.text_column_name,
+            self.orientation_column_name,
+        ]
+        try:
+            header = EditJournal.make_header(label_path, len(rows), working_columns)
+            journal = EditJournal(EditJournal.get_path(label_path), header)
+            journal.open()
+        except OSError:
+            logger.warning(
+                "Failed to open the journal of %s", label_path, exc_info=True
             )
+            return 0
+
+        # The journal is set afterwards, so the replay is not journaled again.
+        for index, text in journal.texts.items():
+            self.change_text(index, text)
+        for index, orientation in journal.orientations.items():
+            self.set_orientation(index, orientation)
+        for index in journal.deleted:
+            self.delete_item(index)
+        # The recovered edits are the starting point of the session.
+        self._history.clear()
+        self._journal = journal
+        return len(journal.get_records())
+
+    def rebase_label_file(self, snapshot: ImageListSnapshot, path: str) -> None:
+        """
+        Follow the label file once a snapshot was saved over it. The rows are
+        still read from the copy of the label file the save kept, and the edits
+        made since the snapshot was taken are journaled against the saved file.
+        """
+        source_path = snapshot.file_handler.source_path
+        if os.path.abspath(path) != os.path.abspath(self._file_handler.path) or len(
+            snapshot.live_mask
+        ) != len(self.live_mask):
+            # The snapshot was saved to another file, or another label file
+            # was loaded while it was saved.
+            if source_path != self._file_handler.source_path:
+                snapshot.file_handler.remove_source_copy()
+            return
+        self._file_handler.source_path = source_path
+        self._rebase_journal(snapshot, path)
+
+    def _rebase_journal(self, snapshot: ImageListSnapshot, path: str) -> None:
+        """
+        Journal the edits made since the snapshot was taken against the label
+        file it was saved over. The saved file only holds the rows kept in the
+        snapshot, so the next edits are journaled with their row in that file.
+        """
+        if not isinstance(self._journal, EditJournal):
+            return
+        kept = snapshot.live_mask
+        journal_rows = np.cumsum(kept, dtype=np.int64) - 1
+        journal_rows[~kept] = -1
+
+        changes = self.changes
+        edited = set(changes.original_texts) | set(changes.original_orientations)
+        edited.update(changes.get_changed(DELETED).tolist())
+        records = []
+        for index in sorted(edited):
+            row = int(journal_rows[index])
+            if row < 0:
+                continue
+            text = self.get_text(index)
+            if text != snapshot.rows.texts.get(index):
+                records.append([TEXT, row, text])
+            orientation = self.get_orientation(index)
+            if orientation != snapshot.rows.orientations[index]:
+                records.append([ORIENTATION, row, orientation])
+            if not self.live_mask[index]:
+                records.append([DELETE, row])
+        try:
+            header = EditJournal.make_header(
+                path, int(np.count_nonzero(kept)), self._journal.header["columns"]
+            )
+            self._journal.rebase(header, records)
+        except OSError:
+            logger.warning("Failed to write the journal", exc_info=True)
+            self._journal = None
+            return
+        self._journal_rows = journal_rows
+
+    def sync_journal(self) -> None:
+        """Write the journaled edits to the disk and compact the journal."""
+        if self._journal is None:
+            return
+        try:
+            self._journal.sync()
+            if self._journal.should_compact():
+                self._journal.compact()
+        except OSError:
+            logger.warning("Failed to write the journal", exc_info=True)
+            self._journal = None
+
+    def _append_journal(self, operation: str, index: int, *values) -> None:
+        """Journal an edit, if the label file has a journal."""
+        if self._journal is None:
+            return
+        if self._journal_rows is not None:
+            index = int(self._journal_rows[index])
+            if index < 0:
+                # The row was deleted when the label file was saved.
+                return
+        try:
+            self._journal.append(operation, index, *values)
+        except OSError:
+            # Editing goes on, the edits are only kept until the file is saved.
+            logger.warning("Failed to write the journal", exc_info=True)
+            self._journal = None
+
+    def _close_journal(self) -> None:
+        """Sync and close the journal of the label file."""
+        if self._journal is not None:
+            try:
+                self._journal.close()
+            except OSError:
+                logger.warning("Failed to close the journal", exc_info=True)
+            self._journal = None
+        self._journal_rows = None
 
     def cast_types(self) -> None:
+        if self.is_streaming or self._is_prepared:
+            # The rows of a streamed file are read as text when they are shown
+            # and cached rows are already cast.
+            return
         # Cast the path to string
         self.df[self.path_column_name] = self.df[self.path_column_name].astype(str)
         # Replace NaN with empty string
         self.df[self.text_column_name] = self.df[self.text_column_name].fillna("")
         # Cast the text to string
         self.df[self.text_column_name] = self.df[self.text_column_name].astype(str)
+        # Keep the rotations of a previous session or start without rotation
+        if self.orientation_column_name not in self.df.columns:
+            self.df[self.orientation_column_name] = 0
+        self.df[self.orientation_column_name] = RowStore.parse_orientations(
+            self.df[self.orientation_column_name]
+        )
+        # The working columns are only read from the row store from now on.
+        self._build_rows()
 
     def normalize_path(self) -> None:
         """Normalize the path."""
@@ -105,41 +612,320 @@ class ImageListModel:
                 f"Path column name {self.path_column_name} not found in columns {self.columns}."
             )
 
-        self.df = self._file_handler.normalize_path(self.df, self.path_column_name)
+        if self._is_prepared:
+            return
+        if self.is_streaming:
+            # Normalize each path when its row is read.
+            self.rows.paths.convert = self._file_handler.normalize
+            return
+
+        self.rows.paths = self._file_handler.normalize_column(self.rows.paths)
+        if self._row_cache is not None and self._source_stat is not None:
+            # Reopening the same version of the file can skip the parsing.
+            working_columns = (
+                self.path_column_name,
+                self.text_column_name,
+                self.orientation_column_name,
+            )
+            self._row_cache.put(
+                self._file_handler.path, self._source_stat, working_columns, self.rows
+            )
 
-    def save_file(self, path: str) -> None:
-        """Save the current list to a csv file."""
-        df = self._file_handler.common_path(self.df, self.path_column_name)
-        self._file_handler.save(df, filename=path)
+    def save_file(
+        self,
+        path: str,
+        bake_rotation: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """
+        Save the current list to a csv file. If bake_rotation is set, the pending
+        rotations are written into the image files first. The orientation column
+        is only saved while some rotations are still pending. To save without
+        blocking the edits, save a snapshot in the background instead.
+        """
+        if bake_rotation:
+            self.bake_rotations()
+        snapshot = self.snapshot()
+        snapshot.save(path, progress_callback)
+        self.rebase_label_file(snapshot, path)
+
+    def bake_rotations(self) -> None:
+        """Write the pending rotations into the image files."""
+        orientations = self.rows.orientations
+        # The images of the deleted rows are left untouched.
+        rotated = np.flatnonzero((orientations != 0) & self.live_mask)
+        logger.info("Baking the rotation of %d images", len(rotated))
+        for index in rotated:
+            path = self.get_path(index)
+            self._prefetcher.wait(path)
+            self._image_handler.bake_rotation(path, int(orientations[index]))
+            self._image_cache.invalidate(path)
+            self.changes.bake_orientation(index, int(orientations[index]))
+            if isinstance(self._journal, LabelDatabase):
+                # The database keeps the baked rotation for the next sessions.
+                baked = self.changes.baked_orientations[index]
+                try:
+                    self._journal.bake_orientation(index, baked)
+                except OSError:
+                    logger.warning("Failed to write the journal", exc_info=True)
+                    self._journal = None
+            self.set_orientation(index, 0)
+        # Undoing a rotation would now rotate the rewritten image file again.
+        self._history.clear()
 
     def get_image(self, index: int) -> Image.Image:
-        """Return the image at the given index."""
+        """Return the full resolution image at the given index."""
+        path = self.get_path(index)
+        return self.load_image(path, self.get_orientation(index))
+
+    def get_display_image(self, index: int, size: tuple[int, int]) -> np.ndarray:
+        """Return the pixels at the given index decoded to fit the display size."""
         path = self.get_path(index)
-        return self._image_handler.open(path)
+        # Reuse the decode of a prefetch job that is already running.
+        self._prefetcher.wait(path)
+        return self.load_display_image(path, size, self.get_orientation(index))
+
+    def load_image(self, path: str, orientation: int = 0) -> Image.Image:
+        """
+        Return the full resolution image of the path rotated by the orientation,
+        using the image cache.
+        """
+        return self._load_cached(path, None, orientation, convert=None)
+
+    def load_display_image(
+        self,
+        path: str,
+        size: tuple[int, int],
+        orientation: int = 0,
+        create_thumbnail: bool = False,
+    ) -> np.ndarray:
+        """
+        Return the pixels of the path rotated by the orientation and decoded at
+        roughly the display size, using the image cache. The pixels are cached as
+        a read-only contiguous array that the view can show without copying. A
+        missing thumbnail is only created with create_thumbnail, since writing
+        it is too slow for the UI thread.
+        """
+        return self._load_cached(
+            path,
+            size,
+            orientation,
+            convert=self._image_handler.to_array,
+            create_thumbnail=create_thumbnail,
+        )
+
+    def _load_cached(
+        self,
+        path: str,
+        size: Optional[tuple[int, int]],
+        orientation: int,
+        convert: Optional[Callable[[Image.Image], np.ndarray]],
+        create_thumbnail: bool = False,
+    ) -> Union[Image.Image, np.ndarray]:
+        """
+        Return the cached image or decode, convert and cache it. The error is
+        returned if the image cannot be opened.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            # Let the image handler report the missing file.
+            return self._image_handler.open(path)
+
+        key = self._image_cache.make_key(path, mtime, size, orientation)
+        image = self._image_cache.get(key)
+        if image is not None:
+            return image
+
+        # The image is decoded upright, so a quarter turn swaps the target box.
+        decode_size = size
+        if size is not None and orientation in (90, 270):
+            decode_size = (size[1], size[0])
+        try:
+            image = self._load_thumbnail(path, decode_size, create_thumbnail)
+            if image is None:
+                image = self._image_handler.open_for_display(path, decode_size)
+        except DECODE_ERRORS as error:
+            # A file that cannot be read or decoded is reported like a missing
+            # one, instead of raising in the view.
+            logger.warning("Failed to open %s: %s", path, error)
+            return error
+        if isinstance(image, Image.Image):
+            image = self._image_handler.transpose(image, orientation)
+            if convert is not None:
+                image = convert(image)
+            self._image_cache.put(key, image)
+        return image
+
+    def _load_thumbnail(
+        self, path: str, size: Optional[tuple[int, int]], create: bool
+    ) -> Optional[Image.Image]:
+        """
+        Return the persistent thumbnail of the path if it covers the size,
+        creating it if it is missing and create is set.
+        """
+        if size is None or self._thumbnail_cache is None:
+            return None
+        return self._thumbnail_cache.load(path, size, create)
+
+    def prefetch(self, indices: list[int], size: tuple[int, int]) -> None:
+        """Decode the images at the given indices in the background."""
+        requests = [
+            (self.get_path(index), size, self.get_orientation(index))
+            for index in indices
+        ]
+        self._prefetcher.schedule(requests)
 
     def get_text(self, index: int) -> str:
         """Return the text at the given index."""
-        return self.df[self.text_column_name][index]
+        return self.rows.texts.get(index)
 
     def get_path(self, index: int) -> str:
         """Return the path at the given index."""
-        return self.df[self.path_column_name][index]
+        return self.rows.paths.get(index)
+
+    def get_paths(self, indices: np.ndarray) -> list[str]:
+        """Return the paths at the given indices."""
+        if self.is_streaming:
+            return [self.get_path(index) for index in indices]
+        return self.rows.paths.to_numpy()[indices].tolist()
+
+    def get_live_indices(self) -> np.ndarray:
+        """Return the indices of the rows that are not deleted."""
+        return np.flatnonzero(self.live_mask)
+
+    def get_edited_indices(self) -> np.ndarray:
+        """Return the indices of the rows whose text or rotation was changed."""
+        edited = self.changes.get_changed(TEXT_CHANGED | ROTATED)
+        return edited[self.live_mask[edited]]
+
+    def export_changes(self, path: str) -> int:
+        """
+        Save the changed rows to a file, with their position in the label file,
+        their original and current text and rotation and whether they are
+        deleted. Only the changed rows are read. Return the number of rows.
+        """
+        changes = self.changes
+        indices = changes.get_changed()
+        paths = self.get_paths(indices)
+        texts = [self.get_text(index) for index in indices]
+        # The rotations are relative to the image files of the label file.
+        orientations = [
+            changes.get_total_orientation(index, self.get_orientation(index))
+            for index in indices
+        ]
+        df = pd.DataFrame(
+            {
+                "row": indices,
+                self.path_column_name: [
+                    self._file_handler.relative(path) for path in paths
+                ],
+                f"original_{self.text_column_name}": [
+                    changes.get_original_text(index, text)
+                    for index, text in zip(indices, texts)
+                ],
+                self.text_column_name: texts,
+                f"original_{self.orientation_column_name}": [
+                    changes.get_original_orientation(index, orientation)
+                    for index, orientation in zip(indices, orientations)
+                ],
+                self.orientation_column_name: orientations,
+                "deleted": (changes.flags[indices] & DELETED) > 0,
+            }
+        )
+        self._file_handler.save(df, path)
+        logger.info("Exported %d changed rows to %s", len(df), path)
+        return len(df)
+
+    def validate_paths(
+        self, progress_callback: Optional[Callable[[int, int], None]] = None
+    ) -> ValidationReport:
+        """
+        Find the rows whose image is missing or unreadable. The validation does
+        not change the rows, so it can run in the background after the file is
+        loaded. The progress callback receives the number of listed directories.
+        """
+        if self.is_streaming:
+            raise ValueError("The paths of a streamed file cannot be validated.")
+        rows = self.rows
+        report = self._path_validator.validate(rows.paths, progress_callback)
+        # Keep the report only if the same file is still loaded.
+        if self._rows is rows:
+            self.validation_report = report
+        return report
+
+    def get_orientation(self, index: int) -> int:
+        """Return the rotation of the image at the given index."""
+        return int(self.rows.orientations[index])
 
-    def rotate_image(self, index: int) -> None:
-        """Rotate image at the given index."""
-        path = self.df.iloc[index][self.path_column_name]
-        image = self._image_handler.open(path)
-        rotated_image = self._image_handler.rotate(image)
-        rotated_image.save(path)
+    def rotate_image(self, index: int, degree: int = 90) -> None:
+        """Rotate image at the given index counterclockwise."""
+        self.set_orientation(index, self.get_orientation(index) + degree)
+
+    def set_orientation(self, index: int, orientation: int) -> None:
+        """Set the rotation of the image at the given index."""
+        orientation %= 360
+        previous = self.get_orientation(index)
+        self.changes.set_orientation(index, orientation, previous)
+        self.rows.orientations[index] = orientation
+        self._append_journal(ORIENTATION, index, orientation)
+        self._history.push((ORIENTATION, index, previous, orientation))
 
     def delete_item(self, index: int) -> None:
         """Delete the row at the given index."""
-        # Drop the row
-        self.df.drop(index, inplace=True)
+        self._image_cache.invalidate(self.get_path(index))
+        # Only mark the row, the dataframe is compacted when it is saved.
+        self.live_mask[index] = False
+        self.changes.set_deleted(index, True)
+        self._append_journal(DELETE, index)
+        self._history.push((DELETE, index))
+
+    def restore_item(self, index: int) -> None:
+        """Restore the deleted row at the given index."""
+        self.live_mask[index] = True
+        self.changes.set_deleted(index, False)
+        self._append_journal(RESTORE, index)
+        self._history.push((RESTORE, index))
+
+    def is_deleted(self, index: int) -> bool:
+        """Return whether the row at the given index is deleted."""
+        return not self.live_mask[index]
 
     def change_text(self, index: int, text: str) -> None:
         """Set the text of the current image."""
-        self.df.at[index, self.text_column_name] = text
+        previous = self.get_text(index)
+        self.changes.set_text(index, text, previous)
+        self.rows.texts.set(index, text)
+        self._append_journal(TEXT, index, text)
+        self._history.push((TEXT, index, previous, text))
+
+    def undo(self) -> Optional[Command]:
+        """Revert the last edit and return its command, or None if there is none."""
+        command = self._history.undo()
+        if command is not None:
+            self._apply_command(command, undo=True)
+        return command
+
+    def redo(self) -> Optional[Command]:
+        """Apply the last reverted edit again and return its command, or None."""
+        command = self._history.redo()
+        if command is not None:
+            self._apply_command(command, undo=False)
+        return command
+
+    def _apply_command(self, command: Command, undo: bool) -> None:
+        """Set the value of the row before or after the command."""
+        operation, index = command[0], command[1]
+        with self._history.paused():
+            if operation == TEXT:
+                self.change_text(index, command[2] if undo else command[3])
+            elif operation == ORIENTATION:
+                self.set_orientation(index, command[2] if undo else command[3])
+            elif (operation == DELETE) != undo:
+                # Redo a delete or undo a restore.
+                self.delete_item(index)
+            else:
+                self.restore_item(index)
 
     def set_path_column_name(self, path_column_name: str) -> None:
         """Set the path column name."""
@@ -148,3 +934,14 @@ class ImageListModel:
     def set_text_column_name(self, text_column_name: str) -> None:
         """Set the text column name."""
         self.text_column_name = text_column_name
+
+    def set_cache_capacity(self, max_bytes: int) -> None:
+        """Set the memory budget of the decoded image cache."""
+        self._image_cache.set_max_bytes(max_bytes)
+
+    def close(self) -> None:
+        """Stop the background workers."""
+        self._prefetcher.shutdown()
+        self._close_journal()
+        self._close_index()
+        self._file_handler.remove_source_copy()
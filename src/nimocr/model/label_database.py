@@ -0,0 +1,364 @@
+import logging
+import os.path as op
+import sqlite3
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from .change_tracker import ChangeTracker
+from .edit_journal import DELETE, ORIENTATION, RESTORE, TEXT
+from .row_store import RowStore
+
+logger = logging.getLogger(__name__)
+
+# File name extensions of the databases
+DATABASE_EXTENSIONS = ("sqlite", "sqlite3", "db")
+# First bytes of a database file
+DATABASE_MAGIC = b"SQLite format 3\x00"
+
+
+class LabelDatabase:
+    """Label file stored in a SQLite database, to read and edit rows in place.
+
+    Every column of the label file is stored as text in one table, whose row id
+    is the position of the row in the label file plus one, so a row is read by
+    its primary key and a range of rows by a keyset query on the id. Deleted
+    rows are only flagged. The database is opened in WAL mode and each edit is
+    committed in its own transaction, so an edit is kept as soon as it is made
+    and saving a copy reads a consistent snapshot while editing goes on.
+
+    The database reads rows like a LabelIndex and applies the edits like an
+    EditJournal, so the model streams it like a large label file. The text and
+    rotation of a row before its first edit are kept in a table of the working
+    columns, so the changed rows are found again when the database is reopened.
+
+    Attributes:
+    ----------
+    path: str
+        The path of the database.
+    columns: tuple[str, ...]
+        The columns of the label file.
+    """
+
+    def __init__(self, path: str, connection: sqlite3.Connection) -> None:
+        """Initialize the database."""
+        self.path = path
+        self._connection = connection
+        self.columns = tuple(
+            name
+            for (name,) in connection.execute(
+                "SELECT name FROM columns ORDER BY position"
+            )
+        )
+        self._length = connection.execute("SELECT max(id) FROM rows").fetchone()[0] or 0
+        self._text_position: Optional[int] = None
+        self._orientation_position: Optional[int] = None
+        self._original_table: Optional[str] = None
+
+    @staticmethod
+    def is_database(path: str) -> bool:
+        """Return whether the file is a database, by extension or content."""
+        if path.rpartition(".")[2].lower() in DATABASE_EXTENSIONS:
+            return True
+        try:
+            with open(path, "rb") as f:
+                return f.read(len(DATABASE_MAGIC)) == DATABASE_MAGIC
+        except OSError:
+            return False
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        """Return a connection that commits each statement on its own."""
+        # The rows are read in a worker thread while the file is loading, and
+        # edited in the main thread afterwards.
+        return sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+
+    @classmethod
+    def open(cls, path: str) -> "LabelDatabase":
+        """Open the database of the path."""
+        if not op.exists(path):
+            raise FileNotFoundError(f"No such database: {path}")
+        connection = cls._connect(path)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode, a commit survives a crash of the application.
+            connection.execute("PRAGMA synchronous=NORMAL")
+            return cls(path, connection)
+        except sqlite3.Error as error:
+            connection.close()
+            raise ValueError(f"{path} is not a label database: {error}") from error
+
+    @classmethod
+    def create(cls, path: str, chunks: Iterable[DataFrame]) -> None:
+        """
+        Write the chunks of a label file to a new database, one transaction per
+        chunk. The columns are those of the first chunk.
+        """
+        connection = cls._connect(path)
+        try:
+            connection.execute(
+                "CREATE TABLE columns (position INTEGER PRIMARY KEY, name TEXT)"
+            )
+            written = 0
+            columns = None
+            for chunk in chunks:
+                if columns is None:
+                    columns = list(chunk.columns)
+                    cls._create_rows_table(connection, columns)
+                    insert = cls._get_insert(len(columns))
+                values = chunk[columns].astype(object).where(chunk.notna(), None)
+                rows = values.itertuples(index=False, name=None)
+                connection.execute("BEGIN")
+                connection.executemany(insert, rows)
+                connection.execute("COMMIT")
+                written += len(chunk)
+            if columns is None:
+                cls._create_rows_table(connection, [])
+        finally:
+            connection.close()
+        logger.info("Created the database %s with %d rows", path, written)
+
+    @staticmethod
+    def _create_rows_table(connection: sqlite3.Connection, columns: list[str]) -> None:
+        """Create the table of the rows with a text field per column."""
+        connection.executemany(
+            "INSERT INTO columns VALUES (?, ?)", enumerate(map(str, columns))
+        )
+        fields = "".join(f", c{position} TEXT" for position in range(len(columns)))
+        connection.execute(
+            "CREATE TABLE rows (id INTEGER PRIMARY KEY, "
+            f"deleted INTEGER NOT NULL DEFAULT 0{fields})"
+        )
+        # Only the few deleted rows are in the index, to read them at once.
+        connection.execute("CREATE INDEX rows_deleted ON rows (id) WHERE deleted")
+
+    @staticmethod
+    def _get_insert(column_count: int) -> str:
+        """Return the statement that inserts a row."""
+        fields = ", ".join(f"c{position}" for position in range(column_count))
+        placeholders = ", ".join("?" * column_count)
+        return f"INSERT INTO rows ({fields}) VALUES ({placeholders})"
+
+    @staticmethod
+    def read_header(path: str, nrows: int) -> DataFrame:
+        """Return the first rows of the database."""
+        database = LabelDatabase.open(path)
+        try:
+            rows = database.read_rows(0, min(nrows, len(database)))
+            return DataFrame(rows, columns=list(database.columns))
+        finally:
+            database.close()
+
+    def __len__(self) -> int:
+        """Return the number of rows, including the deleted rows."""
+        return self._length
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the database, which keeps no row."""
+        return 0
+
+    def _get_fields(self, usecols: Optional[list[str]] = None) -> str:
+        """Return the fields of the columns in a query."""
+        names = self.columns if usecols is None else usecols
+        return ", ".join(f"c{self.columns.index(name)}" for name in names)
+
+    def read_rows(self, start: int, stop: int) -> list[list[str]]:
+        """Return the fields of the rows from start to stop."""
+        if not 0 <= start <= stop <= len(self):
+            raise IndexError(f"Rows {start} to {stop} are out of range.")
+        cursor = self._connection.execute(
+            f"SELECT {self._get_fields()} FROM rows WHERE id > ? AND id <= ? "
+            "ORDER BY id",
+            # SQLite does not bind the integers of numpy.
+            (int(start), int(stop)),
+        )
+        return [["" if value is None else value for value in row] for row in cursor]
+
+    def read_row(self, index: int) -> list[str]:
+        """Return the fields of the row at the index."""
+        return self.read_rows(index, index + 1)[0]
+
+    def read_chunks(
+        self, chunksize: int, usecols: Optional[list[str]] = None
+    ) -> Iterator[DataFrame]:
+        """
+        Return the chunks of the usecols of every row, including the deleted
+        rows, as the text they are stored as.
+        """
+        names = list(self.columns if usecols is None else usecols)
+        query = (
+            f"SELECT {self._get_fields(names)} FROM rows WHERE id > ? "
+            "ORDER BY id LIMIT ?"
+        )
+        last = 0
+        while True:
+            rows = self._connection.execute(query, (last, chunksize)).fetchall()
+            if not rows:
+                return
+            yield DataFrame(rows, columns=names, dtype=object).fillna("")
+            last += len(rows)
+
+    def set_working_columns(
+        self, text_column_name: str, orientation_column_name: str
+    ) -> None:
+        """
+        Set the columns the edits are written to, adding the orientation column
+        if the label file has none.
+        """
+        try:
+            if orientation_column_name not in self.columns:
+                position = len(self.columns)
+                self._connection.execute("BEGIN")
+                self._connection.execute(
+                    "INSERT INTO columns VALUES (?, ?)",
+                    (position, orientation_column_name),
+                )
+                self._connection.execute(
+                    f"ALTER TABLE rows ADD COLUMN c{position} TEXT NOT NULL DEFAULT '0'"
+                )
+                self._connection.execute("COMMIT")
+                self.columns += (orientation_column_name,)
+            self._text_position = self.columns.index(text_column_name)
+            self._orientation_position = self.columns.index(orientation_column_name)
+            # Index the few rotated rows, which is done once per database.
+            field = f"c{self._orientation_position}"
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS rows_rotated_{field} ON rows (id) "
+                f"WHERE {field} NOT IN ('0', '')"
+            )
+            self._original_table = f"original_c{self._text_position}_{field}"
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._original_table} "
+                "(id INTEGER PRIMARY KEY, text TEXT, orientation TEXT, "
+                "baked INTEGER NOT NULL DEFAULT 0)"
+            )
+        except sqlite3.Error as error:
+            if self._connection.in_transaction:
+                self._connection.execute("ROLLBACK")
+            raise OSError(f"Failed to prepare {self.path}: {error}") from error
+
+    def read_orientations(self) -> np.ndarray:
+        """Return the rotation of every row, reading only the rotated rows."""
+        orientations = np.zeros(len(self), dtype=np.int16)
+        field = f"c{self._orientation_position}"
+        cursor = self._connection.execute(
+            f"SELECT id, {field} FROM rows WHERE {field} NOT IN ('0', '')"
+        )
+        rotated = pd.DataFrame(
+            cursor.fetchall(), columns=["id", "orientation"], dtype=object
+        )
+        row_ids = rotated["id"].to_numpy(dtype=np.int64)
+        orientations[row_ids - 1] = RowStore.parse_orientations(rotated["orientation"])
+        return orientations
+
+    def read_deleted(self) -> np.ndarray:
+        """Return the indices of the deleted rows."""
+        cursor = self._connection.execute("SELECT id FROM rows WHERE deleted")
+        return np.array([row_id - 1 for (row_id,) in cursor], dtype=np.int64)
+
+    def read_changes(self) -> ChangeTracker:
+        """
+        Return the rows changed since the database was created, with their
+        text and rotation before their first edit.
+        """
+        changes = ChangeTracker(len(self))
+        text_field = f"c{self._text_position}"
+        orientation_field = f"c{self._orientation_position}"
+        cursor = self._connection.execute(
+            "SELECT original.id, original.text, original.orientation, "
+            f"original.baked, rows.{text_field}, rows.{orientation_field} "
+            f"FROM {self._original_table} AS original "
+            "JOIN rows ON rows.id = original.id"
+        )
+        changed = pd.DataFrame(
+            cursor.fetchall(),
+            columns=["id", "text", "orientation", "baked", "current_text", "current"],
+            dtype=object,
+        )
+        originals = RowStore.parse_orientations(changed["orientation"]).tolist()
+        currents = RowStore.parse_orientations(changed["current"]).tolist()
+        for row, original, current in zip(
+            changed.itertuples(index=False), originals, currents
+        ):
+            index = row.id - 1
+            current_text = row.current_text or ""
+            changes.set_original(index, row.text or "", original, row.baked)
+            changes.set_text(index, current_text, current_text)
+            changes.set_orientation(index, current, current)
+        for index in self.read_deleted():
+            changes.set_deleted(index, True)
+        return changes
+
+    def append(self, operation: str, row: int, *values) -> None:
+        """Commit an edit of the row in its own transaction."""
+        row = int(row)
+        if operation == TEXT:
+            statement = f"UPDATE rows SET c{self._text_position} = ? WHERE id = ?"
+            parameters = (values[0], row + 1)
+        elif operation == ORIENTATION:
+            field = f"c{self._orientation_position}"
+            statement = f"UPDATE rows SET {field} = ? WHERE id = ?"
+            parameters = (str(values[0]), row + 1)
+        elif operation in (DELETE, RESTORE):
+            statement = "UPDATE rows SET deleted = ? WHERE id = ?"
+            parameters = (int(operation == DELETE), row + 1)
+        else:
+            raise ValueError(f"Unknown operation: {operation}")
+        self._commit(row, statement, parameters)
+
+    def bake_orientation(self, row: int, baked: int) -> None:
+        """Commit the rotation written into the image file of the row."""
+        row = int(row)
+        statement = f"UPDATE {self._original_table} SET baked = ? WHERE id = ?"
+        self._commit(row, statement, (baked, row + 1))
+
+    def _commit(self, row: int, statement: str, parameters: tuple) -> None:
+        """
+        Execute the statement that edits the row in its own transaction, keeping
+        the text and rotation of the row before its first edit.
+        """
+        try:
+            self._connection.execute("BEGIN")
+            self._connection.execute(
+                f"INSERT OR IGNORE INTO {self._original_table} "
+                "(id, text, orientation) SELECT id, "
+                f"c{self._text_position}, c{self._orientation_position} "
+                "FROM rows WHERE id = ?",
+                (row + 1,),
+            )
+            self._connection.execute(statement, parameters)
+            self._connection.execute("COMMIT")
+        except sqlite3.Error as error:
+            if self._connection.in_transaction:
+                self._connection.execute("ROLLBACK")
+            raise OSError(f"Failed to write {self.path}: {error}") from error
+
+    def sync(self) -> None:
+        """Do nothing, every edit is committed when it is made."""
+
+    def should_compact(self) -> bool:
+        """Return False, the edits are written in place."""
+        return False
+
+    def snapshot(self) -> "LabelDatabase":
+        """
+        Return the database as it is now, on its own connection that later
+        edits do not change until it is closed.
+        """
+        connection = LabelDatabase._connect(self.path)
+        connection.execute("BEGIN")
+        # The snapshot of a WAL database starts with the first read.
+        database = LabelDatabase(self.path, connection)
+        database._text_position = self._text_position
+        database._orientation_position = self._orientation_position
+        database._original_table = self._original_table
+        return database
+
+    def close(self) -> None:
+        """Close the connection, which can be done more than once."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
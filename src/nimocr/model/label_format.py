@@ -0,0 +1,347 @@
+import bz2
+import gzip
+import importlib.util
+import io
+import itertools
+import json
+import lzma
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+import pandas as pd
+from pandas import DataFrame
+
+# Compression of a label file by file name suffix
+COMPRESSIONS = {"gz": "gzip", "bz2": "bz2", "xz": "xz", "zst": "zstd"}
+# First bytes of the compressed files
+COMPRESSION_MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+PARQUET_MAGIC = b"PAR1"
+# Number of bytes read to recognize the format of a file
+SNIFF_BYTES = 64 * 1024
+
+
+def has_module(name: str) -> bool:
+    """Return whether an optional module is installed."""
+    return importlib.util.find_spec(name) is not None
+
+
+if has_module("orjson"):
+    import orjson
+
+    loads = orjson.loads
+
+    def dumps(record: dict) -> bytes:
+        """Return the JSON encoding of the record."""
+        return orjson.dumps(record)
+
+else:
+    loads = json.loads
+
+    def dumps(record: dict) -> bytes:
+        """Return the JSON encoding of the record."""
+        return json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+
+class LabelFormat(ABC):
+    """Reader and writer of a label file format.
+
+    Readers take a path or a binary stream. Writers take the chunks of the label
+    file and a binary stream, so that every format can be compressed and saved
+    chunk by chunk. A format implements read_header, read_chunks and write, so
+    an incomplete format cannot be created and registered.
+
+    Attributes:
+    ----------
+    name: str
+        The name of the format.
+    extensions: tuple[str, ...]
+        The file name extensions of the format.
+    """
+
+    name = ""
+    extensions: tuple[str, ...] = ()
+
+    def read(
+        self,
+        source,
+        usecols: Optional[list[str]] = None,
+        dtype: Optional[dict[str, type]] = None,
+    ) -> DataFrame:
+        """Return the dataframe of the usecols of the label file."""
+        chunks = list(self.read_chunks(source, 100_000, usecols, dtype))
+        return pd.concat(chunks, ignore_index=True)
+
+    @abstractmethod
+    def read_header(self, source, nrows: int) -> DataFrame:
+        """Return the first rows of the label file."""
+
+    @abstractmethod
+    def read_chunks(
+        self,
+        source,
+        chunksize: int,
+        usecols: Optional[list[str]] = None,
+        dtype: Optional[dict[str, type]] = None,
+        raw: bool = False,
+    ) -> Iterator[DataFrame]:
+        """
+        Return the chunks of the usecols of the label file. If raw is set, the
+        values are read as they are stored, to be written back unchanged.
+        """
+
+    @abstractmethod
+    def write(self, chunks: Iterable[DataFrame], target: BinaryIO) -> None:
+        """Write the chunks of the label file with a header."""
+
+
+class DelimitedFormat(LabelFormat):
+    """Delimiter-separated values read with the fastest parser of pandas.
+
+    Attributes:
+    ----------
+    delimiter: str
+        The field delimiter.
+    quotechar: str
+        The quote character of the format.
+    """
+
+    def __init__(
+        self, name: str, extensions: tuple[str, ...], delimiter: str, quotechar: str
+    ) -> None:
+        """Initialize the format."""
+        self.name = name
+        self.extensions = extensions
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+
+    def read(self, source, usecols=None, dtype=None) -> DataFrame:
+        """Return the dataframe of the usecols of the label file."""
+        engine = "pyarrow" if has_module("pyarrow") and usecols is not None else "c"
+        return pd.read_csv(
+            source, sep=self.delimiter, usecols=usecols, dtype=dtype, engine=engine
+        )
+
+    def read_header(self, source, nrows: int) -> DataFrame:
+        """Return the first rows of the label file."""
+        return pd.read_csv(source, sep=self.delimiter, nrows=nrows)
+
+    def read_chunks(
+        self, source, chunksize, usecols=None, dtype=None, raw=False
+    ) -> Iterator[DataFrame]:
+        """Return the chunks of the usecols of the label file."""
+        options = {"sep": self.delimiter, "usecols": usecols, "dtype": dtype}
+        if raw:
+            options.update(dtype=str, keep_default_na=False)
+        yield from pd.read_csv(source, chunksize=chunksize, **options)
+
+    def write(self, chunks, target) -> None:
+        """Write the chunks of the label file with a header."""
+        text = io.TextIOWrapper(target, encoding="utf-8", newline="")
+        try:
+            for number, chunk in enumerate(chunks):
+                chunk.to_csv(text, sep=self.delimiter, index=False, header=number == 0)
+            text.flush()
+        finally:
+            # Leave the target open for the caller.
+            text.detach()
+
+
+class JsonLinesFormat(LabelFormat):
+    """One JSON object per line, parsed with orjson when it is installed."""
+
+    name = "jsonl"
+    extensions = ("jsonl", "ndjson")
+
+    def read_header(self, source, nrows: int) -> DataFrame:
+        """Return the first rows of the label file."""
+        return next(self.read_chunks(source, max(nrows, 1)), DataFrame()).head(nrows)
+
+    def read_chunks(
+        self, source, chunksize, usecols=None, dtype=None, raw=False
+    ) -> Iterator[DataFrame]:
+        """
+        Return the chunks of the usecols of the label file. The values keep
+        their JSON types, apart from the dtype columns.
+        """
+        with _open_binary(source) as stream:
+            lines = (line for line in stream if line.strip())
+            while True:
+                batch = list(itertools.islice(lines, chunksize))
+                if not batch:
+                    return
+                chunk = DataFrame([loads(line) for line in batch], columns=usecols)
+                for column_name, column_type in (dtype or {}).items():
+                    if column_name in chunk.columns:
+                        chunk[column_name] = chunk[column_name].astype(column_type)
+                yield chunk
+
+    def write(self, chunks, target) -> None:
+        """Write each row of the chunks as a JSON object on its own line."""
+        for chunk in chunks:
+            # Missing values are written as null.
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for record in values.to_dict("records"):
+                target.write(dumps(record) + b"\n")
+
+
+class ParquetFormat(LabelFormat):
+    """Apache Parquet read and written by the parquet engine of pandas."""
+
+    name = "parquet"
+    extensions = ("parquet", "pq")
+
+    def read(self, source, usecols=None, dtype=None) -> DataFrame:
+        """Return the dataframe of the usecols of the label file."""
+        df = pd.read_parquet(source, columns=usecols)
+        return df.astype(dtype) if dtype else df
+
+    def read_header(self, source, nrows: int) -> DataFrame:
+        """Return the first rows of the label file."""
+        return next(self.read_chunks(source, max(nrows, 1)), DataFrame()).head(nrows)
+
+    def read_chunks(
+        self, source, chunksize, usecols=None, dtype=None, raw=False
+    ) -> Iterator[DataFrame]:
+        """Return the chunks of the usecols of the label file."""
+        if not has_module("pyarrow"):
+            df = self.read(source, usecols, dtype)
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start : start + chunksize].reset_index(drop=True)
+            return
+
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(source)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=usecols):
+            chunk = batch.to_pandas()
+            yield chunk.astype(dtype) if dtype else chunk
+
+    def write(self, chunks, target) -> None:
+        """Write the chunks of the label file as one parquet file."""
+        frames = list(chunks)
+        df = pd.concat(frames, ignore_index=True) if frames else DataFrame()
+        df.to_parquet(target, index=False)
+
+
+FORMATS: dict[str, LabelFormat] = {}
+
+
+def register_format(label_format: LabelFormat) -> None:
+    """Read and write the files with the extensions of the format."""
+    for extension in label_format.extensions:
+        FORMATS[extension] = label_format
+
+
+register_format(DelimitedFormat("csv", ("csv",), ",", '"'))
+register_format(DelimitedFormat("tsv", ("tsv", "tab"), "\t", ""))
+register_format(JsonLinesFormat())
+register_format(ParquetFormat())
+
+
+def get_format(extension: str) -> LabelFormat:
+    """Return the format of the extension."""
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown extension: {extension}")
+    return FORMATS[extension]
+
+
+def split_compression(path: str) -> tuple[str, Optional[str]]:
+    """Return the path without its compression suffix and the compression."""
+    stem, _, suffix = path.rpartition(".")
+    if stem and suffix.lower() in COMPRESSIONS:
+        return stem, COMPRESSIONS[suffix.lower()]
+    return path, None
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Return the compression of a file from its first bytes."""
+    with open(path, "rb") as f:
+        return sniff_compression(f.read(8))
+
+
+def sniff_compression(head: bytes) -> Optional[str]:
+    """Return the compression of a file from its first bytes."""
+    for magic, compression in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return compression
+    return None
+
+
+def sniff_format(path: str) -> LabelFormat:
+    """Return the format of a file from its content."""
+    with open_label_file(path) as (_, stream):
+        head = stream.read(SNIFF_BYTES)
+    if head.startswith(PARQUET_MAGIC):
+        return FORMATS["parquet"]
+    if head.lstrip().startswith(b"{"):
+        return FORMATS["jsonl"]
+    first_line = head.split(b"\n", 1)[0]
+    if first_line.count(b"\t") > first_line.count(b","):
+        return FORMATS["tsv"]
+    return FORMATS["csv"]
+
+
+@contextmanager
+def open_label_file(
+    path: str, mode: str = "rb", compression: Optional[str] = None
+) -> Iterator[tuple[BinaryIO, BinaryIO]]:
+    """
+    Open the file and yield the raw file and the stream of its decompressed or
+    compressed content. A file is compressed by the given compression when it
+    is written and decompressed by the compression of its content when read.
+    """
+    with open(path, mode) as raw:
+        if "r" in mode:
+            compression = sniff_compression(raw.read(8))
+            raw.seek(0)
+            if compression == "zstd":
+                # The zstd reader cannot be iterated by lines on its own.
+                stream = io.BufferedReader(_wrap_compression(raw, compression, mode))
+                try:
+                    yield raw, stream
+                finally:
+                    stream.close()
+                return
+        if compression is None:
+            yield raw, raw
+            return
+        stream = _wrap_compression(raw, compression, mode)
+        try:
+            yield raw, stream
+        finally:
+            stream.close()
+
+
+def _wrap_compression(raw: BinaryIO, compression: str, mode: str) -> BinaryIO:
+    """Return the stream that decompresses or compresses the raw file."""
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode=mode)
+    if compression == "bz2":
+        return bz2.BZ2File(raw, mode=mode)
+    if compression == "xz":
+        return lzma.LZMAFile(raw, mode=mode)
+    if compression == "zstd":
+        if not has_module("zstandard"):
+            raise ImportError("Reading and writing zstd files requires zstandard.")
+        import zstandard
+
+        if "r" in mode:
+            return zstandard.ZstdDecompressor().stream_reader(raw, closefd=False)
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+@contextmanager
+def _open_binary(source) -> Iterator[BinaryIO]:
+    """Yield the binary stream of a path or of an open stream."""
+    if isinstance(source, str):
+        with open_label_file(source) as (_, stream):
+            yield stream
+    else:
+        yield source
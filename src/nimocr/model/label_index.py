@@ -0,0 +1,248 @@
+import csv
+import io
+from typing import Callable, Optional
+
+import numpy as np
+
+# Bytes that delimit the rows of a label file.
+NEWLINE = ord("\n")
+CARRIAGE_RETURN = ord("\r")
+
+
+class LabelIndex:
+    """Byte offsets of the rows of a label file, to parse the rows on demand.
+
+    The file is memory-mapped and scanned once for the newlines that end a row,
+    skipping the newlines inside quoted fields. As in the csv module, a quote
+    only opens a field at the start of the field, and the files of a format
+    without quotes are split at every newline. Only the offsets are kept in
+    memory, so a label file larger than the memory can be opened and each row
+    is parsed with the csv module when it is read.
+
+    Attributes:
+    ----------
+    path: str
+        The path of the label file.
+    delimiter: str
+        The delimiter of the label file.
+    columns: tuple[str, ...]
+        The columns of the label file.
+    offsets: np.ndarray
+        The start of each row in the file, followed by the end of the last row.
+    """
+
+    # Number of bytes scanned between two progress reports
+    BLOCK_SIZE = 16 * 1024 * 1024
+
+    def __init__(
+        self,
+        path: str,
+        delimiter: str,
+        columns: tuple[str, ...],
+        offsets: np.ndarray,
+        data: np.memmap,
+    ) -> None:
+        """Initialize the index."""
+        self.path = path
+        self.delimiter = delimiter
+        self.columns = columns
+        self.offsets = offsets
+        self._data = data
+
+    @classmethod
+    def build(
+        cls,
+        path: str,
+        delimiter: str,
+        columns: tuple[str, ...],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        quotechar: str = '"',
+    ) -> "LabelIndex":
+        """
+        Return the index of the label file. The progress callback receives the
+        number of bytes scanned and the file size, and may raise to abort. An
+        empty quotechar means the fields are never quoted.
+        """
+        data = np.memmap(path, dtype=np.uint8, mode="r")
+        size = len(data)
+        if progress_callback is not None:
+            progress_callback(0, size)
+
+        line_ends = []
+        # The quotes that open or close a quoted field
+        toggles_before = 0
+        last_toggle = -2
+        for start in range(0, size, cls.BLOCK_SIZE):
+            block = data[start : start + cls.BLOCK_SIZE]
+            newlines = np.flatnonzero(block == NEWLINE)
+            if quotechar:
+                quotes = np.flatnonzero(block == ord(quotechar)) + start
+                toggles = cls._find_toggles(
+                    data, quotes, ord(delimiter), toggles_before % 2, last_toggle
+                )
+                if len(toggles) or toggles_before % 2:
+                    # A newline after an odd number of toggles is inside a field.
+                    quoted = np.searchsorted(toggles, newlines + start)
+                    newlines = newlines[(quoted + toggles_before) % 2 == 0]
+                toggles_before += len(toggles)
+                if len(toggles):
+                    last_toggle = int(toggles[-1])
+            line_ends.append(newlines + start + 1)
+            if progress_callback is not None:
+                progress_callback(min(start + cls.BLOCK_SIZE, size), size)
+
+        ends = np.concatenate(line_ends or [np.empty(0, dtype=np.int64)])
+        if len(ends) == 0 or ends[-1] < size:
+            # The last row has no newline.
+            ends = np.append(ends, size)
+        # The first line is the header and each line starts where the previous
+        # one ends.
+        offsets = ends.astype(np.int64)
+        lengths = np.diff(offsets)
+        candidates = np.flatnonzero(lengths <= 2)
+        first_bytes = data[offsets[candidates]]
+        blank = candidates[
+            (first_bytes == NEWLINE)
+            | ((lengths[candidates] == 2) & (first_bytes == CARRIAGE_RETURN))
+        ]
+        if len(blank):
+            # Blank lines are skipped like pandas does, so each one is merged
+            # into the byte range of the next row.
+            offsets = np.delete(offsets, blank + 1)
+        return cls(path, delimiter, columns, offsets, data)
+
+    @staticmethod
+    def _find_toggles(
+        data: np.ndarray,
+        quotes: np.ndarray,
+        delimiter: int,
+        inside: int,
+        last_toggle: int,
+    ) -> np.ndarray:
+        """
+        Return the quotes that open or close a quoted field, given whether the
+        first quote is inside a quoted field and the last toggle before it. A
+        quote opens a field at the start of the field or right after the quote
+        that closed it, which escapes a quote. Any other quote outside a quoted
+        field is a character of the field.
+        """
+        if len(quotes) == 0:
+            return quotes
+        previous = data[np.maximum(quotes - 1, 0)]
+        field_start = (
+            (quotes == 0)
+            | (previous == delimiter)
+            | (previous == NEWLINE)
+            | (previous == CARRIAGE_RETURN)
+        )
+        escape = np.empty(len(quotes), dtype=bool)
+        escape[0] = quotes[0] - 1 == last_toggle
+        escape[1:] = np.diff(quotes) == 1
+        # Every quote is a toggle if each one outside a field may open one.
+        opening = (np.arange(len(quotes)) + inside) % 2 == 0
+        if np.all(field_start[opening] | escape[opening]):
+            return quotes
+
+        toggles = []
+        for position, at_field_start in zip(quotes.tolist(), field_start.tolist()):
+            if inside or at_field_start or position - 1 == last_toggle:
+                toggles.append(position)
+                inside = not inside
+                last_toggle = position
+        return np.array(toggles, dtype=quotes.dtype)
+
+    def __len__(self) -> int:
+        """Return the number of rows."""
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the offsets."""
+        return self.offsets.nbytes
+
+    def read_rows(self, start: int, stop: int) -> list[list[str]]:
+        """Return the fields of the rows from start to stop."""
+        if not 0 <= start <= stop <= len(self):
+            raise IndexError(f"Rows {start} to {stop} are out of range.")
+        text = self._data[self.offsets[start] : self.offsets[stop]].tobytes()
+        lines = io.StringIO(text.decode("utf-8"), newline="")
+        return [row for row in csv.reader(lines, delimiter=self.delimiter) if row]
+
+    def read_row(self, index: int) -> list[str]:
+        """Return the fields of the row at the index."""
+        return self.read_rows(index, index + 1)[0]
+
+    def close(self) -> None:
+        """Release the memory map of the file."""
+        self._data = None
+
+
+class LazyColumn:
+    """Column of a label file that is parsed from the file when it is read.
+
+    Edited values are kept in an overlay that takes precedence over the file,
+    so reading a row only parses that row and the file is never rewritten.
+
+    Attributes:
+    ----------
+    index: LabelIndex
+        The index of the label file.
+    position: int
+        The position of the column in the rows.
+    convert: Optional[Callable[[str], str]]
+        The function applied to the values read from the file.
+    edits: dict[int, str]
+        The edited values by row index.
+    """
+
+    def __init__(
+        self,
+        index: LabelIndex,
+        position: int,
+        convert: Optional[Callable[[str], str]] = None,
+    ) -> None:
+        """Initialize the column."""
+        self.index = index
+        self.position = position
+        self.convert = convert
+        self.edits: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        """Return the number of values."""
+        return len(self.index)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the edits."""
+        return sum(len(value) for value in self.edits.values())
+
+    def _get_field(self, row: list[str]) -> str:
+        """Return the value of the column in the row."""
+        value = row[self.position] if self.position < len(row) else ""
+        return value if self.convert is None else self.convert(value)
+
+    def get(self, index: int) -> str:
+        """Return the value at the index."""
+        if index in self.edits:
+            return self.edits[index]
+        return self._get_field(self.index.read_row(index))
+
+    def set(self, index: int, value: str) -> None:
+        """Set the value at the index."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {index} is out of range.")
+        self.edits[index] = value
+
+    def snapshot(self) -> "LazyColumn":
+        """Return a copy that later edits do not change."""
+        column = LazyColumn(self.index, self.position, self.convert)
+        column.edits = dict(self.edits)
+        return column
+
+    def to_numpy(self) -> np.ndarray:
+        """Return every value as an object array, which parses the whole file."""
+        values = np.empty(len(self), dtype=object)
+        values[:] = [self._get_field(row) for row in self.index.read_rows(0, len(self))]
+        for index, value in self.edits.items():
+            values[index] = value
+        return values
@@ -0,0 +1,156 @@
+import math
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+class Pager:
+    """Split an ordering of rows into pages without materializing the pages.
+
+    The ordering is an array of row indices in display order, e.g. every row,
+    the rows sorted by a column or only the rows matching a filter. Removed rows
+    stay in the ordering but are marked as dead in a Fenwick tree that counts the
+    live rows, so finding a page, the page of a row or removing a row takes
+    O(log N) instead of rebuilding the pages.
+
+    Attributes:
+    ----------
+    items_per_page: int
+        The number of items per page.
+    order: np.ndarray
+        The row indices in display order, including the removed rows.
+    total_items: int
+        The number of live rows.
+    """
+
+    def __init__(
+        self, items_per_page: int, order: Optional[Iterable[int]] = None
+    ) -> None:
+        """Initialize the pager."""
+        if items_per_page < 1:
+            raise ValueError("The number of items per page must be positive.")
+        self.items_per_page = items_per_page
+        self.set_order([] if order is None else order)
+
+    @classmethod
+    def from_total(cls, items_per_page: int, total_items: int) -> "Pager":
+        """Return a pager over the rows 0 to total_items - 1 in order."""
+        return cls(items_per_page, np.arange(total_items, dtype=np.int64))
+
+    def set_order(self, order: Iterable[int]) -> None:
+        """Replace the ordering, every row of the new ordering is live."""
+        self.order = np.asarray(order, dtype=np.int64)
+        size = len(self.order)
+        # Map each row index back to its position in the ordering.
+        max_index = int(self.order.max()) + 1 if size else 0
+        self._positions = np.full(max_index, -1, dtype=np.int64)
+        self._positions[self.order] = np.arange(size, dtype=np.int64)
+        self._live = np.ones(size, dtype=bool)
+        self._tree = Pager._build_tree(self._live)
+        # The largest power of two not greater than the size, for descents.
+        self._top_bit = 1 << (size.bit_length() - 1) if size else 0
+        self.total_items = size
+
+    @staticmethod
+    def _build_tree(live: np.ndarray) -> np.ndarray:
+        """Return the 1-based Fenwick tree of the live flags in O(N)."""
+        size = len(live)
+        prefix = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(live, out=prefix[1:])
+        nodes = np.arange(1, size + 1, dtype=np.int64)
+        tree = np.zeros(size + 1, dtype=np.int64)
+        # Node i covers the positions (i - lowbit(i), i].
+        tree[1:] = prefix[nodes] - prefix[nodes - (nodes & -nodes)]
+        return tree
+
+    @property
+    def total_pages(self) -> int:
+        """Return the number of pages."""
+        return math.ceil(self.total_items / self.items_per_page)
+
+    def set_items_per_page(self, items_per_page: int) -> None:
+        """Set the number of items per page."""
+        if items_per_page < 1:
+            raise ValueError("The number of items per page must be positive.")
+        self.items_per_page = items_per_page
+
+    def contains(self, index: int) -> bool:
+        """Return whether the row index is live in the ordering."""
+        position = self._get_order_position(index)
+        return position >= 0 and bool(self._live[position])
+
+    def get_page_indices(self, page: int) -> list[int]:
+        """Return the row indices of the page, pages start at 1."""
+        if not 1 <= page <= self.total_pages:
+            return []
+        start = (page - 1) * self.items_per_page
+        stop = min(start + self.items_per_page, self.total_items)
+        return [self.get_index(position) for position in range(start, stop)]
+
+    def get_page(self, index: int) -> int:
+        """Return the page of the row index, pages start at 1."""
+        return self.get_position(index) // self.items_per_page + 1
+
+    def get_position(self, index: int) -> int:
+        """Return the position of the row index among the live rows."""
+        position = self._get_order_position(index)
+        if position < 0 or not self._live[position]:
+            raise ValueError(f"Index {index} is not in the pager.")
+        return self._prefix_sum(position)
+
+    def get_index(self, position: int) -> int:
+        """Return the row index at the position among the live rows."""
+        if not 0 <= position < self.total_items:
+            raise IndexError(f"Position {position} is out of range.")
+        # Descend the tree to the first order position with position + 1 live
+        # rows up to and including it.
+        node = 0
+        remaining = position + 1
+        bit = self._top_bit
+        while bit:
+            child = node + bit
+            if child < len(self._tree) and self._tree[child] < remaining:
+                node = child
+                remaining -= self._tree[child]
+            bit >>= 1
+        return int(self.order[node])
+
+    def remove(self, index: int) -> int:
+        """Remove the row index and return the position it had."""
+        position = self.get_position(index)
+        self._set_live(self._get_order_position(index), False)
+        return position
+
+    def restore(self, index: int) -> int:
+        """Restore a removed row index and return its position."""
+        order_position = self._get_order_position(index)
+        if order_position < 0:
+            raise ValueError(f"Index {index} is not in the pager.")
+        if not self._live[order_position]:
+            self._set_live(order_position, True)
+        return self._prefix_sum(order_position)
+
+    def _get_order_position(self, index: int) -> int:
+        """Return the position of the row index in the ordering or -1."""
+        if not 0 <= index < len(self._positions):
+            return -1
+        return int(self._positions[index])
+
+    def _prefix_sum(self, order_position: int) -> int:
+        """Return the number of live rows before the order position."""
+        total = 0
+        node = order_position
+        while node > 0:
+            total += self._tree[node]
+            node -= node & -node
+        return int(total)
+
+    def _set_live(self, order_position: int, live: bool) -> None:
+        """Mark the order position as live or dead and update the tree."""
+        self._live[order_position] = live
+        delta = 1 if live else -1
+        node = order_position + 1
+        while node < len(self._tree):
+            self._tree[node] += delta
+            node += node & -node
+        self.total_items += delta
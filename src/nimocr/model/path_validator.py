@@ -0,0 +1,182 @@
+import logging
+import os
+import os.path as op
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+
+from .row_store import PathColumn
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ValidationReport:
+    """Rows of the label file whose image cannot be opened.
+
+    Attributes:
+    ----------
+    missing: np.ndarray
+        The indices of the rows whose image file does not exist.
+    unreadable: np.ndarray
+        The indices of the rows whose directory cannot be listed, or whose path
+        is not a regular file or cannot be read.
+    total: int
+        The number of validated rows.
+    """
+
+    missing: np.ndarray
+    unreadable: np.ndarray
+    total: int
+
+    @property
+    def invalid(self) -> np.ndarray:
+        """Return the sorted indices of the missing and unreadable rows."""
+        return np.union1d(self.missing, self.unreadable)
+
+    @property
+    def is_valid(self) -> bool:
+        """Return whether every image can be opened."""
+        return len(self.missing) == 0 and len(self.unreadable) == 0
+
+    def get_summary(self) -> str:
+        """Return a short description of the report for the user."""
+        if self.is_valid:
+            return f"All {self.total} images found"
+        return (
+            f"{len(self.missing)} missing and {len(self.unreadable)} unreadable "
+            f"of {self.total} images"
+        )
+
+
+class PathValidator:
+    """Check that the image files of a label file exist.
+
+    Instead of one stat per row, every directory is listed once with
+    ``os.scandir`` and the file names of its rows are looked up in the listing.
+    Only the files found are checked for read permission. Directories are
+    listed and checked in a thread pool, which hides the latency of network
+    storage. Listings are cached with the modification time of the directory, so
+    validating again only lists the directories that changed.
+
+    Attributes:
+    ----------
+    max_workers: int
+        The number of directories listed at the same time.
+    """
+
+    def __init__(self, max_workers: int = 8) -> None:
+        """Initialize the validator."""
+        self.max_workers = max_workers
+        # Directory -> (modification time, file name -> is a regular file)
+        self._listings: dict[str, tuple[int, Optional[dict[str, bool]]]] = {}
+        self._lock = threading.Lock()
+
+    def list_directory(self, directory: str) -> Optional[dict[str, bool]]:
+        """
+        Return whether each entry of the directory is a regular file, an empty
+        listing if the directory does not exist or None if it cannot be listed.
+        """
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._listings.get(directory)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with os.scandir(directory) as entries:
+                listing = {entry.name: entry.is_file() for entry in entries}
+        except FileNotFoundError:
+            listing = {}
+        except OSError:
+            listing = None
+
+        with self._lock:
+            self._listings[directory] = (mtime, listing)
+        return listing
+
+    def check_directory(
+        self, directory: str, names: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the masks of the names of the directory that are missing and
+        that are unreadable. The permissions of a file do not change the
+        directory, so they are checked each time instead of cached.
+        """
+        listing = self.list_directory(directory)
+        if listing is None:
+            return np.zeros(len(names), dtype=bool), np.ones(len(names), dtype=bool)
+        found = [listing.get(name) for name in names]
+        missing = np.array([is_file is None for is_file in found], dtype=bool)
+        unreadable = np.array(
+            [
+                is_file is False
+                or (is_file and not os.access(op.join(directory, name), os.R_OK))
+                for name, is_file in zip(names, found)
+            ],
+            dtype=bool,
+        )
+        return missing, unreadable
+
+    def validate(
+        self,
+        paths: PathColumn,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> ValidationReport:
+        """
+        Return the report of the paths. The progress callback receives the number
+        of listed directories and the number of directories, and may raise to
+        abort the validation.
+        """
+        names = paths.names.to_numpy()
+        # Group the rows by directory.
+        order = np.argsort(paths.directory_ids, kind="stable")
+        counts = np.bincount(paths.directory_ids, minlength=len(paths.directories))
+        starts = np.concatenate(([0], np.cumsum(counts)))
+
+        missing = []
+        unreadable = []
+        total_directories = len(paths.directories)
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="validate"
+        )
+        try:
+            futures = {}
+            for directory_id, directory in enumerate(paths.directories):
+                rows = order[starts[directory_id] : starts[directory_id + 1]]
+                future = executor.submit(
+                    self.check_directory, directory or op.curdir, names[rows]
+                )
+                futures[future] = rows
+            for done, future in enumerate(as_completed(futures), start=1):
+                rows = futures[future]
+                missing_mask, unreadable_mask = future.result()
+                missing.append(rows[missing_mask])
+                unreadable.append(rows[unreadable_mask])
+                if progress_callback is not None:
+                    progress_callback(done, total_directories)
+        finally:
+            # Drop the directories that are still queued if the caller aborted.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        report = ValidationReport(
+            missing=np.sort(np.concatenate(missing or [np.empty(0, np.int64)])),
+            unreadable=np.sort(np.concatenate(unreadable or [np.empty(0, np.int64)])),
+            total=len(paths),
+        )
+        logger.info("Validated %d paths: %s", report.total, report.get_summary())
+        return report
+
+    def clear(self) -> None:
+        """Forget the cached directory listings."""
+        with self._lock:
+            self._listings.clear()
@@ -0,0 +1,111 @@
+import logging
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class ImagePrefetcher:
+    """Decode images in a worker pool before they are displayed.
+
+    A request is the tuple of arguments passed to the loader, starting with the
+    path of the image. Each call to ``schedule`` replaces the previous requests:
+    queued jobs that are no longer wanted are cancelled so fast navigation never
+    piles up work. Jobs that already started are left to finish since their result
+    still ends up in the image cache.
+
+    Attributes:
+    ----------
+    loader: Callable[..., Image.Image]
+        The function that decodes and caches the image of a request.
+    max_workers: int
+        The number of worker threads.
+    """
+
+    def __init__(
+        self, loader: Callable[..., Image.Image], max_workers: int = 2
+    ) -> None:
+        """Initialize the prefetcher."""
+        self.loader = loader
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures: dict[tuple, Future] = {}
+        self._lock = threading.RLock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Return the worker pool, creating it on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="prefetch"
+            )
+        return self._executor
+
+    def schedule(self, requests: Iterable[tuple]) -> None:
+        """Prefetch the requests in the given order and cancel outdated ones."""
+        requests = list(dict.fromkeys(requests))
+        wanted = set(requests)
+        with self._lock:
+            # Cancel the queued jobs that the user has moved away from.
+            for request, future in list(self._futures.items()):
+                if request not in wanted:
+                    future.cancel()
+
+            executor = self._get_executor()
+            for request in requests:
+                if request in self._futures:
+                    continue
+                future = executor.submit(self.loader, *request)
+                # The callback runs at once if the job is already done, so the
+                # job is stored first to be discarded.
+                self._futures[request] = future
+                future.add_done_callback(lambda f, r=request: self._discard(r, f))
+
+        logger.debug("Prefetching %d images", len(requests))
+
+    def wait(self, path: str) -> bool:
+        """
+        Wait for the running jobs of the path and return whether there was one.
+        The queued jobs of the path are cancelled instead, so the caller decodes
+        the image itself rather than waiting for the jobs queued before.
+        """
+        with self._lock:
+            futures = [
+                future
+                for request, future in self._futures.items()
+                if request[0] == path
+            ]
+            # A job that cannot be cancelled is running or done.
+            futures = [future for future in futures if not future.cancel()]
+
+        waited = False
+        for future in futures:
+            try:
+                future.result()
+                waited = True
+            except CancelledError:
+                pass
+            except Exception:
+                logger.exception("Failed to prefetch %s", path)
+        return waited
+
+    def cancel(self) -> None:
+        """Cancel every queued job."""
+        with self._lock:
+            for future in list(self._futures.values()):
+                future.cancel()
+
+    def shutdown(self) -> None:
+        """Cancel the queued jobs and stop the worker pool."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _discard(self, request: tuple, future: Future) -> None:
+        """Forget the job once it is done or cancelled."""
+        with self._lock:
+            if self._futures.get(request) is future:
+                del self._futures[request]
@@ -0,0 +1,250 @@
+import hashlib
+import logging
+import os
+import os.path as op
+import shutil
+from typing import Optional
+
+import numpy as np
+
+from .row_store import PathColumn, RowStore, StringColumn
+
+logger = logging.getLogger(__name__)
+
+
+class RowCache:
+    """Persistent cache of the prepared rows of label files.
+
+    Parsing a large label file, casting its columns and normalizing its paths
+    takes long, so the resulting row store is written next to the thumbnails as
+    one npy file per array. Reopening the file memory-maps the arrays instead of
+    parsing it. An entry is keyed by the path, size and modification time of the
+    label file and the working column names, so a changed label file is never
+    served stale, and the older entries of a label file are removed when a new
+    one is written. Reading an entry refreshes its modification time, which the
+    cache uses to evict the least recently used entries once the total size
+    exceeds the budget. The entries of label files that no longer exist are
+    removed as well.
+
+    Attributes:
+    ----------
+    directory: str
+        The directory that stores the entries.
+    min_bytes: int
+        The size from which label files are cached, smaller files are parsed
+        faster than they are cached.
+    max_bytes: int
+        The maximum total size of the entries.
+    """
+
+    # Bump when the layout of an entry changes.
+    VERSION = 1
+    DEFAULT_MIN_BYTES = 1024 * 1024
+    DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+    # File of a source directory that holds the path of its label file
+    SOURCE_FILE = "source"
+    ARRAYS = (
+        "directories_data",
+        "directories_offsets",
+        "directory_ids",
+        "names_data",
+        "names_offsets",
+        "texts_data",
+        "texts_offsets",
+        "orientations",
+    )
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        min_bytes: int = DEFAULT_MIN_BYTES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        """Initialize the cache."""
+        self.directory = directory or RowCache.default_directory()
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def default_directory() -> str:
+        """Return the row directory under the XDG cache directory."""
+        cache_home = os.environ.get("XDG_CACHE_HOME") or op.expanduser("~/.cache")
+        return op.join(cache_home, "nimocr", "rows")
+
+    @staticmethod
+    def make_key(path: str, stat: os.stat_result, column_names: tuple[str, ...]) -> str:
+        """Return the key of the rows of a label file version."""
+        source = f"{RowCache.VERSION}\0{op.abspath(path)}\0{stat.st_size}"
+        source += f"\0{stat.st_mtime_ns}\0"
+        source += "\0".join(column_names)
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def get_source_directory(self, path: str) -> str:
+        """Return the directory of the entries of a label file."""
+        source = hashlib.sha1(op.abspath(path).encode("utf-8")).hexdigest()
+        return op.join(self.directory, source)
+
+    def get(self, path: str, column_names: tuple[str, ...]) -> Optional[RowStore]:
+        """Return the cached rows of the label file or None if not cached."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        entry = op.join(
+            self.get_source_directory(path), self.make_key(path, stat, column_names)
+        )
+        if not op.isdir(entry):
+            return None
+
+        try:
+            arrays = {
+                name: np.load(op.join(entry, f"{name}.npy"), mmap_mode="r")
+                for name in RowCache.ARRAYS
+            }
+        except (OSError, ValueError):
+            logger.warning("Failed to read the cached rows of %s", path, exc_info=True)
+            return None
+
+        for name in ("directories_data", "names_data", "texts_data"):
+            # Slicing a memoryview is much cheaper than slicing a memmap.
+            arrays[name] = memoryview(arrays[name])
+        directories = StringColumn(
+            arrays["directories_data"], arrays["directories_offsets"]
+        )
+        paths = PathColumn(
+            directories.to_numpy().tolist(),
+            arrays["directory_ids"],
+            StringColumn(arrays["names_data"], arrays["names_offsets"]),
+        )
+        texts = StringColumn(arrays["texts_data"], arrays["texts_offsets"])
+        # The rotations are edited in place, so they are read into memory.
+        orientations = np.array(arrays["orientations"])
+        if not len(paths) == len(texts) == len(orientations):
+            logger.warning("Ignore the inconsistent cached rows of %s", path)
+            return None
+        try:
+            # Mark the entry as recently used.
+            os.utime(entry)
+        except OSError:
+            pass
+        logger.info("Read %d cached rows of %s", len(orientations), path)
+        return RowStore(paths, texts, orientations)
+
+    def put(
+        self,
+        path: str,
+        stat: os.stat_result,
+        column_names: tuple[str, ...],
+        rows: RowStore,
+    ) -> None:
+        """
+        Store the rows read from the version of the label file with the stat.
+        The rows must not be edited yet. The older entries of the label file
+        are removed, and the least recently used entries if the cache is full.
+        """
+        if stat.st_size < self.min_bytes:
+            return
+
+        source_directory = self.get_source_directory(path)
+        key = self.make_key(path, stat, column_names)
+        entry = op.join(source_directory, key)
+        if op.isdir(entry):
+            return
+
+        directories = StringColumn.from_strings(rows.paths.directories)
+        arrays = {
+            "directories_data": directories.data,
+            "directories_offsets": directories.offsets,
+            "directory_ids": rows.paths.directory_ids,
+            "names_data": rows.paths.names.data,
+            "names_offsets": rows.paths.names.offsets,
+            "texts_data": rows.texts.data,
+            "texts_offsets": rows.texts.offsets,
+            "orientations": rows.orientations,
+        }
+        size = sum(
+            len(array) if isinstance(array, bytes) else array.nbytes
+            for array in arrays.values()
+        )
+        if size > self.max_bytes:
+            logger.info("The rows of %s are larger than the row cache", path)
+            return
+        # Write to a temporary directory first so readers never see a partial
+        # entry.
+        temp_entry = f"{entry}.{os.getpid()}.tmp"
+        try:
+            # Keep the label file of the entries, to remove them once it is gone.
+            os.makedirs(source_directory, exist_ok=True)
+            source_file = op.join(source_directory, RowCache.SOURCE_FILE)
+            with open(source_file, "w", encoding="utf-8") as f:
+                f.write(op.abspath(path))
+            os.makedirs(temp_entry, exist_ok=True)
+            for name, array in arrays.items():
+                if isinstance(array, bytes):
+                    array = np.frombuffer(array, dtype=np.uint8)
+                np.save(op.join(temp_entry, f"{name}.npy"), array)
+            os.replace(temp_entry, entry)
+        except OSError:
+            logger.warning("Failed to cache the rows of %s", path, exc_info=True)
+            shutil.rmtree(temp_entry, ignore_errors=True)
+            return
+
+        # The entries of the previous versions of the label file are stale.
+        for name in os.listdir(source_directory):
+            if name not in (key, RowCache.SOURCE_FILE) and not name.endswith(".tmp"):
+                shutil.rmtree(op.join(source_directory, name), ignore_errors=True)
+        logger.info("Cached %d rows of %s", len(rows), path)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove the entries of the label files that no longer exist and the
+        least recently used entries until the cache fits.
+        """
+        entries = sorted(self._scan())
+        total_bytes = sum(size for _, _, size in entries)
+        for _, entry, size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_bytes -= size
+            logger.debug("Evicted the cached rows %s", entry)
+
+    def _scan(self) -> list[tuple[float, str, int]]:
+        """
+        Return the last use, directory and size of every entry, removing the
+        entries whose label file no longer exists.
+        """
+        try:
+            sources = os.listdir(self.directory)
+        except OSError:
+            return []
+        entries = []
+        for source in sources:
+            source_directory = op.join(self.directory, source)
+            try:
+                source_file = op.join(source_directory, RowCache.SOURCE_FILE)
+                with open(source_file, encoding="utf-8") as f:
+                    source_path = f.read()
+            except OSError:
+                source_path = None
+            if source_path is None or not op.exists(source_path):
+                shutil.rmtree(source_directory, ignore_errors=True)
+                continue
+            for name in os.listdir(source_directory):
+                entry = op.join(source_directory, name)
+                if name.endswith(".tmp") or not op.isdir(entry):
+                    continue
+                try:
+                    size = sum(
+                        op.getsize(op.join(entry, file_name))
+                        for file_name in os.listdir(entry)
+                    )
+                    entries.append((op.getmtime(entry), entry, size))
+                except OSError:
+                    continue
+        return entries
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,242 @@
+import os
+from typing import Callable, Iterable, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+# Terminates every string in the buffer of a StringColumn.
+TERMINATOR = "\0"
+
+
+class StringColumn:
+    """Column of strings stored as one UTF-8 buffer and an offset array.
+
+    The string at row i is ``data[offsets[i]:offsets[i + 1] - 1]``, the last byte
+    of each slot being a terminator so the whole buffer can be decoded and split
+    at once. The buffer is never rewritten: edited strings are kept in an overlay
+    that takes precedence over the buffer until the column is rebuilt.
+
+    Attributes:
+    ----------
+    data: Union[bytes, memoryview]
+        The UTF-8 encoded strings, each followed by a terminator, as bytes or as
+        a view of a memory-mapped file.
+    offsets: np.ndarray
+        The start of each string in the buffer, followed by the buffer size.
+    """
+
+    def __init__(self, data: Union[bytes, memoryview], offsets: np.ndarray) -> None:
+        """Initialize the column."""
+        self.data = data
+        self.offsets = offsets
+        self._overlay: dict[int, str] = {}
+
+    @classmethod
+    def from_strings(cls, strings: Sequence[str]) -> "StringColumn":
+        """Return the column of the strings."""
+        if len(strings) == 0:
+            return cls(b"", np.zeros(1, dtype=np.int64))
+
+        joined = TERMINATOR.join(strings) + TERMINATOR
+        data = joined.encode("utf-8")
+        terminators = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0)
+        if len(terminators) != len(strings):
+            # Some strings contain the terminator, so measure each one.
+            encoded = [string.encode("utf-8") for string in strings]
+            sizes = np.fromiter((len(value) + 1 for value in encoded), np.int64)
+            data = b"\0".join(encoded) + b"\0"
+            terminators = np.cumsum(sizes) - 1
+
+        offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+        offsets[1:] = terminators + 1
+        return cls(data, offsets)
+
+    def __len__(self) -> int:
+        """Return the number of strings."""
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the buffer and the offsets."""
+        return len(self.data) + self.offsets.nbytes
+
+    def get(self, index: int) -> str:
+        """Return the string at the index."""
+        if index in self._overlay:
+            return self._overlay[index]
+        start = self.offsets[index]
+        stop = self.offsets[index + 1] - 1
+        return bytes(self.data[start:stop]).decode("utf-8")
+
+    def set(self, index: int, value: str) -> None:
+        """Set the string at the index."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {index} is out of range.")
+        self._overlay[index] = value
+
+    def snapshot(self) -> "StringColumn":
+        """Return a copy that later edits do not change, sharing the buffer."""
+        column = StringColumn(self.data, self.offsets)
+        column._overlay = dict(self._overlay)
+        return column
+
+    def to_numpy(self) -> np.ndarray:
+        """Return the strings as an object array, including the edits."""
+        strings = bytes(self.data).decode("utf-8").split(TERMINATOR)[:-1]
+        if len(strings) != len(self):
+            # Strings containing the terminator cannot be recovered by splitting.
+            strings = [self.get(index) for index in range(len(self))]
+        values = np.empty(len(strings), dtype=object)
+        values[:] = strings
+        for index, value in self._overlay.items():
+            values[index] = value
+        return values
+
+
+class PathColumn:
+    """Column of file paths encoded as a directory id and a file name.
+
+    Label files usually hold many images per directory, so each directory is
+    stored once and every row only keeps its id and the file name. The
+    directory includes its trailing separator, so a path is the plain
+    concatenation of its directory and its name.
+
+    Attributes:
+    ----------
+    directories: list[str]
+        The distinct directories.
+    directory_ids: np.ndarray
+        The directory id of each row.
+    names: StringColumn
+        The file name of each row.
+    """
+
+    def __init__(
+        self, directories: list[str], directory_ids: np.ndarray, names: StringColumn
+    ) -> None:
+        """Initialize the column."""
+        self.directories = directories
+        self.directory_ids = directory_ids
+        self.names = names
+
+    @classmethod
+    def from_strings(cls, paths: Iterable[str]) -> "PathColumn":
+        """Return the column of the paths."""
+        parts = [path.rpartition(os.sep) for path in paths]
+        directories = [head + separator for head, separator, _ in parts]
+        directory_ids, uniques = pd.factorize(
+            np.array(directories, dtype=object), sort=False
+        )
+        return cls(
+            list(uniques),
+            directory_ids.astype(np.int32),
+            StringColumn.from_strings([name for _, _, name in parts]),
+        )
+
+    def __len__(self) -> int:
+        """Return the number of paths."""
+        return len(self.directory_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the column."""
+        directory_bytes = sum(len(directory) for directory in self.directories)
+        return directory_bytes + self.directory_ids.nbytes + self.names.nbytes
+
+    def get(self, index: int) -> str:
+        """Return the path at the index."""
+        return self.directories[self.directory_ids[index]] + self.names.get(index)
+
+    def map_directories(self, fn: Callable[[str], str]) -> "PathColumn":
+        """
+        Return the column with fn applied once to each directory. The
+        directories that fn maps to the same directory are merged.
+        """
+        mapped = np.empty(len(self.directories), dtype=object)
+        mapped[:] = [fn(directory) for directory in self.directories]
+        codes, directories = pd.factorize(mapped, sort=False)
+        return PathColumn(
+            list(directories),
+            codes.astype(np.int32)[self.directory_ids],
+            self.names,
+        )
+
+    def to_numpy(self) -> np.ndarray:
+        """Return the paths as an object array."""
+        directories = np.empty(len(self.directories), dtype=object)
+        directories[:] = self.directories
+        return directories[self.directory_ids] + self.names.to_numpy()
+
+
+class RowStore:
+    """Compact store of the columns the annotator reads and edits.
+
+    The path, text and orientation of every row are kept in arrays so that the
+    accessors are plain array reads. The other columns of the label file are
+    left in a dataframe and a full dataframe is only built when it is saved.
+
+    Attributes:
+    ----------
+    paths: PathColumn
+        The image paths.
+    texts: StringColumn
+        The labels.
+    orientations: np.ndarray
+        The counterclockwise rotation of each image in degrees.
+    """
+
+    def __init__(
+        self, paths: PathColumn, texts: StringColumn, orientations: np.ndarray
+    ) -> None:
+        """Initialize the store."""
+        self.paths = paths
+        self.texts = texts
+        self.orientations = orientations
+
+    @classmethod
+    def from_frame(
+        cls,
+        df: DataFrame,
+        path_column_name: str,
+        text_column_name: str,
+        orientation_column_name: Optional[str] = None,
+    ) -> "RowStore":
+        """Return the store of the columns of the dataframe."""
+        if orientation_column_name in df.columns:
+            orientations = df[orientation_column_name].to_numpy(dtype=np.int16)
+        else:
+            orientations = np.zeros(len(df), dtype=np.int16)
+        return cls(
+            PathColumn.from_strings(df[path_column_name].tolist()),
+            StringColumn.from_strings(df[text_column_name].tolist()),
+            orientations.copy(),
+        )
+
+    @staticmethod
+    def parse_orientations(values: pd.Series) -> np.ndarray:
+        """
+        Return the rotations of the values from 0 to 359 degrees. The values
+        that are not a finite number are read as no rotation.
+        """
+        numbers = pd.to_numeric(values, errors="coerce").to_numpy(
+            dtype=float, copy=True
+        )
+        numbers[~np.isfinite(numbers)] = 0
+        return (np.trunc(numbers) % 360).astype(np.int16)
+
+    def __len__(self) -> int:
+        """Return the number of rows."""
+        return len(self.orientations)
+
+    def snapshot(self) -> "RowStore":
+        """
+        Return a copy that later edits do not change. The buffers are never
+        rewritten, so only the edits and the rotations are copied.
+        """
+        return RowStore(self.paths, self.texts.snapshot(), self.orientations.copy())
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the store."""
+        return self.paths.nbytes + self.texts.nbytes + self.orientations.nbytes
@@ -0,0 +1,200 @@
+import copy
+import logging
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .file_handler import FileHandler
+from .label_database import LabelDatabase
+from .row_store import RowStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ImageListSnapshot:
+    """State of the image list at one moment, to be saved in the background.
+
+    Taking a snapshot only copies the edits, the rotations and the live mask,
+    the string buffers and the other columns are shared because they are never
+    written in place. Annotating can go on while the snapshot is saved, and the
+    saved file holds the rows as they were when the snapshot was taken.
+
+    Attributes:
+    ----------
+    file_handler: FileHandler
+        The handler of the label file the rows were read from.
+    df: pd.DataFrame
+        The columns of the label file that are not in the row store.
+    rows: RowStore
+        The path, text and orientation of every row.
+    live_mask: np.ndarray
+        The boolean mask of the rows that are not deleted.
+    columns: tuple[str, ...]
+        The columns of the label file.
+    path_column_name: str
+        The column name for the path.
+    text_column_name: str
+        The column name for the text.
+    orientation_column_name: str
+        The column name for the rotation of the image.
+    is_streaming: bool
+        Whether the rows are read from the label file on demand.
+    database: Optional[LabelDatabase]
+        The label database as it was when the snapshot was taken, if the rows
+        are read from a database.
+
+    Methods:
+    --------
+    to_frame() -> pd.DataFrame
+        Return the dataframe of the loaded columns, including the deleted rows.
+    save(path: str, progress_callback: Callable[[int, int], None]) -> None
+        Save the rows to a label file.
+    release() -> None
+        Release the database snapshot.
+    """
+
+    file_handler: FileHandler
+    df: pd.DataFrame
+    rows: RowStore
+    live_mask: np.ndarray
+    columns: tuple[str, ...]
+    path_column_name: str
+    text_column_name: str
+    orientation_column_name: str
+    is_streaming: bool = False
+    database: Optional[LabelDatabase] = None
+
+    @classmethod
+    def take(
+        cls,
+        file_handler: FileHandler,
+        df: pd.DataFrame,
+        rows: RowStore,
+        live_mask: np.ndarray,
+        columns: tuple[str, ...],
+        path_column_name: str,
+        text_column_name: str,
+        orientation_column_name: str,
+        is_streaming: bool = False,
+        database: Optional[LabelDatabase] = None,
+    ) -> "ImageListSnapshot":
+        """
+        Return the snapshot of the state, copying what is edited in place. A
+        label database is pinned to its current state instead of copied.
+        """
+        return cls(
+            file_handler=copy.copy(file_handler),
+            df=df,
+            rows=rows.snapshot(),
+            live_mask=live_mask.copy(),
+            columns=columns,
+            path_column_name=path_column_name,
+            text_column_name=text_column_name,
+            orientation_column_name=orientation_column_name,
+            is_streaming=is_streaming,
+            database=None if database is None else database.snapshot(),
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return the dataframe of the loaded columns, including the deleted rows."""
+        working_columns = {
+            self.path_column_name: self.rows.paths.to_numpy,
+            self.text_column_name: self.rows.texts.to_numpy,
+            self.orientation_column_name: self.rows.orientations.copy,
+        }
+        data = {}
+        for column_name in self.columns:
+            if column_name in working_columns:
+                data[column_name] = working_columns[column_name]()
+            elif column_name in self.df.columns:
+                data[column_name] = self.df[column_name]
+        return pd.DataFrame(data, index=self.df.index)
+
+    def save(
+        self,
+        path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """
+        Save the rows to a label file. The file is written next to the path and
+        moved over it once complete, so an aborted save leaves it untouched.
+        The orientation column is only saved while some rotations are still
+        pending. The progress callback receives the number of rows written and
+        the number of rows, and may raise to abort the save. The database
+        snapshot is released once saved.
+        """
+        try:
+            if self.is_streaming:
+                self._save_streaming(path, progress_callback)
+            else:
+                self._save_frame(path, progress_callback)
+        finally:
+            self.release()
+        logger.info("Saved %d rows to %s", np.count_nonzero(self.live_mask), path)
+
+    def _save_frame(
+        self, path: str, progress_callback: Optional[Callable[[int, int], None]]
+    ) -> None:
+        """Save the rows held in memory."""
+        # The dataframe is only built here, without the deleted rows.
+        df = self.to_frame()
+        column_names = list(self.columns)
+        if not self.live_mask.all():
+            df = df[self.live_mask]
+        if not df[self.orientation_column_name].any():
+            df = df.drop(columns=self.orientation_column_name)
+            column_names.remove(self.orientation_column_name)
+        df = self.file_handler.common_path(df, self.path_column_name)
+        if len(column_names) == len(df.columns):
+            self.file_handler.save(df[column_names], path, progress_callback)
+        else:
+            # Copy the columns that were not loaded from the label file.
+            self.file_handler.save_with_source(
+                df, self.live_mask, column_names, path, progress_callback
+            )
+
+    def _save_streaming(
+        self, path: str, progress_callback: Optional[Callable[[int, int], None]]
+    ) -> None:
+        """
+        Save a streamed file by copying the label file chunk by chunk with the
+        edited texts and rotations. The paths are written as in the label file.
+        """
+        live_mask = self.live_mask
+        orientations = self.rows.orientations
+        column_names = list(self.columns)
+        keep_orientation = bool(orientations[live_mask].any())
+        if not keep_orientation:
+            column_names.remove(self.orientation_column_name)
+        edits = self.rows.texts.edits
+        edited = np.array(sorted(edits), dtype=np.int64)
+
+        def update(chunk: pd.DataFrame, start: int) -> pd.DataFrame:
+            stop = start + len(chunk)
+            first, last = np.searchsorted(edited, [start, stop])
+            if last > first:
+                texts = chunk[self.text_column_name].to_numpy(dtype=object, copy=True)
+                for index in edited[first:last]:
+                    texts[index - start] = edits[index]
+                chunk[self.text_column_name] = texts
+            if keep_orientation:
+                chunk[self.orientation_column_name] = orientations[start:stop]
+            return chunk[live_mask[start:stop]]
+
+        self.file_handler.save_chunks(
+            None,
+            live_mask,
+            column_names,
+            update,
+            path,
+            progress_callback,
+            self.database,
+        )
+
+    def release(self) -> None:
+        """Release the database snapshot, so it no longer holds the old rows."""
+        if self.database is not None:
+            self.database.close()
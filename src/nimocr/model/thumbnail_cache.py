@@ -0,0 +1,331 @@
+import argparse
+import hashlib
+import logging
+import os
+import os.path as op
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+from PIL import Image, features
+
+from .file_handler import FileHandler
+from .image_handler import ImageHandler
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailCache:
+    """Persistent cache of pre-scaled images shared across sessions.
+
+    Thumbnails are stored in a content-addressed directory tree: the file name is
+    the hash of the source path, file size, modification time and thumbnail size,
+    so a changed source file is never served stale. Thumbnails exist at a few
+    standard sizes and a request is served by the smallest one that covers it.
+    Reading a thumbnail refreshes its modification time, which the cache uses to
+    evict the least recently used files once the total size exceeds the budget.
+    The size of the existing cache is measured in a background thread on the
+    first write, so writing never waits for a scan of the whole cache.
+
+    Attributes:
+    ----------
+    directory: str
+        The directory that stores the thumbnails.
+    max_bytes: int
+        The maximum total size of the thumbnail files.
+    image_format: str
+        The image format of the thumbnail files, WEBP if supported else PNG.
+    """
+
+    STANDARD_SIZES = (256, 512, 1024, 2048)
+    DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        image_format: Optional[str] = None,
+    ) -> None:
+        """Initialize the cache."""
+        self.directory = directory or ThumbnailCache.default_directory()
+        self.max_bytes = max_bytes
+        if image_format is None:
+            image_format = "WEBP" if features.check("webp") else "PNG"
+        self.image_format = image_format
+        self._total_bytes: Optional[int] = None
+        # The bytes written while the existing cache is measured
+        self._pending_bytes = 0
+        self._measuring = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def default_directory() -> str:
+        """Return the thumbnail directory under the XDG cache directory."""
+        cache_home = os.environ.get("XDG_CACHE_HOME") or op.expanduser("~/.cache")
+        return op.join(cache_home, "nimocr", "thumbnails")
+
+    @staticmethod
+    def get_thumbnail_size(target_size: tuple[int, int]) -> Optional[int]:
+        """Return the smallest standard size covering the target size, if any."""
+        for size in ThumbnailCache.STANDARD_SIZES:
+            if max(target_size) <= size:
+                return size
+        return None
+
+    @staticmethod
+    def make_key(path: str, stat: os.stat_result, thumbnail_size: int) -> str:
+        """Return the content address of a thumbnail."""
+        source = f"{op.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        source += f"\0{thumbnail_size}"
+        return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def get_file_path(self, key: str) -> str:
+        """Return the path of the thumbnail file of the key."""
+        extension = self.image_format.lower()
+        return op.join(self.directory, key[:2], f"{key}.{extension}")
+
+    def get(
+        self, path: str, stat: os.stat_result, thumbnail_size: int
+    ) -> Optional[Image.Image]:
+        """Return the cached thumbnail of the path or None if it is not cached."""
+        file_path = self.get_file_path(self.make_key(path, stat, thumbnail_size))
+        try:
+            with Image.open(file_path) as image:
+                thumbnail = image.convert("RGB")
+            # Mark the thumbnail as recently used.
+            os.utime(file_path)
+        except (OSError, SyntaxError):
+            return None
+        return thumbnail
+
+    def put(
+        self,
+        path: str,
+        stat: os.stat_result,
+        thumbnail_size: int,
+        thumbnail: Image.Image,
+    ) -> None:
+        """Store the thumbnail of the path and evict old thumbnails if needed."""
+        file_path = self.get_file_path(self.make_key(path, stat, thumbnail_size))
+        os.makedirs(op.dirname(file_path), exist_ok=True)
+        # Write to a temporary file first so readers never see a partial file.
+        temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        try:
+            thumbnail.save(temp_path, format=self.image_format)
+            os.replace(temp_path, file_path)
+        except OSError:
+            logger.warning("Failed to write thumbnail of %s", path, exc_info=True)
+            if op.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        size = op.getsize(file_path)
+        with self._lock:
+            if self._total_bytes is None:
+                # The first write of the session measures the existing cache.
+                self._pending_bytes += size
+                if not self._measuring:
+                    self._measuring = True
+                    threading.Thread(
+                        target=self._measure, name="thumbnail-measure", daemon=True
+                    ).start()
+                return
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def load(
+        self, path: str, target_size: tuple[int, int], create: bool = True
+    ) -> Optional[Image.Image]:
+        """
+        Return a thumbnail of the path covering the target size, creating it from
+        the source image if needed and create is set. Return None if there is no
+        thumbnail, the source cannot be opened or the target size is larger than
+        the largest standard size.
+        """
+        thumbnail_size = ThumbnailCache.get_thumbnail_size(target_size)
+        if thumbnail_size is None:
+            return None
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        thumbnail = self.get(path, stat, thumbnail_size)
+        if thumbnail is not None or not create:
+            return thumbnail
+        return self._create(path, stat, thumbnail_size)
+
+    def ensure(self, path: str, thumbnail_size: int) -> bool:
+        """Create the thumbnail of the path unless it is already cached."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+
+        file_path = self.get_file_path(self.make_key(path, stat, thumbnail_size))
+        if op.exists(file_path):
+            return True
+        return self._create(path, stat, thumbnail_size) is not None
+
+    def get_total_bytes(self) -> int:
+        """Return the total size of the thumbnail files."""
+        with self._lock:
+            total_bytes = self._total_bytes
+        if total_bytes is None:
+            return self._measure()
+        return total_bytes
+
+    def _measure(self) -> int:
+        """
+        Measure the existing cache without holding the lock, evict if it is
+        full and return its total size.
+        """
+        scanned_bytes = sum(size for _, _, size in self._scan())
+        with self._lock:
+            if self._total_bytes is None:
+                # A file written during the scan may be counted twice, which
+                # only makes the eviction a little early.
+                self._total_bytes = scanned_bytes + self._pending_bytes
+                self._pending_bytes = 0
+            self._measuring = False
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            return self._total_bytes
+
+    def evict(self) -> None:
+        """Remove the least recently used thumbnails until the cache fits."""
+        with self._lock:
+            self._evict()
+
+    def clear(self) -> None:
+        """Remove every thumbnail."""
+        with self._lock:
+            for _, file_path, _ in self._scan():
+                os.remove(file_path)
+            self._total_bytes = 0
+            self._pending_bytes = 0
+
+    def _create(
+        self, path: str, stat: os.stat_result, thumbnail_size: int
+    ) -> Optional[Image.Image]:
+        """Decode the source image, store its thumbnail and return it."""
+        box = (thumbnail_size, thumbnail_size)
+        image = ImageHandler.open_for_display(path, box)
+        if not isinstance(image, Image.Image):
+            return None
+        image.thumbnail(box, Image.Resampling.LANCZOS)
+        self.put(path, stat, thumbnail_size, image)
+        return image
+
+    def _evict(self) -> None:
+        """Remove the least recently used thumbnails, the lock must be held."""
+        entries = sorted(self._scan())
+        total_bytes = sum(size for _, _, size in entries)
+        # Leave some headroom so the next writes do not trigger a new scan.
+        target_bytes = int(self.max_bytes * 0.9)
+        for _, file_path, size in entries:
+            if total_bytes <= target_bytes:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                continue
+            total_bytes -= size
+        self._total_bytes = total_bytes
+        logger.info("Thumbnail cache evicted down to %d bytes", total_bytes)
+
+    def _scan(self) -> list[tuple[float, str, int]]:
+        """Return the last use time, path and size of every thumbnail file."""
+        entries = []
+        if not op.isdir(self.directory):
+            return entries
+
+        for sub_dir in os.scandir(self.directory):
+            if not sub_dir.is_dir():
+                continue
+            for entry in os.scandir(sub_dir.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # Evicted while the cache is scanned
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+
+def warm(
+    label_path: str,
+    path_column_name: str = "path",
+    sizes: tuple[int, ...] = ThumbnailCache.STANDARD_SIZES[1:3],
+    directory: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> int:
+    """
+    Create the thumbnails of every image in the label file in parallel
+    and return the number of thumbnails available in the cache.
+    """
+    file_handler = FileHandler()
+    df = file_handler.load(
+        label_path, usecols=[path_column_name], dtype={path_column_name: str}
+    )
+    df[path_column_name] = df[path_column_name].astype(str)
+    df = file_handler.normalize_path(df, path_column_name)
+    paths = df[path_column_name].unique().tolist()
+
+    cache = ThumbnailCache(directory)
+    jobs = [(path, size) for path in paths for size in sizes]
+    cached = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(cache.ensure, path, size) for path, size in jobs]
+        for done, future in enumerate(as_completed(futures), start=1):
+            if future.result():
+                cached += 1
+            if done % 1000 == 0 or done == len(futures):
+                logger.info("Warmed %d/%d thumbnails", done, len(futures))
+    return cached
+
+
+def main() -> None:
+    """Warm the thumbnail cache for a label file from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Create the thumbnails of every image in a label file."
+    )
+    parser.add_argument("label_path", help="The csv or tsv label file.")
+    parser.add_argument(
+        "--path-column", default="path", help="The column of the image paths."
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=list(ThumbnailCache.STANDARD_SIZES[1:3]),
+        choices=ThumbnailCache.STANDARD_SIZES,
+        help="The thumbnail sizes to create.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="The thumbnail directory, defaults to the XDG cache directory.",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="The number of worker threads."
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    cached = warm(
+        args.label_path,
+        path_column_name=args.path_column,
+        sizes=tuple(args.sizes),
+        directory=args.cache_dir,
+        max_workers=args.workers,
+    )
+    logger.info("Thumbnail cache is warm with %d thumbnails", cached)
+
+
+if __name__ == "__main__":
+    main()
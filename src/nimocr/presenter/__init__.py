@@ -1,3 +1,4 @@
 from .presenter import Presenter
+from .worker import Worker
 
-__all__ = ["Presenter"]
+__all__ = ["Presenter", "Worker"]
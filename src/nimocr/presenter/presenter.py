@@ -1,12 +1,16 @@
 import logging
 import os.path as op
-from datetime import datetime
+from typing import Callable, Optional
 
+import numpy as np
 import prettytable
-from PyQt6.QtCore import QObject, pyqtSlot
+from PyQt6.QtCore import QCoreApplication, QObject, QTimer, pyqtSlot
 
-from ..model import FileHandler, ImageListModel
+from ..model import ImageListModel, Pager, ValidationReport
+from ..model.edit_journal import ORIENTATION, TEXT
+from ..model.snapshot import ImageListSnapshot
 from ..view import MainWindow
+from .worker import Worker
 
 logger = logging.getLogger(__name__)
 
@@ -16,12 +20,39 @@ class Presenter(QObject):
     This class is used to connect the model and the view.
     """
 
+    # The number of pages to decode ahead of and behind the current page.
+    PREFETCH_NEXT_PAGES = 2
+    PREFETCH_PREV_PAGES = 1
+    # The interval in milliseconds at which the edit journal is written to disk.
+    JOURNAL_SYNC_INTERVAL = 1000
+
     def __init__(self, model: ImageListModel, view: MainWindow) -> None:
         super().__init__()
         self.model = model
         self.view = view
 
         self.is_loaded = False
+        # The worker of the current loading step, if a file is loading
+        self.load_worker: Optional[Worker] = None
+        # Whether the model still holds a usable file while another one loads
+        self.was_loaded = False
+        # The label file that is loading
+        self.load_path: Optional[str] = None
+        # The label file that is saving
+        self.save_path: Optional[str] = None
+        # Whether only the missing or the edited rows are shown
+        self.show_missing = False
+        self.show_edited = False
+        # The worker that checks the image paths after a file is loaded
+        self.validation_worker: Optional[Worker] = None
+        # The worker that saves a snapshot of the model, if a file is saving
+        self.save_worker: Optional[Worker] = None
+        # The snapshot that is saving
+        self.save_snapshot: Optional[ImageListSnapshot] = None
+
+        # Write the journaled edits to disk while the user is idle.
+        self.journal_timer = QTimer(self)
+        self.journal_timer.setInterval(self.JOURNAL_SYNC_INTERVAL)
 
         self.link_signals()
 
@@ -36,6 +67,12 @@ class Presenter(QObject):
         self.view.annotatorWidget.request_update_items.connect(self.refresh_widget)
 
         self.view.open_selected_file.connect(self.load_file)
+        self.view.request_cancel_load.connect(self.cancel_load)
+        self.view.request_filter_missing.connect(self.handle_filter_missing)
+        self.view.request_filter_edited.connect(self.handle_filter_edited)
+        self.view.request_export_changes.connect(self.export_changes)
+        self.view.request_undo.connect(self.handle_undo)
+        self.view.request_redo.connect(self.handle_redo)
 
         # Connect signals of MainWindow to the presenter.
         self.view.request_save_file.connect(self.save_file)
@@ -45,6 +82,15 @@ class Presenter(QObject):
             self.view.create_browse_file_dialog
         )
 
+        self.journal_timer.timeout.connect(self.model.sync_journal)
+        self.journal_timer.start()
+
+        # Stop the background workers of the model when the application quits.
+        QCoreApplication.instance().aboutToQuit.connect(self.model.close)
+        QCoreApplication.instance().aboutToQuit.connect(self.release_validation_worker)
+        # Let a running save finish so the label file is complete.
+        QCoreApplication.instance().aboutToQuit.connect(self.release_save_worker)
+
     @pyqtSlot(int)
     def handle_rotate_image(self, index: int) -> None:
         """Rotate the image 90 degree and update the view"""
@@ -55,7 +101,7 @@ class Presenter(QObject):
         # Rotate the current image.
         self.model.rotate_image(index)
         # Update the view.
-        self.refresh_widget()
+        self.refresh_item(index)
 
     @pyqtSlot(int, str)
     def handle_change_text(self, index: int, new_text: str) -> None:
@@ -66,11 +112,11 @@ class Presenter(QObject):
         logger.info("Presenter received new text: %s", new_text)
         text = self.model.get_text(index)
         self.model.change_text(index, new_text)
-        logger.info(self.model.df)
         self.view.show_message(
             f"Text change from {text} to {self.model.get_text(index)}"
         )
-        self.refresh_widget()
+        # Only the text of a single item changed.
+        self.refresh_item(index, update_image=False)
 
     @pyqtSlot(int)
     def handle_delete_item(self, index: int) -> None:
@@ -82,60 +128,385 @@ class Presenter(QObject):
         # Update backend model.
         self.model.delete_item(index)
         # Update the view.
-        ## Remove the item from the path list widget.
-        self.view.annotatorWidget.path_list_widget.remove_item(index)
-        ## Update the total items in the page widget.
-        total_items = self.model.length
-        self.view.annotatorWidget.set_total_items(total_items)
-        ## Update the indices in the page widget.
-        self.view.annotatorWidget.page_widget.remove_index(index)
+        ## Remove the index from the pages.
+        position = self.view.annotatorWidget.page_widget.remove_index(index)
+        ## Remove the row from the path list widget.
+        self.view.annotatorWidget.path_list_widget.remove_item(position)
+        self.update_missing_files()
         self.refresh_widget()
 
+    @pyqtSlot()
+    def handle_undo(self) -> None:
+        """Revert the last edit and update the view of its row."""
+        if not self.is_loaded:
+            return
+
+        logger.info("Presenter received undo request")
+        command = self.model.undo()
+        if command is None:
+            self.view.show_message("Nothing to undo")
+            return
+        self.show_command(command)
+
+    @pyqtSlot()
+    def handle_redo(self) -> None:
+        """Apply the last reverted edit again and update the view of its row."""
+        if not self.is_loaded:
+            return
+
+        logger.info("Presenter received redo request")
+        command = self.model.redo()
+        if command is None:
+            self.view.show_message("Nothing to redo")
+            return
+        self.show_command(command)
+
+    def show_command(self, command: tuple) -> None:
+        """Update the view of the row changed by an undone or redone command."""
+        operation, index = command[0], command[1]
+        page_widget = self.view.annotatorWidget.page_widget
+        if operation in (TEXT, ORIENTATION):
+            if self.view.annotatorWidget.get_item_widget(index) is None:
+                # Show the page of the row that changed.
+                page_widget.go_to_index(index)
+            else:
+                self.refresh_item(index, update_image=operation == ORIENTATION)
+            return
+
+        path_list_widget = self.view.annotatorWidget.path_list_widget
+        self.update_missing_files()
+        if self.model.is_deleted(index):
+            if page_widget.pager.contains(index):
+                position = page_widget.remove_index(index)
+                path_list_widget.remove_item(position)
+            self.refresh_widget()
+            return
+
+        try:
+            position = page_widget.restore_index(index)
+        except ValueError:
+            # The row is not shown by the current filter.
+            return
+        if not self.model.is_streaming:
+            path_list_widget.insert_item(position, self.model.get_path(index))
+        # Show the page of the restored row, which refreshes the items.
+        page_widget.go_to_index(index)
+
     @pyqtSlot(str)
     def load_file(self, path: str) -> None:
-        """Load the file and update the view"""
+        """
+        Load the file in a worker thread and update the view when the model
+        is ready. The view stays disabled while the file is loading.
+        """
         logger.info("Presenter received file path: %s", path)
-        # Load model from the file path.
-        self.model.load_file(path)
+        if self.load_worker is not None:
+            logger.info("Ignore file path, another file is loading")
+            return
+
+        self.was_loaded = self.is_loaded
+        self.release_validation_worker()
+        self.set_loading(True)
+        self.load_path = path
+        # Only read the header to ask for the columns.
+        self.start_load_worker(self.handle_columns_read, self.read_columns, path)
+
+    def read_columns(
+        self, path: str, progress_callback: Callable[[int, int], None]
+    ) -> tuple[str, ...]:
+        """Return the columns of the label file."""
+        progress_callback(0, 1)
+        return self.model.read_columns(path)
+
+    @pyqtSlot(object)
+    def handle_columns_read(self, columns: tuple[str, ...]) -> None:
+        """Ask for the columns and load the model in a worker thread."""
+        self.release_load_worker()
+        self.view.hide_progress()
         # Get the path column and text column from the user.
-        path_column, text_column = self.view.create_select_column_dialog(
-            self.model.columns
+        path_column, text_column = self.view.create_select_column_dialog(columns)
+        self.start_load_worker(
+            self.handle_model_ready,
+            self.prepare_model,
+            self.load_path,
+            path_column,
+            text_column,
         )
-        # Set the path column and text column to the model.
-        self.model.set_path_column_name(path_column)
-        self.model.set_text_column_name(text_column)
+
+    def prepare_model(
+        self,
+        path: str,
+        path_column: str,
+        text_column: str,
+        progress_callback: Callable[[int, int], None],
+    ) -> int:
+        """
+        Load the selected columns, cast the types, normalize the paths and
+        replay the edits of a previous session. Return the number of recovered
+        edits.
+        """
+        self.model.load_file(path, progress_callback, path_column, text_column)
+        # The model no longer holds the previous file.
+        self.was_loaded = False
         # Cast the types of the columns.
         self.model.cast_types()
         # Normalize the path.
         self.model.normalize_path()
+        return self.model.open_journal()
+
+    @pyqtSlot(object)
+    def handle_model_ready(self, recovered: int) -> None:
+        """Populate the view once the model is ready."""
+        self.release_load_worker()
+        self.set_loading(False)
         self.is_loaded = True
-        # Enable the actions on the toolbar.
-        self.view.activate_actions()
-        # Enable the spinbox.
-        self.view.annotatorWidget.enable()
-        self.view.annotatorWidget.set_total_items(self.model.length)
-        self.view.annotatorWidget.page_widget.reset_indices()
-        self.view.annotatorWidget.page_widget.update_label()
-
-        self.view.annotatorWidget.path_list_widget.set_paths(self.model.paths)
+        items_per_page = self.view.annotatorWidget.item_per_page
+        # The recovered edits may have deleted rows.
+        pager = Pager(items_per_page, self.model.get_live_indices())
+        self.view.annotatorWidget.set_pager(pager)
+        # Show the first page before building the path list.
+        self.refresh_widget()
+        if recovered:
+            self.view.show_message(f"Recovered {recovered} unsaved edits")
+        if self.model.is_streaming:
+            # Listing or checking every path would read the whole file.
+            self.view.annotatorWidget.path_list_widget.set_paths([])
+            self.view.show_message(
+                "Large file opened in streaming mode, the path list is disabled"
+            )
+            return
+        QTimer.singleShot(0, self.populate_path_list)
+        # Check the image paths without blocking the view.
+        self.start_validation()
+
+    def start_validation(self) -> None:
+        """Find the missing images in a worker thread."""
+        self.validation_worker = Worker(self.model.validate_paths)
+        self.validation_worker.finished.connect(self.handle_validation_finished)
+        self.validation_worker.failed.connect(self.handle_validation_failed)
+        self.validation_worker.start()
+
+    def release_validation_worker(self) -> None:
+        """Cancel the path validation and wait for its thread to stop."""
+        if self.validation_worker is not None:
+            self.validation_worker.cancel()
+            self.validation_worker.wait()
+            self.validation_worker = None
+
+    @pyqtSlot(object)
+    def handle_validation_finished(self, report: ValidationReport) -> None:
+        """Report the missing images and allow filtering them."""
+        self.release_validation_worker()
+        if report is not self.model.validation_report:
+            # The report belongs to a file that is no longer loaded.
+            return
+        logger.info("Presenter received validation report: %s", report.get_summary())
+        self.view.show_message(report.get_summary())
+        self.update_missing_files()
+
+    def update_missing_files(self) -> None:
+        """Show the number of missing images that are not deleted."""
+        report = self.model.validation_report
+        if report is None:
+            return
+        count = np.count_nonzero(self.model.live_mask[report.invalid])
+        self.view.set_missing_files(int(count))
+
+    @pyqtSlot(object)
+    def handle_validation_failed(self, error: Exception) -> None:
+        """Report that the image paths could not be checked."""
+        self.release_validation_worker()
+        self.view.show_message(f"Failed to check the image paths: {error}")
+
+    @pyqtSlot(bool)
+    def handle_filter_missing(self, checked: bool) -> None:
+        """Only show the missing images or show every image again."""
+        # Keep the state of the filter even when it is unchecked on a reload.
+        self.show_missing = checked
+        if not self.is_loaded:
+            return
+
+        logger.info("Presenter received missing files filter: %s", checked)
+        self.apply_filters()
+
+    @pyqtSlot(bool)
+    def handle_filter_edited(self, checked: bool) -> None:
+        """Only show the edited rows or show every row again."""
+        self.show_edited = checked
+        if not self.is_loaded:
+            return
+
+        logger.info("Presenter received edited rows filter: %s", checked)
+        self.apply_filters()
+
+    def apply_filters(self) -> None:
+        """Show the rows that are not deleted and pass the checked filters."""
+        indices = self.model.get_live_indices()
+        report = self.model.validation_report
+        if self.show_missing and report is not None:
+            indices = np.intersect1d(indices, report.invalid)
+        if self.show_edited:
+            # The edited rows are found without reading the rows.
+            indices = np.intersect1d(indices, self.model.get_edited_indices())
+        self.set_indices(indices)
+
+    def set_indices(self, indices: np.ndarray) -> None:
+        """Show the items at the indices, in order, in the pages and path list."""
+        items_per_page = self.view.annotatorWidget.item_per_page
+        self.view.annotatorWidget.set_pager(Pager(items_per_page, indices))
+        if not self.model.is_streaming:
+            self.view.annotatorWidget.path_list_widget.set_paths(
+                self.model.get_paths(indices)
+            )
         self.refresh_widget()
 
+    @pyqtSlot()
+    def populate_path_list(self) -> None:
+        """Fill the path list widget with the paths of the model."""
+        if self.is_loaded and not self.model.is_streaming:
+            self.view.annotatorWidget.path_list_widget.set_paths(self.model.paths)
+
+    def start_load_worker(self, on_finished: Callable, fn: Callable, *args) -> None:
+        """Run a step of the file loading in a worker thread."""
+        self.load_worker = Worker(fn, *args)
+        self.load_worker.progress.connect(self.handle_load_progress)
+        self.load_worker.finished.connect(on_finished)
+        self.load_worker.failed.connect(self.handle_load_failed)
+        self.load_worker.cancelled.connect(self.handle_load_cancelled)
+        self.load_worker.start()
+
+    def release_load_worker(self) -> None:
+        """Wait for the worker thread to stop and drop the worker."""
+        if self.load_worker is not None:
+            self.load_worker.wait()
+            self.load_worker = None
+
+    @pyqtSlot(int, int)
+    def handle_load_progress(self, done: int, total: int) -> None:
+        """Show the loading progress in the status bar."""
+        self.view.show_progress("Loading file...", done, total)
+
+    @pyqtSlot()
+    def cancel_load(self) -> None:
+        """Cancel the file loading."""
+        if self.load_worker is not None:
+            logger.info("Presenter received cancel load request")
+            self.load_worker.cancel()
+
+    @pyqtSlot()
+    def handle_load_cancelled(self) -> None:
+        """Restore the view after the loading was cancelled."""
+        self.release_load_worker()
+        self.finish_failed_load()
+        self.view.show_message("Loading cancelled")
+
+    @pyqtSlot(object)
+    def handle_load_failed(self, error: Exception) -> None:
+        """Restore the view after the loading failed."""
+        self.release_load_worker()
+        self.finish_failed_load()
+        self.view.show_message(f"Failed to load file: {error}")
+
+    def finish_failed_load(self) -> None:
+        """Go back to the previous file if the model still holds it."""
+        if self.was_loaded:
+            self.set_loading(False)
+            self.is_loaded = True
+        else:
+            self.view.hide_progress()
+
+    def set_loading(self, is_loading: bool) -> None:
+        """Disable the view while a file is loading and enable it afterwards."""
+        if is_loading:
+            self.is_loaded = False
+            # The loading worker replaces the journal of the model.
+            self.journal_timer.stop()
+            self.view.deactivate_actions()
+            self.view.annotatorWidget.disable()
+            self.view.show_progress("Loading file...", 0, 0)
+        else:
+            self.journal_timer.start()
+            self.view.hide_progress()
+            # Enable the actions on the toolbar.
+            self.view.activate_actions()
+            # Enable the spinbox.
+            self.view.annotatorWidget.enable()
+
     @pyqtSlot()
     def save_file(self) -> None:
-        """Save the file and update the view"""
+        """Save a snapshot of the model in a worker thread."""
         logger.info("Presenter received save file request")
+        if self.save_worker is not None:
+            self.view.show_message("The file is still saving")
+            return
         # Create a save filedialog and get the save path.
         label_dir = op.dirname(self.model._file_handler.path)
-        base_name = FileHandler.get_basename(self.model._file_handler.path)
-        current_time = datetime.now().strftime("%Y%m%d_%H%M")
-        save_filename = (
-            f"{base_name}_{current_time}.{self.model._file_handler.extension}"
-        )
+        save_filename = self.model._file_handler.get_save_filename()
         save_path = op.join(label_dir, save_filename)
-        save_path = self.view.create_save_file_dialog(save_path)
-        # Save model to the save path.
-        self.model.save_file(save_path)
-        self.view.show_message(f"File saved at: {save_path}")
+        save_path, bake_rotation = self.view.create_save_file_dialog(save_path)
+        if bake_rotation:
+            # The image files are rewritten before the rows are saved, so the
+            # snapshot holds the rotations that are left.
+            self.model.bake_rotations()
+            self.refresh_widget()
+        # Annotating goes on while the snapshot is written.
+        snapshot = self.model.snapshot()
+        self.save_worker = Worker(snapshot.save, save_path)
+        self.save_worker.progress.connect(self.handle_save_progress)
+        self.save_worker.finished.connect(self.handle_file_saved)
+        self.save_worker.failed.connect(self.handle_save_failed)
+        self.save_path = save_path
+        self.save_snapshot = snapshot
+        self.save_worker.start()
+        self.view.show_message("Saving file...")
+
+    def release_save_worker(self) -> None:
+        """Wait for the save to finish and drop the worker."""
+        if self.save_worker is not None:
+            self.save_worker.wait()
+            self.save_worker = None
+
+    @pyqtSlot(int, int)
+    def handle_save_progress(self, done: int, total: int) -> None:
+        """Show the saving progress in the status bar."""
+        percent = int(100 * done / total) if total > 0 else 0
+        self.view.show_message(f"Saving file... {percent}%")
+
+    @pyqtSlot(object)
+    def handle_file_saved(self, _) -> None:
+        """Report that the file is saved."""
+        self.release_save_worker()
+        # The model follows the saved file if it replaced the label file.
+        self.model.rebase_label_file(self.save_snapshot, self.save_path)
+        self.save_snapshot = None
+        self.view.show_message(f"File saved at: {self.save_path}")
+
+    @pyqtSlot(object)
+    def handle_save_failed(self, error: Exception) -> None:
+        """Report that the file could not be saved."""
+        self.release_save_worker()
+        self.save_snapshot = None
+        self.view.show_message(f"Failed to save file: {error}")
+
+    @pyqtSlot()
+    def export_changes(self) -> None:
+        """Save only the changed rows, with their original values."""
+        if not self.is_loaded:
+            return
+
+        logger.info("Presenter received export changes request")
+        label_dir = op.dirname(self.model._file_handler.path)
+        export_filename = self.model._file_handler.get_save_filename("_changes")
+        export_path = self.view.create_export_file_dialog(
+            op.join(label_dir, export_filename)
+        )
+        if not export_path:
+            return
+        try:
+            count = self.model.export_changes(export_path)
+        except (OSError, ValueError) as error:
+            self.view.show_message(f"Failed to export changes: {error}")
+            return
+        self.view.show_message(f"Exported {count} changed rows to: {export_path}")
 
     @pyqtSlot(list)
     def refresh_widget(self) -> None:
@@ -143,22 +514,26 @@ class Presenter(QObject):
         When the model state is updated,
         call this function to update the view.
         """
+        if not self.is_loaded:
+            return
+
         indices = self.view.annotatorWidget.page_widget.indices
-        logger.info(f"Refreshing widget: {indices}")
+        logger.info("Refreshing widget: %s", indices)
 
-        images = [self.model.get_image(index) for index in indices]
+        display_size = self.view.annotatorWidget.get_display_size()
+        images = [
+            self.model.get_display_image(index, display_size) for index in indices
+        ]
         texts = [self.model.get_text(index) for index in indices]
         paths = [self.model.get_path(index) for index in indices]
 
-        df = self.model.df
-        table = prettytable.PrettyTable()
-        table.field_names = ["index", "path", "text"]
-        for i in indices:
-            table.add_row([i, df["path"][i], df["text"][i]])
-
-        logger.info(f"Table: {table}")
-        logger.info(f"Texts: {texts}")
-        logger.info(f"Paths: {paths}")
+        # Building the table is only worth it when it is going to be written.
+        if logger.isEnabledFor(logging.DEBUG):
+            table = prettytable.PrettyTable()
+            table.field_names = ["index", "path", "text"]
+            for row in zip(indices, paths, texts):
+                table.add_row(row)
+            logger.debug("Table:\n%s", table)
 
         self.view.annotatorWidget.set_images(images)
         self.view.annotatorWidget.set_texts(texts)
@@ -170,3 +545,31 @@ class Presenter(QObject):
             # Set the rest of the widgets to empty.
             for i in range(rest_indices):
                 self.view.annotatorWidget.item_widgets[-1 - i].set_empty()
+
+        self.prefetch_neighbours()
+
+    def refresh_item(self, index: int, update_image: bool = True) -> None:
+        """
+        When a single item of the model is updated,
+        call this function to update only the widget that displays it.
+        """
+        widget = self.view.annotatorWidget.get_item_widget(index)
+        if widget is None:
+            # The item is not on the current page.
+            return
+
+        logger.info("Refreshing item: %d", index)
+        if update_image:
+            display_size = self.view.annotatorWidget.get_display_size()
+            widget.set_image(self.model.get_display_image(index, display_size))
+        widget.set_text(self.model.get_text(index))
+        widget.set_path(self.model.get_path(index))
+
+    def prefetch_neighbours(self) -> None:
+        """Decode the images of the pages around the current page in background."""
+        page_widget = self.view.annotatorWidget.page_widget
+        indices = page_widget.get_neighbour_indices(
+            self.PREFETCH_NEXT_PAGES, self.PREFETCH_PREV_PAGES
+        )
+        display_size = self.view.annotatorWidget.display_size
+        self.model.prefetch(indices, display_size)
@@ -0,0 +1,74 @@
+import logging
+from typing import Callable
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+logger = logging.getLogger(__name__)
+
+
+class Worker(QObject):
+    """
+    Run a function in its own QThread and report back through signals.
+
+    The function is called with a ``progress_callback(done, total)`` keyword
+    argument. Calling it emits the progress signal and is also where the work
+    stops when the worker has been cancelled.
+
+    Signals:
+    --------
+        progress (int, int): The amount of work done and the total amount.
+        finished (object): The result of the function.
+        failed (object): The exception raised by the function.
+        cancelled (): The function stopped because the worker was cancelled.
+    """
+
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+    def __init__(self, fn: Callable, *args, **kwargs) -> None:
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.is_cancelled = False
+        self._thread = QThread()
+        self.moveToThread(self._thread)
+        self._thread.started.connect(self.run)
+
+    def start(self) -> None:
+        """Start the function in the worker thread."""
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """Ask the function to stop at its next progress report."""
+        self.is_cancelled = True
+
+    def wait(self) -> None:
+        """Block until the worker thread has finished."""
+        self._thread.wait()
+
+    def _report_progress(self, done: int, total: int) -> None:
+        """Emit the progress or stop the function if the worker is cancelled."""
+        if self.is_cancelled:
+            raise InterruptedError("The work was cancelled")
+        self.progress.emit(done, total)
+
+    @pyqtSlot()
+    def run(self) -> None:
+        """Run the function and emit its outcome."""
+        try:
+            result = self.fn(
+                *self.args, progress_callback=self._report_progress, **self.kwargs
+            )
+        except InterruptedError:
+            logger.info("Worker cancelled")
+            self.cancelled.emit()
+        except Exception as e:
+            logger.exception("Worker failed")
+            self.failed.emit(e)
+        else:
+            self.finished.emit(result)
+        finally:
+            self._thread.quit()
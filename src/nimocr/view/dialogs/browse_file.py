@@ -9,7 +9,18 @@ class BrowseFileDialog(QFileDialog):
         self.setWindowTitle("Open File")
         self.setDirectory("")
         self.setFileMode(QFileDialog.FileMode.ExistingFile)
-        # Filter only csv and tsv files at the same time
-        self.setNameFilters(["CSV (*.csv)", "TSV (*.tsv)"])
+        # Filter the label file formats, compressed or not
+        self.setNameFilters(
+            [
+                "Label files (*.csv *.tsv *.jsonl *.ndjson *.parquet *.gz *.bz2 "
+                "*.xz *.zst *.sqlite *.db)",
+                "CSV (*.csv *.csv.gz *.csv.bz2 *.csv.xz *.csv.zst)",
+                "TSV (*.tsv *.tsv.gz *.tsv.bz2 *.tsv.xz *.tsv.zst)",
+                "JSON Lines (*.jsonl *.ndjson *.jsonl.gz *.jsonl.zst)",
+                "Parquet (*.parquet)",
+                "SQLite projects (*.sqlite *.sqlite3 *.db)",
+                "All files (*)",
+            ]
+        )
         self.setAcceptMode(QFileDialog.AcceptMode.AcceptOpen)
         self.setModal(True)
@@ -1,6 +1,12 @@
 import logging
 
-from PyQt6.QtWidgets import QDialog, QFormLayout, QLineEdit, QPushButton
+from PyQt6.QtWidgets import (
+    QCheckBox,
+    QDialog,
+    QFormLayout,
+    QLineEdit,
+    QPushButton,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -9,6 +15,8 @@ class SaveDialog(QDialog):
     """SaveDialog has a line_edit which will set a default file path to save.
     This path is given when initialized. If user edit and press the submit button,
     the save_path will be saved in the dialog's attribute..
+    The check box lets the user write the pending rotations into the image files,
+    its state is saved in the bake_rotation attribute.
     """
 
     def __init__(self, parent=None, default_path: str = None):
@@ -16,16 +24,21 @@ class SaveDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Save File")
         self.save_path = default_path
+        self.bake_rotation = False
 
         self.path_line_edit = QLineEdit()
         self.path_line_edit.setText(default_path)
 
+        self.bake_rotation_check_box = QCheckBox("Apply rotations to image files")
+        self.bake_rotation_check_box.setChecked(self.bake_rotation)
+
         self.submit_button = QPushButton("Submit")
         self.submit_button.clicked.connect(self.accept)
 
         layout = QFormLayout()
         layout.setFieldGrowthPolicy(QFormLayout.FieldGrowthPolicy.ExpandingFieldsGrow)
         layout.addRow("Save Path:", self.path_line_edit)
+        layout.addRow(self.bake_rotation_check_box)
         layout.addWidget(self.submit_button)
         self.setLayout(layout)
 
@@ -38,4 +51,5 @@ class SaveDialog(QDialog):
         """Set the save_path and close the dialog."""
         logger.info("Save dialog accepted")
         self.save_path = self.path_line_edit.text()
+        self.bake_rotation = self.bake_rotation_check_box.isChecked()
         super().accept()
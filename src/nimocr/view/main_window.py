@@ -2,7 +2,16 @@ import logging
 
 from PyQt6.QtCore import QEvent, pyqtSignal
 from PyQt6.QtGui import QIcon
-from PyQt6.QtWidgets import QLineEdit, QMainWindow, QMenuBar, QSpinBox, QStatusBar
+from PyQt6.QtWidgets import (
+    QFileDialog,
+    QLineEdit,
+    QMainWindow,
+    QMenuBar,
+    QProgressBar,
+    QPushButton,
+    QSpinBox,
+    QStatusBar,
+)
 
 from .dialogs import FileDialog, SaveDialog, SelectColumnDialog
 from .message_boxs import AboutMessageBox
@@ -18,6 +27,12 @@ class MainWindow(QMainWindow):
     request_delete_item = pyqtSignal(int)
     request_change_text = pyqtSignal(int, str)
     request_create_file_dialog = pyqtSignal()
+    request_cancel_load = pyqtSignal()
+    request_filter_missing = pyqtSignal(bool)
+    request_filter_edited = pyqtSignal(bool)
+    request_export_changes = pyqtSignal()
+    request_undo = pyqtSignal()
+    request_redo = pyqtSignal()
 
     def __init__(self) -> None:
         super().__init__()
@@ -55,6 +70,18 @@ class MainWindow(QMainWindow):
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
 
+        # Add progress bar and cancel button, shown only while loading
+        self.progressBar = QProgressBar()
+        self.progressBar.setMaximumWidth(200)
+        self.progressBar.setRange(0, 100)
+        self.progressBar.hide()
+        self.statusBar.addPermanentWidget(self.progressBar)
+
+        self.cancelButton = QPushButton("Cancel")
+        self.cancelButton.clicked.connect(self.request_cancel_load.emit)
+        self.cancelButton.hide()
+        self.statusBar.addPermanentWidget(self.cancelButton)
+
     def _setup_toolbar(self) -> None:
         """Add toolbar to the main window."""
         self.toolBar = self.addToolBar("Tools")
@@ -71,6 +98,37 @@ class MainWindow(QMainWindow):
         self.saveAction.setEnabled(False)
         self.saveAction.triggered.connect(self.request_save_file.emit)
 
+        # Add undo and redo buttons on tool bar
+        self.undoAction = self.toolBar.addAction("Undo")
+        self.undoAction.setShortcut("Ctrl+Z")
+        self.undoAction.setEnabled(False)
+        self.undoAction.triggered.connect(self.request_undo.emit)
+
+        self.redoAction = self.toolBar.addAction("Redo")
+        self.redoAction.setShortcut("Ctrl+Shift+Z")
+        self.redoAction.setEnabled(False)
+        self.redoAction.triggered.connect(self.request_redo.emit)
+
+        # Add missing files filter on tool bar, available once paths are validated
+        self.missingAction = self.toolBar.addAction("Missing files")
+        self.missingAction.setCheckable(True)
+        self.missingAction.setEnabled(False)
+        self.missingAction.setToolTip("Only show the images that cannot be opened")
+        self.missingAction.toggled.connect(self.request_filter_missing.emit)
+
+        # Add edited rows filter on tool bar
+        self.editedAction = self.toolBar.addAction("Edited")
+        self.editedAction.setCheckable(True)
+        self.editedAction.setEnabled(False)
+        self.editedAction.setToolTip("Only show the images whose label was changed")
+        self.editedAction.toggled.connect(self.request_filter_edited.emit)
+
+        # Add export of the changed rows on tool bar
+        self.exportAction = self.toolBar.addAction("Export changes")
+        self.exportAction.setEnabled(False)
+        self.exportAction.setToolTip("Save only the changed rows to a file")
+        self.exportAction.triggered.connect(self.request_export_changes.emit)
+
         self.addToolBar(self.toolBar)
 
     def load_file(self) -> None:
@@ -102,28 +160,75 @@ class MainWindow(QMainWindow):
         if file_dialog.filename is None:
             logger.info("No file is selected")
         else:
-            logger.info(f"File selected: {file_dialog.filename}")
+            logger.info("File selected: %s", file_dialog.filename)
             # Request to load the file
             self.open_selected_file.emit(file_dialog.filename)
 
-    def create_save_file_dialog(self, save_path: str) -> str:
+    def create_save_file_dialog(self, save_path: str) -> tuple[str, bool]:
         """Create a save file dialog."""
         logger.info("Launch save dialog to select the save path")
         # Launch save file dialog for user to save the file.
         save_dialog = SaveDialog(self, save_path)
         save_dialog.exec()
 
-        logger.info(f"Save path: {save_dialog.save_path}")
-        return save_dialog.save_path
+        logger.info("Save path: %s", save_dialog.save_path)
+        return (save_dialog.save_path, save_dialog.bake_rotation)
+
+    def create_export_file_dialog(self, export_path: str) -> str:
+        """Create an export file dialog, return an empty path if cancelled."""
+        logger.info("Launch export dialog to select the export path")
+        export_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Changes", export_path
+        )
+        logger.info("Export path: %s", export_path)
+        return export_path
 
     def show_message(self, message: str) -> None:
         """Set the status message."""
         self.statusBar.showMessage(message, msecs=2000)
 
+    def show_progress(self, message: str, done: int, total: int) -> None:
+        """Show the progress of a long running task in the status bar."""
+        self.statusBar.showMessage(message)
+        self.progressBar.setValue(int(100 * done / total) if total > 0 else 0)
+        self.progressBar.show()
+        self.cancelButton.show()
+
+    def hide_progress(self) -> None:
+        """Hide the progress bar and the cancel button."""
+        self.progressBar.hide()
+        self.cancelButton.hide()
+        self.statusBar.clearMessage()
+
     def activate_actions(self) -> None:
         """Enable the actions on the toolbar."""
         logger.info("Enable actions on the toolbar")
         self.saveAction.setEnabled(True)
+        self.undoAction.setEnabled(True)
+        self.redoAction.setEnabled(True)
+        self.editedAction.setEnabled(True)
+        self.exportAction.setEnabled(True)
+
+    def deactivate_actions(self) -> None:
+        """Disable the actions that need a loaded file."""
+        logger.info("Disable actions on the toolbar")
+        self.saveAction.setEnabled(False)
+        self.undoAction.setEnabled(False)
+        self.redoAction.setEnabled(False)
+        self.editedAction.setChecked(False)
+        self.editedAction.setEnabled(False)
+        self.exportAction.setEnabled(False)
+        self.set_missing_files(0)
+
+    def set_missing_files(self, count: int) -> None:
+        """Show the number of missing files and allow filtering them."""
+        if count == 0:
+            # Leave the filter before it becomes unavailable.
+            self.missingAction.setChecked(False)
+            self.missingAction.setText("Missing files")
+        else:
+            self.missingAction.setText(f"Missing files ({count})")
+        self.missingAction.setEnabled(count > 0)
 
     def eventFilter(self, obj, event):
         """Filter the event of the click event."""
@@ -1,13 +1,18 @@
 import logging
+import math
+from typing import TYPE_CHECKING, Optional
 
 import numpy as np
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtCore import QEvent, Qt, pyqtSignal
 from PyQt6.QtWidgets import QLayout, QSplitter, QVBoxLayout, QWidget
 
 from .item import ItemWidget
 from .page import PageWidget
 from .path import PathListWidget
 
+if TYPE_CHECKING:
+    from ...model.pager import Pager
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,8 +40,14 @@ class AnnotatorWidget(QWidget):
             Set the texts in the text widgets.
         set_paths(paths: list[str]) -> None:
             Set the paths in the text widgets.
+        set_pager(pager: Pager) -> None:
+            Set the pager that splits the items into pages.
         set_indices(indices: list[int], total: int) -> None:
             Set the index and total in the index label.
+        get_display_size() -> tuple[int, int]:
+            Return the size the images should be decoded for.
+        get_item_widget(item_index: int) -> Optional[ItemWidget]:
+            Return the item widget that displays the item index.
     """
 
     request_rotate_image = pyqtSignal(int)
@@ -44,10 +55,16 @@ class AnnotatorWidget(QWidget):
     request_delete_item = pyqtSignal(int)
     request_update_items = pyqtSignal(list)
 
+    # Display sizes are rounded up to this step so that small layout changes
+    # neither change the image cache keys nor trigger a new decode.
+    DISPLAY_SIZE_STEP = 256
+
     def __init__(self, item_per_page: int = 3) -> None:
         super().__init__()
         # Set the item per page
         self.item_per_page = item_per_page
+        # Set the size the displayed images were decoded for
+        self.display_size = (self.DISPLAY_SIZE_STEP, self.DISPLAY_SIZE_STEP)
         # Set layout.
         layout = QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
@@ -94,7 +111,7 @@ class AnnotatorWidget(QWidget):
         # Add path list widget to the left side of the splitter
         self.path_list_widget = PathListWidget()
         self.path_list_widget.setMinimumWidth(200)
-        self.path_list_widget.selected_index.connect(self.page_widget.go_to_index)
+        self.path_list_widget.selected_index.connect(self.page_widget.go_to_position)
 
         self.splitter.addWidget(self.path_list_widget)
         self.splitter.addWidget(item_widget)
@@ -108,9 +125,9 @@ class AnnotatorWidget(QWidget):
         """Link signals with widget signals."""
         self.page_widget.request_update_items.connect(self.request_update_items)
 
-    def set_total_items(self, total: int) -> None:
-        """Set the total number of items."""
-        self.page_widget.set_total_items(total)
+    def set_pager(self, pager: "Pager") -> None:
+        """Set the pager that splits the items into pages."""
+        self.page_widget.set_pager(pager)
 
     def set_image(self, index: int, image: np.ndarray) -> None:
         """Set the image in the image widget."""
@@ -128,6 +145,13 @@ class AnnotatorWidget(QWidget):
         """Set the index and total in the index label."""
         self.item_widgets[index].set_index(item_index)
 
+    def get_item_widget(self, item_index: int) -> Optional[ItemWidget]:
+        """Return the item widget that displays the item index, if any."""
+        for widget in self.item_widgets:
+            if widget.index == item_index:
+                return widget
+        return None
+
     def set_images(self, images: np.ndarray) -> None:
         """Set the images in the image widgets."""
         for widget, image in zip(self.item_widgets, images):
@@ -152,6 +176,27 @@ class AnnotatorWidget(QWidget):
         for index, widget in zip(indices, self.item_widgets):
             widget.set_index(index)
 
+    def get_display_size(self) -> tuple[int, int]:
+        """
+        Return the size the images should be decoded for. The size only grows
+        so that images decoded earlier are never upscaled on screen.
+        """
+        step = self.DISPLAY_SIZE_STEP
+        width, height = self.display_size
+        for widget in self.item_widgets:
+            widget_width, widget_height = widget.image_widget.get_display_size()
+            width = max(width, math.ceil(widget_width / step) * step)
+            height = max(height, math.ceil(widget_height / step) * step)
+        self.display_size = (width, height)
+        return self.display_size
+
+    def resizeEvent(self, event: QEvent) -> None:
+        """Request sharper images when the widgets outgrow the decoded size."""
+        super().resizeEvent(event)
+        display_size = self.display_size
+        if self.page_widget.total_pages > 0 and self.get_display_size() != display_size:
+            self.request_update_items.emit(self.page_widget.indices)
+
     def disable(self) -> None:
         """Disable the widget."""
         self.path_list_widget.disable()
@@ -0,0 +1,73 @@
+from typing import Union
+
+import numpy as np
+from PIL import Image
+from PyQt6.QtGui import QImage
+
+
+class QImageConverter:
+    """
+    Convert images to QImage without copying the pixels.
+
+    The returned QImage only borrows the buffer of the array, so the caller must
+    keep the array alive for as long as the QImage is used.
+    """
+
+    FORMATS = {
+        1: QImage.Format.Format_Grayscale8,
+        3: QImage.Format.Format_RGB888,
+        4: QImage.Format.Format_RGBA8888,
+    }
+
+    # PIL modes that do not map to a QImage format and the mode to convert to.
+    PIL_CONVERSIONS = {
+        "1": "L",
+        "P": "RGBA",
+        "PA": "RGBA",
+        "LA": "RGBA",
+        "I": "L",
+        "I;16": "L",
+        "F": "L",
+        "CMYK": "RGB",
+        "YCbCr": "RGB",
+        "HSV": "RGB",
+        "RGBX": "RGB",
+    }
+
+    @staticmethod
+    def to_array(image: Union[Image.Image, np.ndarray]) -> np.ndarray:
+        """Return the pixels as a C-contiguous uint8 grayscale, RGB or RGBA array."""
+        if isinstance(image, Image.Image):
+            mode = QImageConverter.PIL_CONVERSIONS.get(image.mode)
+            if mode is not None:
+                image = image.convert(mode)
+            image = np.asarray(image)
+
+        if image.dtype != np.uint8:
+            raise ValueError(f"Unsupported image dtype: {image.dtype}")
+        if image.ndim == 3 and image.shape[2] == 1:
+            image = image[:, :, 0]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        if channels not in QImageConverter.FORMATS:
+            raise ValueError(f"Unsupported number of channels: {channels}")
+        # Rows may be padded but the pixels of a row must be packed.
+        width = image.shape[1]
+        packed = image.strides[-1] == 1 and image.strides[1] == channels
+        if not packed or image.strides[0] < width * channels:
+            image = np.ascontiguousarray(image)
+        return image
+
+    @staticmethod
+    def to_qimage(image: Union[Image.Image, np.ndarray]) -> tuple[QImage, np.ndarray]:
+        """Return the QImage and the array that backs its pixels."""
+        array = QImageConverter.to_array(image)
+        height, width = array.shape[:2]
+        channels = 1 if array.ndim == 2 else array.shape[2]
+        qimage = QImage(
+            array.data,
+            width,
+            height,
+            array.strides[0],
+            QImageConverter.FORMATS[channels],
+        )
+        return qimage, array
@@ -1,9 +1,11 @@
 import logging
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Union
 
+import numpy as np
 from PIL import Image
-from PyQt6.QtCore import QEvent, QMimeData, QPoint, Qt
-from PyQt6.QtGui import QAction, QImage, QPixmap
+from PyQt6.QtCore import QEvent, QMimeData, QPoint, QSize, Qt, QTimer
+from PyQt6.QtGui import QAction, QPixmap
 from PyQt6.QtWidgets import (
     QApplication,
     QLabel,
@@ -14,6 +16,8 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
+from .converter import QImageConverter
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,12 +25,21 @@ class ImageWidget(QWidget):
     """
     ImageWidget for displaying images.
 
+    The widget keeps the source pixmap and a few smoothly scaled copies of it.
+    While the widget is being resized, a fast scaled preview is shown and the
+    smooth rescale only runs once the size settles.
+
     Attributes:
     ----------
         image: The image to be displayed.
         path: The path of the image.
     """
 
+    # Delay of the smooth rescale after the last resize event
+    RESCALE_DELAY_MS = 150
+    # Number of scaled pixmaps kept per widget
+    MAX_SCALED_PIXMAPS = 4
+
     def __init__(
         self, image: Optional[Image.Image] = None, path: Optional[str] = None
     ) -> None:
@@ -34,6 +47,16 @@ class ImageWidget(QWidget):
         self._label = QLabel(self)
         self.image = image
         self.path = path
+        # The array backing the pixels of the displayed QImage
+        self._buffer: Optional[np.ndarray] = None
+        # The unscaled pixmap and its smoothly scaled copies by target size
+        self._source_pixmap: Optional[QPixmap] = None
+        self._scaled_pixmaps: OrderedDict[tuple[int, int], QPixmap] = OrderedDict()
+        # Coalesce the smooth rescales of consecutive resize events
+        self._rescale_timer = QTimer(self)
+        self._rescale_timer.setSingleShot(True)
+        self._rescale_timer.setInterval(self.RESCALE_DELAY_MS)
+        self._rescale_timer.timeout.connect(self._update_image)
         # self.setStyleSheet("border: 1px solid black;")
         self._label.setSizePolicy(
             QSizePolicy.Policy.Expanding, QSizePolicy.Policy.MinimumExpanding
@@ -48,22 +71,29 @@ class ImageWidget(QWidget):
 
         logger.info("Image widget initialized")
 
-    def set_image(self, image: Image.Image) -> None:
-        """Set the image in the imageWidget."""
+    def set_image(self, image: Union[Image.Image, np.ndarray, Exception]) -> None:
+        """Set the image in the imageWidget, or the error if it cannot be opened."""
         logger.info("Image widget received image")
-        self.image = image.convert("RGB")
-
-        qImg = QImage(
-            image.tobytes(),
-            image.width,
-            image.height,
-            image.width * 3,  # Assuming RGB
-            QImage.Format.Format_RGB888,
-        )
-        pixmap = QPixmap.fromImage(qImg)
-        self._label.setPixmap(pixmap)
+        if not isinstance(image, (Image.Image, np.ndarray)):
+            # The model reports an image that cannot be opened with its error.
+            self.set_empty()
+            self._label.setText(f"Cannot open image: {image}")
+            return
+        self.image = image
+
+        # Wrap the pixels without copying them, the buffer must outlive the QImage.
+        qImg, self._buffer = QImageConverter.to_qimage(image)
+        self._source_pixmap = QPixmap.fromImage(qImg)
+        self._scaled_pixmaps.clear()
         self._update_image()
 
+    def get_display_size(self) -> tuple[int, int]:
+        """Return the size of the image area in device pixels."""
+        ratio = self.devicePixelRatioF()
+        width = int(self._label.width() * ratio)
+        height = int(self._label.height() * ratio)
+        return (width, height)
+
     def set_path(self, path: str) -> None:
         """Set the path of the image."""
         logger.info("Image widget received path")
@@ -71,7 +101,7 @@ class ImageWidget(QWidget):
 
     def _show_menu(self, pos: QPoint) -> None:
         """Show the right click menu."""
-        logger.info(f"Image widget received right click at {pos}")
+        logger.info("Image widget received right click at %s", pos)
         # Create the menu
         menu = QMenu(self)
         # Create copy action
@@ -90,8 +120,10 @@ class ImageWidget(QWidget):
     def _copy_image(self) -> None:
         """Copy the image to the clipboard."""
         logger.info("Image widget received copy image request")
+        if self._source_pixmap is None:
+            return
         data = QMimeData()
-        data.setImageData(self._label.pixmap().toImage())
+        data.setImageData(self._source_pixmap.toImage())
         clipboard = QApplication.clipboard()
         clipboard.setMimeData(data)
 
@@ -104,32 +136,56 @@ class ImageWidget(QWidget):
         msg.setText(f"Path: {self.path}")
         msg.exec()
 
-    def _update_image(self) -> None:
-        """Update the image in the imageWidget."""
-        if self.image is None:
+    def _get_target_size(self) -> QSize:
+        """Return the size of the scaled pixmap in device pixels."""
+        ratio = self.devicePixelRatioF()
+        width = max(self._label.width() - 5, 5)
+        height = max(self._label.height() - 5, 5)
+        return QSize(int(width * ratio), int(height * ratio))
+
+    def _update_image(self, preview: bool = False) -> None:
+        """
+        Scale the source pixmap to fit the label. A preview uses the fast
+        transformation and is not cached.
+        """
+        if self._source_pixmap is None:
             return
 
-        # Resize pixmap to fit the label
-        pixmap = self._label.pixmap()
-        width, height = self._label.width(), self._label.height()
-        scaled_pixmap = pixmap.scaled(
-            width - 5,
-            max(height - 5, 5),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation,
-        )
+        target_size = self._get_target_size()
+        key = (target_size.width(), target_size.height())
+        scaled_pixmap = self._scaled_pixmaps.get(key)
+        if scaled_pixmap is not None:
+            self._scaled_pixmaps.move_to_end(key)
+        else:
+            transformation = (
+                Qt.TransformationMode.FastTransformation
+                if preview
+                else Qt.TransformationMode.SmoothTransformation
+            )
+            scaled_pixmap = self._source_pixmap.scaled(
+                target_size, Qt.AspectRatioMode.KeepAspectRatio, transformation
+            )
+            scaled_pixmap.setDevicePixelRatio(self.devicePixelRatioF())
+            if not preview:
+                self._scaled_pixmaps[key] = scaled_pixmap
+                if len(self._scaled_pixmaps) > self.MAX_SCALED_PIXMAPS:
+                    self._scaled_pixmaps.popitem(last=False)
         self._label.setPixmap(scaled_pixmap)
 
     def resizeEvent(self, event: QEvent) -> None:
-        """Handle the resize event."""
-        logger.info("Image widget resized")
-        self._update_image()
+        """Show a fast preview and rescale smoothly once the resize settles."""
         super().resizeEvent(event)
+        self._update_image(preview=True)
+        self._rescale_timer.start()
 
     def set_empty(self) -> None:
         """Set the widget to be empty."""
         logger.info("Image widget set to empty")
         self.image = Image.new("RGB", (10, 10), (255, 255, 255))
+        self._buffer = None
+        self._source_pixmap = None
+        self._scaled_pixmaps.clear()
+        self._rescale_timer.stop()
         self._label.clear()
 
 
@@ -135,20 +135,29 @@ class ItemWidget(QWidget):
 
     def _delete_item(self) -> None:
         """Emit the request_delete_item signal."""
+        if self.index is None:
+            return
+
         confirm_dialog = ConfirmDeleteMessageBox(self)
         result = confirm_dialog.exec()
 
         if result == QMessageBox.StandardButton.Yes:
-            logger.info(f"Delete item request sent for index: {self.index}")
+            logger.info("Delete item request sent for index: %s", self.index)
             self.request_delete_item.emit(self.index)
 
     def _rotate_image(self) -> None:
         """Emit the request_image_rotate signal."""
+        if self.index is None:
+            return
+
         logger.info("Rotate image request sent")
         self.request_rotate_image.emit(self.index)
 
     def _change_text(self, text: str) -> None:
         """Emit the request_change_text signal."""
+        if self.index is None:
+            return
+
         logger.info("Change text request sent")
         self.request_change_text.emit(self.index, text)
 
@@ -172,6 +181,7 @@ class ItemWidget(QWidget):
 
     def set_empty(self) -> None:
         """Set the widget to be empty."""
+        self.index = None
         self.image_widget.set_empty()
         self.text_widget.setText("")
         self.path_label.setText("")
@@ -1,8 +1,12 @@
 import logging
+from typing import TYPE_CHECKING, Optional
 
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtWidgets import QHBoxLayout, QLabel, QPushButton, QSpinBox, QStyle, QWidget
 
+if TYPE_CHECKING:
+    from ...model.pager import Pager
+
 logger = logging.getLogger(__name__)
 
 
@@ -10,7 +14,7 @@ class PageWidget(QWidget):
     """
     PageWidget is a widget that displays a button to navigate to the previous page or the next page.
     The widget also displays the item per page, current page, and total page.
-    The widget accepts total items and items per page as arguments and it will act as the controller
+    The widget accepts a pager that splits the rows into pages and it will act as the controller
     to navigate through the pages.
     The left-most button is a spinbox that allows the user to change the items per page.
     The center widget is a group of two buttons that allows the user to navigate to the previous page or the next page.
@@ -26,49 +30,56 @@ class PageWidget(QWidget):
             The number of items per page.
         current_page: int
             The current page.
+        pager: Optional[Pager]
+            The pager that maps the pages to the indices of the items.
 
     Methods:
     --------
-        set_total_items(total_items: int) -> None:
-            Set the total items.
-        set_items_per_page(items_per_page: int) -> None:
-            Set the items per page.
+        set_pager(pager: Pager) -> None:
+            Set the pager and go back to the first page.
         go_to_page(page: int) -> None:
             Go to the specified page.
+        go_to_index(index: int) -> None:
+            Go to the page that contains the specified index.
+        go_to_position(position: int) -> None:
+            Go to the page that contains the item at the specified position.
+        remove_index(index: int) -> int:
+            Remove the index from the pages and return its position.
+        restore_index(index: int) -> int:
+            Restore a removed index in the pages and return its position.
         next_page() -> None:
             Go to the next page.
         prev_page() -> None:
             Go to the previous page.
+        get_page_indices(page: int) -> list[int]:
+            Return the indices of the items in the specified page.
+        get_neighbour_indices(next_pages: int, prev_pages: int) -> list[int]:
+            Return the indices of the pages around the current page.
     """
 
     request_update_items = pyqtSignal(list)
 
-    def __init__(self, items_per_page: int, total_items: int = 0) -> None:
+    def __init__(self, items_per_page: int, pager: Optional["Pager"] = None) -> None:
         """Initialize the PageWidget."""
         super().__init__()
         self.items_per_page = items_per_page
-        self.total_items = total_items
-
         self.current_page = 1
-        self._page = []
-
-        if self.total_items > 0 and self.items_per_page > 0:
-            self.reset_indices()
+        self.pager = None
 
         self.initUI()
+        if pager is not None:
+            self.set_pager(pager)
         self.disable()
 
         logger.info("PageWidget initialized")
 
-    def reset_indices(self) -> list[list[int]]:
-        """Return the indices of the items in each page."""
-        indices = []
-        for i in range(0, self.total_items, self.items_per_page):
-            indices.append(
-                list(range(i, min(i + self.items_per_page, self.total_items)))
-            )
-        self._page = indices
-        logger.info(f"Indices: {self._page}")
+    def set_pager(self, pager: "Pager") -> None:
+        """Set the pager and go back to the first page."""
+        pager.set_items_per_page(self.items_per_page)
+        self.pager = pager
+        self.current_page = 1
+        self.update_label()
+        logger.info("Split %d items into %d pages", self.total_items, self.total_pages)
 
     def initUI(self) -> None:
         """Set up the user interface."""
@@ -117,28 +128,47 @@ class PageWidget(QWidget):
     @property
     def indices(self) -> list[int]:
         """Return the indices."""
-        return self._page[self.current_page - 1]
+        return self.get_page_indices(self.current_page)
+
+    def get_page_indices(self, page: int) -> list[int]:
+        """Return the indices of the items in the specified page."""
+        if self.pager is None:
+            return []
+        return self.pager.get_page_indices(page)
+
+    def get_neighbour_indices(self, next_pages: int, prev_pages: int) -> list[int]:
+        """
+        Return the indices of the pages around the current page,
+        ordered from the most to the least likely to be visited next.
+        """
+        indices = []
+        for offset in range(1, max(next_pages, prev_pages) + 1):
+            if offset <= next_pages:
+                indices += self.get_page_indices(self.current_page + offset)
+            if offset <= prev_pages:
+                indices += self.get_page_indices(self.current_page - offset)
+        return indices
+
+    @property
+    def total_items(self) -> int:
+        """Return the total items."""
+        return 0 if self.pager is None else self.pager.total_items
 
     @property
     def total_pages(self) -> int:
         """Return the total pages."""
-        return len(self._page)
+        return 0 if self.pager is None else self.pager.total_pages
 
     def _handle_spinbox(self, text: str) -> None:
         """Handle spinbox text value before emitting the signal."""
         page = int(text)
         self.go_to_page(page)
-        logger.info(f"Page spinbox value changed to {page}")
-
-    def set_total_items(self, total_items: int) -> None:
-        """Set the total items."""
-        # Update the total items
-        self.total_items = total_items
+        logger.info("Page spinbox value changed to %s", page)
 
     def update_label(self) -> None:
         # Update the label and spinbox
         self.total_page_label.setText(f"/{self.total_pages}")
-        self.page_spinbox.setRange(1, self.total_pages)
+        self.page_spinbox.setRange(1, max(self.total_pages, 1))
 
         # Ensure the current page is within the valid range
         if self.current_page > self.total_pages and self.total_pages > 0:
@@ -147,9 +177,9 @@ class PageWidget(QWidget):
         # Update the page spinbox value
         self.page_spinbox.setValue(self.current_page)
 
-        logger.info(f"Total items: {self.total_items}")
-        logger.info(f"Total pages: {self.total_pages}")
-        logger.info(f"Current page: {self.current_page}")
+        logger.info("Total items: %s", self.total_items)
+        logger.info("Total pages: %s", self.total_pages)
+        logger.info("Current page: %s", self.current_page)
 
     def go_to_page(self, page: int) -> None:
         """Go to the specified page."""
@@ -158,50 +188,41 @@ class PageWidget(QWidget):
             # Request to update items
             self.request_update_items.emit(self.indices)
 
-            logger.info(f"Go to page {page}")
-            logger.info(f"Current page: {self.current_page}")
-            logger.info(f"Indices: {self.indices}")
+            logger.info("Go to page %s", page)
+            logger.info("Current page: %s", self.current_page)
+            logger.info("Indices: %s", self.indices)
 
     def go_to_index(self, index: int) -> None:
         """Go to the page that contains the specified index."""
-        # Find which page contains the index
-        page_index = None
-        for i, page in enumerate(self._page):
-            if index in page:
-                page_index = i
-                break
-        self.current_page = page_index + 1
+        if self.pager is None or not self.pager.contains(index):
+            return
+        self.current_page = self.pager.get_page(index)
         self.page_spinbox.setValue(self.current_page)
         # Update indices and request to update items
         self.request_update_items.emit(self.indices)
 
-    def remove_index(self, index_to_remove: int) -> None:
-        """Remove the index from the page and shift the indices."""
-        logger.info(f"Removing index {index_to_remove}")
-        logger.info(f"Pages: {self._page}")
-        # Flatten the list of pages into a single list
-        flat_list = [item for sublist in self._page for item in sublist]
-
-        # Remove the specified index
-        flat_list.remove(index_to_remove)
-
-        # Reshape the list back into pages
-        new_pages = []
-        for i in range(0, len(flat_list), self.items_per_page):
-            new_pages.append(flat_list[i : i + self.items_per_page])
+    def go_to_position(self, position: int) -> None:
+        """Go to the page that contains the item at the specified position."""
+        if self.pager is None or not 0 <= position < self.total_items:
+            return
+        self.go_to_index(self.pager.get_index(position))
 
-        # Remove empty page if it exists at the end
-        if new_pages and not new_pages[-1]:
-            new_pages.pop()
-
-        self._page = new_pages
+    def remove_index(self, index_to_remove: int) -> int:
+        """Remove the index from the pages and return its position."""
+        logger.info("Removing index %s", index_to_remove)
+        position = self.pager.remove(index_to_remove)
         # Make sure the current page is within the valid range
-        if self.current_page > self.total_pages:
-            self.current_page = self.total_pages
-            self.page_spinbox.setValue(self.current_page)
-            self.update_label()
+        self.update_label()
+
+        logger.info("Total pages after removing index: %d", self.total_pages)
+        return position
 
-        logger.info(f"Pages after removing index: {self._page}")
+    def restore_index(self, index_to_restore: int) -> int:
+        """Restore a removed index in the pages and return its position."""
+        logger.info("Restoring index %s", index_to_restore)
+        position = self.pager.restore(index_to_restore)
+        self.update_label()
+        return position
 
     def next_page(self) -> None:
         """Go to the next page."""
@@ -212,8 +233,8 @@ class PageWidget(QWidget):
             self.request_update_items.emit(self.indices)
 
             logger.info("Next page button clicked")
-            logger.info(f"Current page: {self.current_page}")
-            logger.info(f"Indices: {self.indices}")
+            logger.info("Current page: %s", self.current_page)
+            logger.info("Indices: %s", self.indices)
 
     def prev_page(self) -> None:
         """Go to the previous page."""
@@ -224,8 +245,8 @@ class PageWidget(QWidget):
             self.request_update_items.emit(self.indices)
 
             logger.info("Previous page button clicked")
-            logger.info(f"Current page: {self.current_page}")
-            logger.info(f"Indices: {self.indices}")
+            logger.info("Current page: %s", self.current_page)
+            logger.info("Indices: %s", self.indices)
 
     def disable(self) -> None:
         """Disable the buttons."""
@@ -250,10 +271,10 @@ if __name__ == "__main__":
     # Enable logging
     logging.basicConfig(level=logging.INFO)
 
-    item_per_page = 4
-    total_items = 100
+    # The Pager name is only imported for type checking.
+    from nimocr.model import pager
 
-    page_widget = PageWidget(10, 100)
+    page_widget = PageWidget(10, pager.Pager.from_total(10, 100))
     page_widget.enable()
     page_widget.show()
 
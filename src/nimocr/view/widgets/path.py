@@ -1,17 +1,79 @@
 import logging
 from typing import Optional
 
-from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt, pyqtSignal
 from PyQt6.QtGui import QFont
-from PyQt6.QtWidgets import QApplication, QListWidget, QListWidgetItem
+from PyQt6.QtWidgets import (
+    QAbstractItemView,
+    QApplication,
+    QHeaderView,
+    QTableView,
+)
 
 logger = logging.getLogger(__name__)
 
 
-class PathListWidget(QListWidget):
+class PathListModel(QAbstractListModel):
+    """
+    PathListModel exposes a list of paths to a list view.
+    The view only asks for the rows it displays, so no item is created per path.
+
+    Attributes:
+    ----------
+        paths: list[str]
+            The paths to display, owned by the model.
+    """
+
+    def __init__(self, paths: Optional[list[str]] = None) -> None:
+        """Initialize the PathListModel."""
+        super().__init__()
+        self.paths = paths if paths is not None else []
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        """Return the number of paths."""
+        if parent.isValid():
+            return 0
+        return len(self.paths)
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        """Return the path of the row for the display and tooltip roles."""
+        if not index.isValid() or index.row() >= len(self.paths):
+            return None
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return self.paths[index.row()]
+        return None
+
+    def set_paths(self, paths: list[str]) -> None:
+        """Replace the paths."""
+        self.beginResetModel()
+        self.paths = paths
+        self.endResetModel()
+
+    def insert_path(self, row: int, path: str) -> None:
+        """Insert the path at the row."""
+        if not 0 <= row <= len(self.paths):
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.paths.insert(row, path)
+        self.endInsertRows()
+
+    def remove_path(self, row: int) -> None:
+        """Remove the path at the row."""
+        if not 0 <= row < len(self.paths):
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.paths[row]
+        self.endRemoveRows()
+
+
+class PathListWidget(QTableView):
     """
     PathListWidget is a widget that displays a list of paths.
     User can click on a path to select it.
+    The paths are held by a PathListModel and every row has the same fixed
+    height, so loading and scrolling do not depend on the number of paths.
+    A single column table is used because a list view lays out every row
+    through the model, even with uniform item sizes.
 
     Signals:
     --------
@@ -23,36 +85,43 @@ class PathListWidget(QListWidget):
     def __init__(self, paths: Optional[list[str]] = None) -> None:
         """Initialize the PathListWidget."""
         super().__init__()
-        self.paths = paths
-        self.init_items()
-
-    def init_items(self) -> None:
-        """Set up the user interface."""
-        if self.paths is not None:
-            font = QFont("IBM Plex Sans Thai", 12)
-            self.items: list[QListWidgetItem] = []
-            for path in self.paths:
-                item = QListWidgetItem(path)
-                item.setFont(font)
-                self.addItem(item)
-                self.items.append(item)
-
-            self.itemClicked.connect(self.on_item_clicked)
+        self.path_model = PathListModel(paths)
+        self.setModel(self.path_model)
+        self.setFont(QFont("IBM Plex Sans Thai", 12))
+        self.setShowGrid(False)
+        self.setWordWrap(False)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.horizontalHeader().hide()
+        self.horizontalHeader().setStretchLastSection(True)
+        self.verticalHeader().hide()
+        # Every row has the same height.
+        self.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 6)
+        self.clicked.connect(self.on_item_clicked)
+
+    @property
+    def paths(self) -> list[str]:
+        """Return the displayed paths."""
+        return self.path_model.paths
 
     def set_paths(self, paths: list[str]) -> None:
         """Set the paths to be displayed."""
-        self.clear()
-        self.paths = paths
-        self.init_items()
+        self.path_model.set_paths(paths)
 
-    def on_item_clicked(self) -> None:
+    def on_item_clicked(self, index: QModelIndex) -> None:
         """Emit the selected_index signal when an item is clicked."""
-        logger.info(f"PathListWidget: Selected index: {self.currentRow()}")
-        self.selected_index.emit(self.currentRow())
+        logger.info("PathListWidget: Selected index: %s", index.row())
+        self.selected_index.emit(index.row())
 
     def remove_item(self, index: int) -> None:
         """Remove an item from the widget."""
-        self.takeItem(index)
+        self.path_model.remove_path(index)
+
+    def insert_item(self, index: int, path: str) -> None:
+        """Insert an item in the widget."""
+        self.path_model.insert_path(index, path)
 
     def disable(self) -> None:
         """Disable the widget."""
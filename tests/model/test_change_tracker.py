@@ -0,0 +1,51 @@
+from nimocr.model.change_tracker import DELETED, ROTATED, TEXT_CHANGED, ChangeTracker
+
+
+def test_set_text():
+    changes = ChangeTracker(3)
+
+    changes.set_text(1, "new", "old")
+    changes.set_text(1, "newer", "new")
+
+    assert changes.get_changed().tolist() == [1]
+    assert changes.get_original_text(1, "newer") == "old"
+    assert changes.get_original_text(0, "same") == "same"
+
+    # Setting the original text back leaves the row unchanged.
+    changes.set_text(1, "old", "newer")
+    assert len(changes) == 0
+
+
+def test_flags():
+    changes = ChangeTracker(4)
+
+    changes.set_text(0, "new", "old")
+    changes.set_orientation(1, 90, 0)
+    changes.set_deleted(2, True)
+    changes.set_deleted(3, True)
+    changes.set_deleted(3, False)
+
+    assert changes.get_changed().tolist() == [0, 1, 2]
+    assert changes.get_changed(TEXT_CHANGED | ROTATED).tolist() == [0, 1]
+    assert changes.get_changed(DELETED).tolist() == [2]
+    assert changes.get_original_orientation(1, 90) == 0
+
+    changes.set_orientation(1, 0, 90)
+    assert changes.get_changed(ROTATED).tolist() == []
+
+
+def test_bake_orientation():
+    changes = ChangeTracker(2)
+
+    changes.set_orientation(0, 90, 0)
+    changes.bake_orientation(0, 90)
+    changes.set_orientation(0, 0, 90)
+
+    # The row stays rotated from its original image file.
+    assert changes.get_changed(ROTATED).tolist() == [0]
+    assert changes.get_original_orientation(0, 0) == 0
+    assert changes.get_total_orientation(0, 0) == 90
+
+    # Rotating the baked image back leaves the row unchanged.
+    changes.set_orientation(0, 270, 0)
+    assert changes.get_changed(ROTATED).tolist() == []
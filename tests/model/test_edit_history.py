@@ -0,0 +1,34 @@
+from nimocr.model.edit_history import EditHistory
+
+
+def test_undo_redo():
+    history = EditHistory()
+    history.push(("t", 0, "a", "b"))
+    history.push(("d", 1))
+
+    assert history.undo() == ("d", 1)
+    assert history.undo() == ("t", 0, "a", "b")
+    assert history.undo() is None
+    assert history.redo() == ("t", 0, "a", "b")
+    assert history.can_redo
+
+    # A new command cannot be followed by the undone ones.
+    history.push(("o", 2, 0, 90))
+    assert not history.can_redo
+    assert history.redo() is None
+
+
+def test_history_is_bounded():
+    history = EditHistory(max_commands=3)
+    for index in range(5):
+        history.push(("d", index))
+
+    assert [history.undo() for _ in range(4)] == [("d", 4), ("d", 3), ("d", 2), None]
+
+
+def test_paused():
+    history = EditHistory()
+    with history.paused():
+        history.push(("d", 0))
+
+    assert not history.can_undo
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from nimocr.model.edit_journal import DELETE, ORIENTATION, RESTORE, TEXT, EditJournal
+
+HEADER = {"size": 10, "mtime_ns": 1, "rows": 5, "columns": ["path", "text"]}
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / "labels.csv.journal")
+
+
+def test_replay(journal_path):
+    journal = EditJournal(journal_path, HEADER)
+    journal.open()
+    journal.append(TEXT, 0, "first")
+    journal.append(TEXT, 0, "second")
+    journal.append(ORIENTATION, 1, 90)
+    journal.append(DELETE, 2)
+    journal.append(DELETE, 3)
+    journal.append(RESTORE, 3)
+    journal.close()
+
+    replayed = EditJournal(journal_path, HEADER)
+    replayed.open()
+
+    assert replayed.texts == {0: "second"}
+    assert replayed.orientations == {1: 90}
+    assert replayed.deleted == {2}
+    assert replayed.records == 6
+
+
+def test_replay_drops_truncated_record(journal_path):
+    journal = EditJournal(journal_path, HEADER)
+    journal.open()
+    journal.append(TEXT, 0, "kept")
+    journal.close()
+    with open(journal_path, "ab") as f:
+        f.write(b'["t", 1, "cut')
+
+    replayed = EditJournal(journal_path, HEADER)
+    replayed.open()
+    replayed.append(TEXT, 2, "after")
+    replayed.close()
+
+    again = EditJournal(journal_path, HEADER)
+    again.open()
+    assert again.texts == {0: "kept", 2: "after"}
+
+
+def test_journal_of_another_version_is_moved_aside(journal_path):
+    journal = EditJournal(journal_path, HEADER)
+    journal.open()
+    journal.append(TEXT, 0, "old")
+    journal.close()
+
+    changed = EditJournal(journal_path, {**HEADER, "mtime_ns": 2})
+    changed.open()
+
+    assert changed.is_empty
+    assert os.path.exists(f"{journal_path}.stale")
+
+
+def test_compact(journal_path, monkeypatch):
+    monkeypatch.setattr(EditJournal, "COMPACT_RECORDS", 10)
+    journal = EditJournal(journal_path, HEADER)
+    journal.open()
+    for number in range(20):
+        journal.append(TEXT, 0, str(number))
+    journal.append(DELETE, 4)
+    assert journal.should_compact()
+
+    journal.sync()
+    size = os.path.getsize(journal_path)
+    journal.compact()
+    journal.append(ORIENTATION, 1, 180)
+    journal.close()
+
+    assert os.path.getsize(journal_path) < size
+    replayed = EditJournal(journal_path, HEADER)
+    replayed.open()
+    assert replayed.texts == {0: "19"}
+    assert replayed.orientations == {1: 180}
+    assert replayed.deleted == {4}
+    assert replayed.records == 3
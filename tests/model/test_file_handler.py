@@ -1,10 +1,12 @@
 import os
 from tempfile import NamedTemporaryFile
 
+import numpy as np
 import pandas as pd
 import pytest
 
 from nimocr.model import FileHandler
+from nimocr.model.row_store import PathColumn
 
 
 @pytest.fixture
@@ -32,6 +34,7 @@ def test_get_quotechar():
 
 def test_get_extension():
     assert FileHandler.get_extension("/path/to/file.txt") == "txt"
+    assert FileHandler.get_extension("/path/to/labels.tsv.gz") == "tsv"
 
 
 def test_load_and_save(file_handler):
@@ -57,3 +60,186 @@ def test_load_and_save(file_handler):
     finally:
         # Clean up the temporary file
         os.remove(temp_file_path)
+
+
+def test_load_with_progress(file_handler, tmp_path, monkeypatch):
+    monkeypatch.setattr(FileHandler, "CHUNK_SIZE", 2)
+    path = str(tmp_path / "labels.csv")
+    df = pd.DataFrame({"path": [f"{i}.png" for i in range(5)], "text": list("abcde")})
+    df.to_csv(path, index=False)
+
+    reports = []
+    loaded_df = file_handler.load(path, lambda done, total: reports.append(done))
+
+    pd.testing.assert_frame_equal(df, loaded_df)
+    assert reports[0] == 0
+    assert reports[-1] == os.path.getsize(path)
+    assert reports == sorted(reports)
+
+
+def test_load_aborted_by_progress(file_handler, tmp_path):
+    path = str(tmp_path / "labels.csv")
+    pd.DataFrame({"path": ["0.png"], "text": ["a"]}).to_csv(path, index=False)
+
+    def abort(done, total):
+        raise InterruptedError
+
+    with pytest.raises(InterruptedError):
+        file_handler.load(path, abort)
+
+
+def test_read_header(tmp_path):
+    path = str(tmp_path / "labels.tsv")
+    df = pd.DataFrame({"path": [f"{i}.png" for i in range(5)], "text": list("abcde")})
+    df.to_csv(path, sep="\t", index=False)
+
+    header = FileHandler.read_header(path, nrows=2)
+
+    assert list(header.columns) == ["path", "text"]
+    assert len(header) == 2
+
+
+def test_load_columns(file_handler, tmp_path):
+    path = str(tmp_path / "labels.csv")
+    df = pd.DataFrame({"id": [1, 2], "path": ["0.png", "1.png"], "text": ["7", "b"]})
+    df.to_csv(path, index=False)
+
+    loaded_df = file_handler.load(path, usecols=["text"], dtype={"text": str})
+
+    assert list(loaded_df.columns) == ["text"]
+    assert loaded_df["text"].tolist() == ["7", "b"]
+
+
+def test_save_with_source(file_handler, tmp_path, monkeypatch):
+    monkeypatch.setattr(FileHandler, "CHUNK_SIZE", 2)
+    path = str(tmp_path / "labels.csv")
+    pd.DataFrame(
+        {
+            "id": ["001", "002", "003", "004", "005"],
+            "path": [f"{i}.png" for i in range(5)],
+            "note": ["x", "NA", "", "y", "z"],
+        }
+    ).to_csv(path, index=False)
+    file_handler.load(path, usecols=["path"])
+    live_mask = np.array([True, False, True, True, False])
+    df = pd.DataFrame({"path": ["a.png", "c.png", "d.png"]})
+
+    # Saving over the label file reads it while it is replaced.
+    file_handler.save_with_source(df, live_mask, ["id", "path", "note"], path)
+
+    saved_df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    assert saved_df["id"].tolist() == ["001", "003", "004"]
+    assert saved_df["path"].tolist() == ["a.png", "c.png", "d.png"]
+    assert saved_df["note"].tolist() == ["x", "", "y"]
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_save_with_source_rejects_changed_file(file_handler, tmp_path):
+    path = str(tmp_path / "labels.csv")
+    output_path = str(tmp_path / "output.csv")
+    pd.DataFrame({"id": [1, 2], "path": ["0.png", "1.png"]}).to_csv(path, index=False)
+    file_handler.load(path, usecols=["path"])
+    df = pd.DataFrame({"path": ["0.png"]})
+
+    with pytest.raises(ValueError):
+        file_handler.save_with_source(
+            df, np.ones(1, dtype=bool), ["id", "path"], output_path
+        )
+    assert not os.path.exists(output_path)
+
+
+def test_load_compressed_with_progress(file_handler, tmp_path, monkeypatch):
+    monkeypatch.setattr(FileHandler, "CHUNK_SIZE", 2)
+    path = str(tmp_path / "labels.tsv.gz")
+    df = pd.DataFrame({"path": [f"{i}.png" for i in range(5)], "text": list("abcde")})
+    df.to_csv(path, sep="\t", index=False)
+
+    reports = []
+    loaded_df = file_handler.load(path, lambda done, total: reports.append(done))
+
+    pd.testing.assert_frame_equal(df, loaded_df)
+    assert reports[-1] == os.path.getsize(path)
+    assert not FileHandler.can_index(path)
+
+
+def test_save_converts_format(file_handler, tmp_path):
+    path = str(tmp_path / "labels.csv")
+    output_path = str(tmp_path / "labels.jsonl.gz")
+    df = pd.DataFrame({"id": [1, 2], "path": ["0.png", "1.png"]})
+    df.to_csv(path, index=False)
+    file_handler.load(path)
+
+    file_handler.save(df, output_path)
+
+    pd.testing.assert_frame_equal(df, pd.read_json(output_path, lines=True))
+
+
+def test_save_with_source_jsonl(file_handler, tmp_path):
+    path = str(tmp_path / "labels.jsonl")
+    pd.DataFrame(
+        {"id": ["001", "002", "003"], "path": ["a", "b", "c"], "score": [1, 2, 3]}
+    ).to_json(path, orient="records", lines=True)
+    file_handler.load(path, usecols=["path"])
+
+    df = pd.DataFrame({"path": ["a", "edited"]})
+    live_mask = np.array([True, False, True])
+    file_handler.save_with_source(df, live_mask, ["id", "path", "score"], path)
+
+    saved_df = pd.read_json(path, lines=True, dtype=False)
+    assert saved_df.to_dict("records") == [
+        {"id": "001", "path": "a", "score": 1},
+        {"id": "003", "path": "edited", "score": 3},
+    ]
+
+
+def test_normalize_path(file_handler):
+    file_handler.path = os.path.join("/data", "labels", "train.csv")
+    df = pd.DataFrame(
+        {"path": ["a.png", "../images/b.png", "./sub//c.png", "sub/..", "/abs/d.png"]}
+    )
+
+    df = file_handler.normalize_path(df, "path")
+
+    assert df["path"].tolist() == [
+        os.path.normpath(os.path.join("/data/labels", path))
+        for path in ["a.png", "../images/b.png", "./sub//c.png", "sub/..", "/abs/d.png"]
+    ]
+
+
+def test_normalize_column(file_handler):
+    file_handler.path = os.path.join("/data", "labels", "train.csv")
+    paths = [
+        "a.png",
+        "../images/b.png",
+        "./sub//c.png",
+        "sub/..",
+        "/abs/d.png",
+        "e.png",
+    ]
+
+    column = file_handler.normalize_column(PathColumn.from_strings(paths))
+
+    assert column.to_numpy().tolist() == [
+        os.path.normpath(os.path.join("/data/labels", path)) for path in paths
+    ]
+    # The paths of the same directory share it.
+    assert column.directory_ids[0] == column.directory_ids[5]
+
+
+def test_common_path(file_handler):
+    df = pd.DataFrame(
+        {"path": ["/data/images/a/1.png", "/data/images/b/2.png", "/data/images/3.png"]}
+    )
+
+    df = file_handler.common_path(df, "path")
+
+    assert df["path"].tolist() == ["a/1.png", "b/2.png", "3.png"]
+
+
+def test_common_path_keeps_input(file_handler):
+    df = pd.DataFrame({"path": ["/data/images/a/1.png", "/data/images/b/2.png"]})
+
+    relative = file_handler.common_path(df, "path")
+
+    assert relative["path"].tolist() == ["a/1.png", "b/2.png"]
+    assert df["path"].tolist() == ["/data/images/a/1.png", "/data/images/b/2.png"]
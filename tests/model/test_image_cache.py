@@ -0,0 +1,66 @@
+import pytest
+from PIL import Image
+
+from nimocr.model.image_cache import ImageCache
+
+
+@pytest.fixture
+def image_cache():
+    # Room for exactly two 10x10 RGB images
+    return ImageCache(max_bytes=600)
+
+
+def test_get_miss_and_hit(image_cache):
+    image = Image.new("RGB", (10, 10), "white")
+    key = ImageCache.make_key("a.jpg", 1)
+
+    assert image_cache.get(key) is None
+    image_cache.put(key, image)
+    assert image_cache.get(key) is image
+
+    assert image_cache.hits == 1
+    assert image_cache.misses == 1
+    assert image_cache.current_bytes == 300
+
+
+def test_evict_least_recently_used(image_cache):
+    keys = [ImageCache.make_key(f"{i}.jpg", 1) for i in range(3)]
+    image_cache.put(keys[0], Image.new("RGB", (10, 10)))
+    image_cache.put(keys[1], Image.new("RGB", (10, 10)))
+    # Touch the first image so the second one becomes the oldest
+    image_cache.get(keys[0])
+    image_cache.put(keys[2], Image.new("RGB", (10, 10)))
+
+    assert keys[0] in image_cache
+    assert keys[1] not in image_cache
+    assert keys[2] in image_cache
+    assert image_cache.current_bytes == 600
+
+
+def test_skip_image_larger_than_capacity(image_cache):
+    key = ImageCache.make_key("big.jpg", 1)
+    image_cache.put(key, Image.new("RGB", (100, 100)))
+
+    assert len(image_cache) == 0
+    assert image_cache.current_bytes == 0
+
+
+def test_invalidate_all_variants(image_cache):
+    image_cache.put(ImageCache.make_key("a.jpg", 1), Image.new("L", (10, 10)))
+    image_cache.put(ImageCache.make_key("a.jpg", 2), Image.new("L", (10, 10)))
+    image_cache.put(ImageCache.make_key("b.jpg", 1), Image.new("L", (10, 10)))
+
+    image_cache.invalidate("a.jpg")
+
+    assert len(image_cache) == 1
+    assert image_cache.current_bytes == 100
+
+
+def test_set_max_bytes_evicts(image_cache):
+    image_cache.put(ImageCache.make_key("a.jpg", 1), Image.new("RGB", (10, 10)))
+    image_cache.put(ImageCache.make_key("b.jpg", 1), Image.new("RGB", (10, 10)))
+
+    image_cache.set_max_bytes(300)
+
+    assert len(image_cache) == 1
+    assert ImageCache.make_key("b.jpg", 1) in image_cache
@@ -60,3 +60,86 @@ def test_fit(image_handler):
 
     # Check if the fitted image has the expected size
     assert fitted_image.size == (50, 50)
+
+
+def test_open_for_display_jpeg(image_handler, tmp_path):
+    # Create a sample JPEG image
+    image_path = str(tmp_path / "image.jpg")
+    Image.new("RGB", (1600, 800), "white").save(image_path)
+
+    # Decode the image to fit a small widget
+    image = image_handler.open_for_display(image_path, target_size=(200, 200))
+
+    # Check the image is reduced but still covers the fitted size
+    assert image.mode == "RGB"
+    assert 200 <= image.width < 400
+    assert 100 <= image.height < 200
+
+
+def test_open_for_display_png(image_handler, tmp_path):
+    # Create a sample PNG image
+    image_path = str(tmp_path / "image.png")
+    Image.new("L", (1000, 1000), "white").save(image_path)
+
+    # Decode the image to fit a small widget
+    image = image_handler.open_for_display(image_path, target_size=(300, 300))
+
+    # Check the image is reduced by a whole factor
+    assert image.mode == "RGB"
+    assert image.size == (334, 334)
+
+
+def test_open_for_display_without_target_size(image_handler, tmp_path):
+    # Create a sample PNG image
+    image_path = str(tmp_path / "image.png")
+    Image.new("RGB", (100, 50), "white").save(image_path)
+
+    # Check the image is decoded at full resolution
+    image = image_handler.open_for_display(image_path)
+    assert image.size == (100, 50)
+
+
+def test_get_fit_size():
+    assert ImageHandler.get_fit_size((1000, 500), (200, 200)) == (200, 100)
+    assert ImageHandler.get_fit_size((100, 50), (200, 200)) == (100, 50)
+
+
+def test_transpose(image_handler):
+    # Create a sample image
+    image = Image.new("RGB", (100, 50), "white")
+
+    # Check quarter turns swap the size and a full turn is a no-op
+    assert image_handler.transpose(image, 90).size == (50, 100)
+    assert image_handler.transpose(image, 180).size == (100, 50)
+    assert image_handler.transpose(image, 360) is image
+    with pytest.raises(ValueError):
+        image_handler.transpose(image, 45)
+
+
+def test_bake_rotation(image_handler, tmp_path):
+    # Create a sample JPEG image with a red left half
+    image_path = str(tmp_path / "image.jpg")
+    image = Image.new("RGB", (64, 32), "white")
+    image.paste((255, 0, 0), (0, 0, 32, 32))
+    image.save(image_path, quality=95)
+
+    image_handler.bake_rotation(image_path, 90)
+
+    # A counterclockwise quarter turn moves the left half to the bottom
+    with Image.open(image_path) as rotated_image:
+        assert rotated_image.format == "JPEG"
+        assert rotated_image.size == (32, 64)
+        red, green, _ = rotated_image.convert("RGB").getpixel((16, 48))
+        assert red > 200 and green < 50
+
+
+def test_to_array(image_handler):
+    # Create a sample grayscale image
+    image = Image.new("L", (30, 20), 128)
+
+    array = image_handler.to_array(image)
+
+    # Check the pixels are packed RGB rows that cannot be modified
+    assert array.shape == (20, 30, 3)
+    assert array.flags.c_contiguous
+    assert not array.flags.writeable
@@ -3,8 +3,10 @@ import os.path as op
 
 import pandas as pd
 import pytest
+from PIL import Image
 
 from nimocr.model import ImageListModel
+from nimocr.model.row_cache import RowCache
 
 
 @pytest.fixture
@@ -34,3 +36,502 @@ def test_load_file(image_list_model):
         # Clean up the temporary file
         if op.exists(temp_file):
             os.remove(temp_file)
+
+
+def test_get_image_is_cached(image_list_model, tmp_path):
+    image_path = str(tmp_path / "image1.png")
+    Image.new("RGB", (20, 10), "white").save(image_path)
+    image_list_model.df = pd.DataFrame({"path": [image_path], "text": ["Text1"]})
+
+    first_image = image_list_model.get_image(0)
+    second_image = image_list_model.get_image(0)
+
+    assert first_image is second_image
+    assert image_list_model._image_cache.hits == 1
+    assert image_list_model._image_cache.misses == 1
+
+    # Rotating the image must not serve the upright decoded copy
+    image_list_model.rotate_image(0)
+    rotated_image = image_list_model.get_image(0)
+    assert rotated_image.size == (10, 20)
+
+
+def test_corrupt_image_is_reported(image_list_model, tmp_path):
+    image_path = str(tmp_path / "image1.png")
+    with open(image_path, "wb") as f:
+        f.write(b"not an image")
+    image_list_model.df = pd.DataFrame({"path": [image_path], "text": ["Text1"]})
+
+    assert isinstance(image_list_model.get_display_image(0, (256, 256)), OSError)
+    assert isinstance(image_list_model.get_image(0), OSError)
+
+
+def test_rotate_image_is_virtual(image_list_model, tmp_path):
+    image_path = str(tmp_path / "image1.png")
+    Image.new("RGB", (20, 10), "white").save(image_path)
+    mtime = os.stat(image_path).st_mtime_ns
+    label_path = str(tmp_path / "labels.csv")
+    pd.DataFrame({"path": [image_path], "text": ["Text1"]}).to_csv(
+        label_path, index=False
+    )
+    image_list_model._thumbnail_cache = None
+    image_list_model.load_file(label_path)
+    image_list_model.cast_types()
+
+    image_list_model.rotate_image(0)
+    image_list_model.rotate_image(0)
+    image_list_model.rotate_image(0)
+
+    # The rotation is only recorded in the orientation column
+    assert image_list_model.get_orientation(0) == 270
+    assert os.stat(image_path).st_mtime_ns == mtime
+    assert image_list_model.get_image(0).size == (10, 20)
+    assert image_list_model.get_display_image(0, (256, 256)).shape == (20, 10, 3)
+
+    # Saving with bake_rotation writes the rotation into the file
+    image_list_model.save_file(label_path, bake_rotation=True)
+    assert image_list_model.get_orientation(0) == 0
+    assert Image.open(image_path).size == (10, 20)
+    assert "orientation" not in pd.read_csv(label_path).columns
+
+
+def test_delete_item_keeps_positions(image_list_model, tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    paths = [str(tmp_path / f"image{i}.png") for i in range(4)]
+    pd.DataFrame({"path": paths, "text": list("abcd")}).to_csv(label_path, index=False)
+    image_list_model.load_file(label_path)
+    image_list_model.cast_types()
+
+    image_list_model.delete_item(1)
+
+    assert image_list_model.length == 3
+    assert image_list_model.is_deleted(1)
+    assert image_list_model.paths == [paths[0], paths[2], paths[3]]
+    # The rows after the deleted one keep their positions
+    assert image_list_model.get_text(2) == "c"
+    image_list_model.change_text(3, "z")
+    assert image_list_model.get_text(3) == "z"
+
+    image_list_model.restore_item(1)
+    assert image_list_model.length == 4
+    assert image_list_model.get_text(1) == "b"
+
+
+def test_save_file_drops_deleted_rows(image_list_model, tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    output_path = str(tmp_path / "output.csv")
+    pd.DataFrame({"path": ["a.png", "b.png", "c.png"], "text": list("abc")}).to_csv(
+        label_path, index=False
+    )
+    image_list_model.load_file(label_path)
+    image_list_model.cast_types()
+
+    image_list_model.delete_item(0)
+    image_list_model.delete_item(2)
+    image_list_model.save_file(output_path)
+
+    saved_df = pd.read_csv(output_path)
+    assert saved_df["text"].tolist() == ["b"]
+    # The model keeps every row until it is reloaded
+    assert len(image_list_model.df) == 3
+
+
+def test_load_file_with_columns_keeps_other_columns(image_list_model, tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    output_path = str(tmp_path / "output.csv")
+    pd.DataFrame(
+        {
+            "id": ["01", "02", "03"],
+            "text": ["1", "b", "c"],
+            "path": ["a.png", "b.png", "c.png"],
+            "score": [0.5, 0.25, 1.0],
+        }
+    ).to_csv(label_path, index=False)
+    image_list_model.load_file(label_path, None, "path", "text")
+    image_list_model.cast_types()
+
+    # Only the working columns are read.
+    assert list(image_list_model.df.columns) == []
+    assert image_list_model.columns == ("id", "text", "path", "score", "orientation")
+
+    image_list_model.change_text(0, "edited")
+    image_list_model.delete_item(1)
+    image_list_model.save_file(output_path)
+
+    saved_df = pd.read_csv(output_path, dtype=str)
+    assert list(saved_df.columns) == ["id", "text", "path", "score"]
+    assert saved_df["id"].tolist() == ["01", "03"]
+    assert saved_df["text"].tolist() == ["edited", "c"]
+    assert saved_df["score"].tolist() == ["0.5", "1.0"]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_invalid_orientations_are_not_rotated(image_list_model, tmp_path, streaming):
+    label_path = str(tmp_path / "labels.csv")
+    pd.DataFrame(
+        {
+            "path": ["a.png", "b.png", "c.png", "d.png"],
+            "text": list("abcd"),
+            "orientation": ["90", "left", "", "450.0"],
+        }
+    ).to_csv(label_path, index=False)
+
+    image_list_model.load_file(label_path, None, "path", "text", streaming)
+    image_list_model.cast_types()
+
+    orientations = [image_list_model.get_orientation(index) for index in range(4)]
+    assert orientations == [90, 0, 0, 90]
+
+
+def test_cancelled_load_keeps_label_file(tmp_path):
+    first_path = str(tmp_path / "first.csv")
+    second_path = str(tmp_path / "second.csv")
+    output_path = str(tmp_path / "output.csv")
+    pd.DataFrame(
+        {"path": ["a.png", "b.png"], "text": ["a", "b"], "extra": ["1", "2"]}
+    ).to_csv(first_path, index=False)
+    pd.DataFrame(
+        {"path": ["c.png", "d.png"], "text": ["c", "d"], "extra": ["3", "4"]}
+    ).to_csv(second_path, index=False)
+    image_list_model = ImageListModel(_row_cache=None)
+    image_list_model.load_file(first_path, None, "path", "text")
+    image_list_model.cast_types()
+
+    def cancel(done, total):
+        raise InterruptedError
+
+    with pytest.raises(InterruptedError):
+        image_list_model.load_file(second_path, cancel, "path", "text")
+    image_list_model.change_text(0, "edited")
+    image_list_model.save_file(output_path)
+
+    saved_df = pd.read_csv(output_path, dtype=str)
+    assert saved_df["text"].tolist() == ["edited", "b"]
+    assert saved_df["extra"].tolist() == ["1", "2"]
+    image_list_model.close()
+
+
+def test_load_file_streaming(image_list_model, tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    output_path = str(tmp_path / "output.csv")
+    pd.DataFrame(
+        {
+            "id": ["01", "02", "03"],
+            "path": ["a.png", "sub/b.png", "c.png"],
+            "text": ["x", "", "z"],
+        }
+    ).to_csv(label_path, index=False)
+    image_list_model.load_file(label_path, None, "path", "text", streaming=True)
+    image_list_model.cast_types()
+    image_list_model.normalize_path()
+
+    assert image_list_model.is_streaming
+    assert image_list_model.length == 3
+    assert image_list_model.get_path(1) == op.join(str(tmp_path), "sub", "b.png")
+    assert image_list_model.get_text(1) == ""
+
+    image_list_model.change_text(2, "edited")
+    image_list_model.rotate_image(2)
+    image_list_model.delete_item(0)
+    image_list_model.save_file(output_path)
+
+    saved_df = pd.read_csv(output_path, dtype=str, keep_default_na=False)
+    assert saved_df.columns.tolist() == ["id", "path", "text", "orientation"]
+    assert saved_df.values.tolist() == [
+        ["02", "sub/b.png", "", "0"],
+        ["03", "c.png", "edited", "90"],
+    ]
+
+
+def test_load_file_uses_row_cache(tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    output_path = str(tmp_path / "output.csv")
+    pd.DataFrame(
+        {"id": [1, 2], "path": ["a.png", "sub/b.png"], "text": ["007", "b"]}
+    ).to_csv(label_path, index=False)
+    row_cache = RowCache(str(tmp_path / "rows"), min_bytes=0)
+    first_model = ImageListModel(_row_cache=row_cache)
+    first_model.load_file(label_path, None, "path", "text")
+    first_model.cast_types()
+    first_model.normalize_path()
+
+    image_list_model = ImageListModel(_row_cache=row_cache)
+    image_list_model.load_file(label_path, None, "path", "text")
+    image_list_model.cast_types()
+    image_list_model.normalize_path()
+
+    assert image_list_model._is_prepared
+    assert image_list_model.get_path(1) == op.join(str(tmp_path), "sub", "b.png")
+    assert image_list_model.get_text(0) == "007"
+    image_list_model.change_text(1, "edited")
+    image_list_model.save_file(output_path)
+    saved_df = pd.read_csv(output_path, dtype=str)
+    assert saved_df.values.tolist() == [
+        ["1", "a.png", "007"],
+        ["2", "sub/b.png", "edited"],
+    ]
+
+
+def test_validate_paths(image_list_model, tmp_path):
+    Image.new("RGB", (20, 10), "white").save(tmp_path / "image0.png")
+    label_path = str(tmp_path / "labels.csv")
+    pd.DataFrame({"path": ["image0.png", "image1.png"], "text": ["a", "b"]}).to_csv(
+        label_path, index=False
+    )
+    image_list_model.load_file(label_path)
+    image_list_model.cast_types()
+    image_list_model.normalize_path()
+
+    report = image_list_model.validate_paths()
+
+    assert report is image_list_model.validation_report
+    assert report.missing.tolist() == [1]
+
+
+def test_open_journal_recovers_edits(tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    pd.DataFrame({"path": ["a.png", "b.png", "c.png"], "text": list("abc")}).to_csv(
+        label_path, index=False
+    )
+
+    def open_model():
+        model = ImageListModel(_row_cache=None)
+        model.load_file(label_path, None, "path", "text")
+        model.cast_types()
+        model.normalize_path()
+        return model
+
+    first_model = open_model()
+    assert first_model.open_journal() == 0
+    first_model.change_text(0, "edited")
+    first_model.rotate_image(1)
+    first_model.delete_item(2)
+    # The model is dropped without saving or closing, as after a crash.
+    first_model.sync_journal()
+
+    image_list_model = open_model()
+    assert image_list_model.open_journal() == 3
+    assert image_list_model.get_text(0) == "edited"
+    assert image_list_model.get_orientation(1) == 90
+    assert image_list_model.is_deleted(2)
+    first_model.close()
+    image_list_model.close()
+
+
+def test_journal_after_saving_over_label_file(tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    pd.DataFrame({"path": ["a.png", "b.png", "c.png"], "text": list("abc")}).to_csv(
+        label_path, index=False
+    )
+
+    def open_model():
+        model = ImageListModel(_row_cache=None)
+        model.load_file(label_path, None, "path", "text")
+        model.cast_types()
+        model.normalize_path()
+        return model
+
+    first_model = open_model()
+    first_model.open_journal()
+    first_model.delete_item(0)
+    snapshot = first_model.snapshot()
+    # Edited while the snapshot is saved
+    first_model.change_text(1, "during")
+    snapshot.save(label_path)
+    first_model.rebase_label_file(snapshot, label_path)
+    first_model.change_text(2, "after")
+    first_model.close()
+
+    image_list_model = open_model()
+    assert image_list_model.open_journal() == 2
+    assert image_list_model.get_text(0) == "during"
+    assert image_list_model.get_text(1) == "after"
+    image_list_model.close()
+
+
+def test_save_twice_over_label_file(tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    other_path = str(tmp_path / "other.csv")
+    pd.DataFrame(
+        {"path": ["a.png", "b.png", "c.png"], "text": list("abc"), "score": [1, 2, 3]}
+    ).to_csv(label_path, index=False)
+    image_list_model = ImageListModel(_row_cache=None)
+    image_list_model.load_file(label_path, None, "path", "text")
+    image_list_model.cast_types()
+    image_list_model.normalize_path()
+
+    image_list_model.delete_item(0)
+    image_list_model.save_file(label_path)
+    image_list_model.change_text(2, "edited")
+    image_list_model.save_file(label_path)
+    image_list_model.save_file(other_path)
+
+    for path in (label_path, other_path):
+        df = pd.read_csv(path)
+        assert df["text"].tolist() == ["b", "edited"]
+        assert df["score"].tolist() == [2, 3]
+    image_list_model.close()
+    # The copy of the label file is removed once the model is closed.
+    assert sorted(os.listdir(tmp_path)) == ["labels.csv", "other.csv"]
+
+
+def test_export_changes(image_list_model, tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    output_path = str(tmp_path / "changes.csv")
+    pd.DataFrame(
+        {"path": ["a.png", "sub/b.png", "c.png", "d.png"], "text": list("abcd")}
+    ).to_csv(label_path, index=False)
+    image_list_model.load_file(label_path, None, "path", "text")
+    image_list_model.cast_types()
+    image_list_model.normalize_path()
+
+    image_list_model.change_text(1, "edited")
+    image_list_model.rotate_image(2)
+    image_list_model.delete_item(3)
+    image_list_model.change_text(0, "temporary")
+    image_list_model.change_text(0, "a")
+
+    assert image_list_model.get_edited_indices().tolist() == [1, 2]
+    assert image_list_model.export_changes(output_path) == 3
+    saved_df = pd.read_csv(output_path, dtype=str)
+    assert saved_df.values.tolist() == [
+        ["1", "sub/b.png", "b", "edited", "0", "0", "False"],
+        ["2", "c.png", "c", "c", "0", "90", "False"],
+        ["3", "d.png", "d", "d", "0", "0", "True"],
+    ]
+
+
+def test_export_changes_after_bake(image_list_model, tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    output_path = str(tmp_path / "changes.csv")
+    for name in ("a.png", "b.png"):
+        Image.new("RGB", (4, 2), "white").save(tmp_path / name)
+    pd.DataFrame({"path": ["a.png", "b.png"], "text": ["a", "b"]}).to_csv(
+        label_path, index=False
+    )
+    image_list_model.load_file(label_path, None, "path", "text")
+    image_list_model.cast_types()
+    image_list_model.normalize_path()
+
+    image_list_model.rotate_image(1)
+    image_list_model.bake_rotations()
+
+    assert image_list_model.get_orientation(1) == 0
+    assert image_list_model.get_edited_indices().tolist() == [1]
+    image_list_model.export_changes(output_path)
+    saved_df = pd.read_csv(output_path, dtype=str)
+    assert saved_df.values.tolist() == [["1", "b.png", "b", "b", "0", "90", "False"]]
+
+
+def test_undo_redo(image_list_model, tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    pd.DataFrame({"path": ["a.png", "b.png", "c.png"], "text": list("abc")}).to_csv(
+        label_path, index=False
+    )
+    image_list_model.load_file(label_path)
+    image_list_model.cast_types()
+
+    image_list_model.change_text(0, "edited")
+    image_list_model.rotate_image(1)
+    image_list_model.delete_item(2)
+
+    assert image_list_model.undo() == ("d", 2)
+    assert not image_list_model.is_deleted(2)
+    image_list_model.undo()
+    assert image_list_model.get_orientation(1) == 0
+    image_list_model.undo()
+    assert image_list_model.get_text(0) == "a"
+    assert image_list_model.undo() is None
+    assert len(image_list_model.changes) == 0
+
+    image_list_model.redo()
+    image_list_model.redo()
+    assert image_list_model.get_text(0) == "edited"
+    assert image_list_model.get_orientation(1) == 90
+    assert image_list_model.get_edited_indices().tolist() == [0, 1]
+
+
+def test_label_database(tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    database_path = str(tmp_path / "labels.sqlite")
+    export_path = str(tmp_path / "export.csv")
+    pd.DataFrame(
+        {"path": ["a.png", "b.png", "c.png"], "text": list("abc"), "score": [1, 2, 3]}
+    ).to_csv(label_path, index=False)
+
+    def open_model(path):
+        model = ImageListModel(_row_cache=None)
+        model.load_file(path, None, "path", "text")
+        model.cast_types()
+        model.normalize_path()
+        model.open_journal()
+        return model
+
+    first_model = open_model(label_path)
+    first_model.change_text(0, "imported")
+    first_model.save_file(database_path)
+    first_model.close()
+
+    database_model = open_model(database_path)
+    assert database_model.is_streaming
+    database_model.change_text(1, "edited")
+    database_model.rotate_image(1)
+    database_model.delete_item(2)
+    # The edits are committed as they are made, without saving.
+    image_list_model = open_model(database_path)
+    assert image_list_model.get_text(0) == "imported"
+    assert image_list_model.get_text(1) == "edited"
+    assert image_list_model.get_orientation(1) == 90
+    assert image_list_model.is_deleted(2)
+    with pytest.raises(ValueError):
+        image_list_model.save_file(database_path)
+
+    image_list_model.save_file(export_path)
+    df = pd.read_csv(export_path)
+    assert df["text"].tolist() == ["imported", "edited"]
+    assert df["score"].tolist() == [1, 2]
+    assert df["orientation"].tolist() == [0, 90]
+    database_model.close()
+
+
+def test_label_database_keeps_changes(tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    database_path = str(tmp_path / "labels.sqlite")
+    changes_path = str(tmp_path / "changes.csv")
+    paths = [str(tmp_path / f"image{i}.png") for i in range(3)]
+    for path in paths:
+        Image.new("RGB", (20, 10), "white").save(path)
+    pd.DataFrame({"path": paths, "text": list("abc")}).to_csv(label_path, index=False)
+
+    def open_model(path):
+        model = ImageListModel(_row_cache=None, _thumbnail_cache=None)
+        model.load_file(path, None, "path", "text")
+        model.cast_types()
+        model.normalize_path()
+        model.open_journal()
+        return model
+
+    first_model = open_model(label_path)
+    first_model.save_file(database_path)
+    first_model.close()
+
+    database_model = open_model(database_path)
+    database_model.change_text(0, "edited")
+    database_model.change_text(0, "edited again")
+    database_model.rotate_image(1)
+    database_model.bake_rotations()
+    database_model.delete_item(2)
+    database_model.close()
+
+    # Every change of the previous session is found again.
+    image_list_model = open_model(database_path)
+    assert image_list_model.get_edited_indices().tolist() == [0, 1]
+    assert image_list_model.export_changes(changes_path) == 3
+    df = pd.read_csv(changes_path)
+    assert df["original_text"].tolist() == ["a", "b", "c"]
+    assert df["text"].tolist() == ["edited again", "b", "c"]
+    assert df["original_orientation"].tolist() == [0, 0, 0]
+    assert df["orientation"].tolist() == [0, 90, 0]
+    assert df["deleted"].tolist() == [False, False, True]
+    image_list_model.close()
+    image_list_model.close()
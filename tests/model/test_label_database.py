@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from nimocr.model.edit_journal import DELETE, ORIENTATION, RESTORE, TEXT
+from nimocr.model.label_database import LabelDatabase
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    path = str(tmp_path / "labels.sqlite")
+    df = pd.DataFrame(
+        {
+            "path": ["a.png", "b.png", "c.png"],
+            "text": ["a", None, "c"],
+            "score": [1, 2, 3],
+        }
+    )
+    LabelDatabase.create(path, [df.iloc[:2], df.iloc[2:]])
+    return path
+
+
+def test_read_rows(database_path):
+    database = LabelDatabase.open(database_path)
+
+    assert LabelDatabase.is_database(database_path)
+    assert database.columns == ("path", "text", "score")
+    assert len(database) == 3
+    assert database.read_rows(1, 3) == [["b.png", "", "2"], ["c.png", "c", "3"]]
+    assert database.read_row(0) == ["a.png", "a", "1"]
+    with pytest.raises(IndexError):
+        database.read_rows(2, 4)
+    chunks = list(database.read_chunks(2, ["text"]))
+    assert [chunk["text"].tolist() for chunk in chunks] == [["a", ""], ["c"]]
+    database.close()
+
+
+def test_edits_are_committed(database_path):
+    database = LabelDatabase.open(database_path)
+    database.set_working_columns("text", "orientation")
+    database.append(TEXT, 0, "edited")
+    database.append(ORIENTATION, 1, 270)
+    database.append(DELETE, 2)
+    database.append(DELETE, 0)
+    database.append(RESTORE, 0)
+    # The database is dropped without closing, as after a crash.
+
+    reopened = LabelDatabase.open(database_path)
+    reopened.set_working_columns("text", "orientation")
+
+    assert reopened.columns == ("path", "text", "score", "orientation")
+    assert reopened.read_row(0) == ["a.png", "edited", "1", "0"]
+    np.testing.assert_array_equal(reopened.read_orientations(), [0, 270, 0])
+    np.testing.assert_array_equal(reopened.read_deleted(), [2])
+    changes = reopened.read_changes()
+    assert changes.get_changed().tolist() == [0, 1, 2]
+    assert changes.get_original_text(0, "edited") == "a"
+    assert changes.get_original_orientation(1, 270) == 0
+    database.close()
+    reopened.close()
+
+
+def test_snapshot_ignores_later_edits(database_path):
+    database = LabelDatabase.open(database_path)
+    database.set_working_columns("text", "orientation")
+    snapshot = database.snapshot()
+    database.append(TEXT, 0, "later")
+
+    assert snapshot.read_row(0)[1] == "a"
+    assert database.read_row(0)[1] == "later"
+    snapshot.close()
+    database.close()
@@ -0,0 +1,102 @@
+import gzip
+
+import pandas as pd
+import pytest
+
+from nimocr.model.label_format import (
+    FORMATS,
+    LabelFormat,
+    get_format,
+    open_label_file,
+    sniff_format,
+    split_compression,
+)
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame(
+        {
+            "id": [1, 2, 3],
+            "path": ["a/1.png", "b/2.png", "3.png"],
+            "text": ["héllo", None, "7"],
+        }
+    )
+
+
+def test_get_format():
+    assert get_format("tsv").delimiter == "\t"
+    assert get_format("ndjson") is FORMATS["jsonl"]
+    with pytest.raises(ValueError):
+        get_format("txt")
+
+
+def test_incomplete_format():
+    class HeaderOnlyFormat(LabelFormat):
+        name = "header"
+        extensions = ("header",)
+
+        def read_header(self, source, nrows):
+            return pd.DataFrame()
+
+    with pytest.raises(TypeError):
+        HeaderOnlyFormat()
+
+
+def test_split_compression():
+    assert split_compression("/data/labels.tsv.gz") == ("/data/labels.tsv", "gzip")
+    assert split_compression("labels.jsonl.zst") == ("labels.jsonl", "zstd")
+    assert split_compression("labels.csv") == ("labels.csv", None)
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "bz2", "xz"])
+@pytest.mark.parametrize("name", ["csv", "tsv", "jsonl"])
+def test_write_and_read_chunks(tmp_path, df, name, compression):
+    path = str(tmp_path / f"labels.{name}")
+    label_format = FORMATS[name]
+    with open_label_file(path, "wb", compression) as (_, stream):
+        label_format.write([df.iloc[:2], df.iloc[2:]], stream)
+
+    with open_label_file(path) as (_, stream):
+        chunks = list(label_format.read_chunks(stream, 2, dtype={"text": str}))
+
+    loaded_df = pd.concat(chunks, ignore_index=True)
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert loaded_df["id"].tolist() == [1, 2, 3]
+    assert loaded_df["path"].tolist() == ["a/1.png", "b/2.png", "3.png"]
+    assert loaded_df["text"].fillna("").tolist() == ["héllo", "", "7"]
+
+
+def test_jsonl_keeps_types(tmp_path):
+    path = tmp_path / "labels.jsonl"
+    path.write_text('{"path": "a.png", "id": "001", "score": 1}\n\n{"path": "b.png"}\n')
+
+    with open_label_file(str(path)) as (_, stream):
+        chunk = next(FORMATS["jsonl"].read_chunks(stream, 10, raw=True))
+
+    assert chunk.columns.tolist() == ["path", "id", "score"]
+    assert chunk["id"].tolist()[0] == "001"
+    assert chunk["score"].tolist()[0] == 1
+
+
+def test_sniff_format(tmp_path):
+    tsv_path = tmp_path / "labels.txt"
+    tsv_path.write_text("path\ttext\na.png\ta\n")
+    jsonl_path = tmp_path / "labels.json.gz"
+    with gzip.open(jsonl_path, "wt") as f:
+        f.write('{"path": "a.png"}\n')
+
+    assert sniff_format(str(tsv_path)) is FORMATS["tsv"]
+    assert sniff_format(str(jsonl_path)) is FORMATS["jsonl"]
+
+
+def test_parquet_round_trip(tmp_path, df):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "labels.parquet")
+    with open_label_file(path, "wb") as (_, stream):
+        FORMATS["parquet"].write([df], stream)
+
+    with open_label_file(path) as (_, stream):
+        loaded_df = FORMATS["parquet"].read(stream, usecols=["path", "text"])
+
+    pd.testing.assert_frame_equal(df[["path", "text"]], loaded_df)
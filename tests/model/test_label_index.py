@@ -0,0 +1,91 @@
+import pytest
+
+from nimocr.model.label_index import LabelIndex, LazyColumn
+
+
+@pytest.fixture
+def label_path(tmp_path):
+    path = tmp_path / "labels.csv"
+    path.write_bytes(
+        b'path,text\r\na.png,first\r\n\r\nb.png,"two\nlines, quoted"\n'
+        b'c.png,"say ""hi"""\n\nd.png,last'
+    )
+    return str(path)
+
+
+def test_build(label_path):
+    label_index = LabelIndex.build(label_path, ",", ("path", "text"))
+
+    assert len(label_index) == 4
+    assert label_index.read_rows(0, 4) == [
+        ["a.png", "first"],
+        ["b.png", "two\nlines, quoted"],
+        ["c.png", 'say "hi"'],
+        ["d.png", "last"],
+    ]
+    assert label_index.read_row(2) == ["c.png", 'say "hi"']
+    with pytest.raises(IndexError):
+        label_index.read_rows(3, 5)
+
+
+def test_build_small_blocks(label_path, monkeypatch):
+    # Quoted newlines must be found across block boundaries.
+    monkeypatch.setattr(LabelIndex, "BLOCK_SIZE", 3)
+    reports = []
+
+    label_index = LabelIndex.build(
+        label_path, ",", ("path", "text"), lambda done, total: reports.append(done)
+    )
+
+    rows = label_index.read_rows(0, 4)
+    assert [row[0] for row in rows] == ["a.png", "b.png", "c.png", "d.png"]
+    assert reports == sorted(reports)
+
+
+@pytest.mark.parametrize(
+    "filename, delimiter, quotechar",
+    [("labels.csv", ",", '"'), ("labels.tsv", "\t", "")],
+)
+def test_build_quote_inside_field(tmp_path, filename, delimiter, quotechar):
+    # A quote in the middle of a field does not quote the newlines after it.
+    path = tmp_path / filename
+    lines = ["path text", "a.png first", 'b.png 5" screen', "c.png last"]
+    path.write_text("\n".join(line.replace(" ", delimiter, 1) for line in lines))
+
+    label_index = LabelIndex.build(
+        str(path), delimiter, ("path", "text"), quotechar=quotechar
+    )
+
+    assert len(label_index) == 3
+    assert label_index.read_row(1) == ["b.png", '5" screen']
+    assert label_index.read_row(2) == ["c.png", "last"]
+
+
+def test_build_header_only(tmp_path):
+    path = tmp_path / "labels.tsv"
+    path.write_bytes(b"path\ttext\n")
+
+    label_index = LabelIndex.build(str(path), "\t", ("path", "text"))
+
+    assert len(label_index) == 0
+    assert label_index.read_rows(0, 0) == []
+
+
+def test_lazy_column(label_path):
+    label_index = LabelIndex.build(label_path, ",", ("path", "text"))
+    paths = LazyColumn(label_index, 0, convert=str.upper)
+    texts = LazyColumn(label_index, 1)
+
+    texts.set(0, "edited")
+
+    assert paths.get(3) == "D.PNG"
+    assert texts.get(0) == "edited"
+    assert texts.get(1) == "two\nlines, quoted"
+    assert texts.to_numpy().tolist() == [
+        "edited",
+        "two\nlines, quoted",
+        'say "hi"',
+        "last",
+    ]
+    with pytest.raises(IndexError):
+        texts.set(4, "out of range")
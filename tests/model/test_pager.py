@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from nimocr.model import Pager
+
+
+@pytest.fixture
+def pager():
+    return Pager.from_total(3, 10)
+
+
+def test_pages(pager):
+    assert pager.total_items == 10
+    assert pager.total_pages == 4
+    assert pager.get_page_indices(1) == [0, 1, 2]
+    assert pager.get_page_indices(4) == [9]
+    assert pager.get_page_indices(0) == []
+    assert pager.get_page_indices(5) == []
+
+
+def test_page_of_index(pager):
+    assert pager.get_page(0) == 1
+    assert pager.get_page(5) == 2
+    assert pager.get_page(9) == 4
+    assert pager.get_position(7) == 7
+    assert pager.get_index(7) == 7
+
+
+def test_remove_and_restore(pager):
+    assert pager.remove(4) == 4
+    assert not pager.contains(4)
+    assert pager.total_items == 9
+    assert pager.total_pages == 3
+    assert pager.get_page_indices(2) == [3, 5, 6]
+    assert pager.get_position(5) == 4
+    assert pager.get_index(4) == 5
+    with pytest.raises(ValueError):
+        pager.get_position(4)
+    with pytest.raises(ValueError):
+        pager.remove(4)
+
+    assert pager.restore(4) == 4
+    assert pager.get_page_indices(2) == [3, 4, 5]
+    assert pager.total_items == 10
+
+
+def test_remove_every_row(pager):
+    for index in range(10):
+        pager.remove(index)
+    assert pager.total_items == 0
+    assert pager.total_pages == 0
+    with pytest.raises(IndexError):
+        pager.get_index(0)
+
+
+def test_custom_order():
+    # A filtered and sorted view of the rows.
+    pager = Pager(2, [8, 3, 5, 1])
+    assert pager.get_page_indices(1) == [8, 3]
+    assert pager.get_page_indices(2) == [5, 1]
+    assert pager.get_page(1) == 2
+    assert not pager.contains(0)
+    assert not pager.contains(100)
+    pager.remove(3)
+    assert pager.get_page_indices(1) == [8, 5]
+
+
+def test_matches_list_after_random_removals():
+    rng = np.random.default_rng(0)
+    order = rng.permutation(1000)
+    pager = Pager(7, order)
+    expected = order.tolist()
+    for index in rng.choice(order, size=400, replace=False):
+        assert pager.remove(int(index)) == expected.index(index)
+        expected.remove(index)
+
+    assert pager.total_items == len(expected)
+    for page in range(1, pager.total_pages + 1):
+        start = (page - 1) * 7
+        assert pager.get_page_indices(page) == expected[start : start + 7]
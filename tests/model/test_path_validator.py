@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+from nimocr.model import PathValidator
+from nimocr.model.row_store import PathColumn
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    for name in ["a.png", "b.png"]:
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "c.png").write_bytes(b"")
+    return tmp_path
+
+
+def test_validate(image_dir):
+    paths = [
+        str(image_dir / "a.png"),
+        str(image_dir / "missing.png"),
+        str(image_dir / "sub" / "c.png"),
+        str(image_dir / "sub"),
+        str(image_dir / "gone" / "d.png"),
+        str(image_dir / "b.png"),
+    ]
+    reports = []
+    report = PathValidator().validate(
+        PathColumn.from_strings(paths), lambda done, total: reports.append(total)
+    )
+
+    assert report.missing.tolist() == [1, 4]
+    # A directory is not an image file
+    assert report.unreadable.tolist() == [3]
+    assert report.invalid.tolist() == [1, 3, 4]
+    assert report.total == 6
+    assert not report.is_valid
+    assert reports == [3, 3, 3]
+
+
+def test_validate_unreadable_file(image_dir, monkeypatch):
+    access = os.access
+    # The permissions of the tests may be bypassed, as for root.
+    monkeypatch.setattr(
+        os,
+        "access",
+        lambda path, mode: not path.endswith("b.png") and access(path, mode),
+    )
+    paths = [str(image_dir / "a.png"), str(image_dir / "b.png")]
+
+    report = PathValidator().validate(PathColumn.from_strings(paths))
+
+    assert report.missing.tolist() == []
+    assert report.unreadable.tolist() == [1]
+
+
+def test_listing_is_cached(image_dir):
+    validator = PathValidator()
+    paths = PathColumn.from_strings([str(image_dir / "a.png")])
+    assert validator.validate(paths).is_valid
+
+    listing = validator.list_directory(str(image_dir))
+    assert validator.list_directory(str(image_dir)) is listing
+
+    # A new file changes the directory and invalidates the listing
+    os.remove(image_dir / "a.png")
+    assert validator.validate(paths).missing.tolist() == [0]
+
+
+def test_validate_aborted(image_dir):
+    paths = PathColumn.from_strings([str(image_dir / "a.png")])
+
+    def abort(done, total):
+        raise InterruptedError
+
+    with pytest.raises(InterruptedError):
+        PathValidator().validate(paths, abort)
+
+
+def test_validate_empty():
+    report = PathValidator().validate(PathColumn.from_strings([]))
+    assert report.is_valid
+    assert np.array_equal(report.invalid, [])
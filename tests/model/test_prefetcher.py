@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from nimocr.model.prefetcher import ImagePrefetcher
+
+
+@pytest.fixture
+def blocking_loader():
+    release = threading.Event()
+    loaded = []
+
+    def loader(path):
+        release.wait(timeout=5)
+        loaded.append(path)
+        return path
+
+    return loader, release, loaded
+
+
+def wait_for(loaded, count):
+    for _ in range(500):
+        if len(loaded) >= count:
+            return
+        time.sleep(0.01)
+
+
+def test_schedule_loads_all_paths(blocking_loader):
+    loader, release, loaded = blocking_loader
+    release.set()
+    prefetcher = ImagePrefetcher(loader, max_workers=1)
+
+    prefetcher.schedule([("a.jpg",), ("b.jpg",)])
+    wait_for(loaded, 2)
+    prefetcher.shutdown()
+
+    assert loaded == ["a.jpg", "b.jpg"]
+
+
+def test_finished_jobs_are_discarded(monkeypatch):
+    prefetcher = ImagePrefetcher(lambda path: path)
+    executor = prefetcher._get_executor()
+
+    def submit(loader, *args):
+        # The job is done before its callback is added.
+        future = Future()
+        future.set_result(loader(*args))
+        return future
+
+    monkeypatch.setattr(executor, "submit", submit)
+    prefetcher.schedule([("a.jpg",), ("b.jpg",)])
+    prefetcher.shutdown()
+
+    assert prefetcher._futures == {}
+
+
+def test_wait_cancels_queued_job(blocking_loader):
+    loader, release, loaded = blocking_loader
+    started = threading.Event()
+
+    def starting_loader(path):
+        started.set()
+        return loader(path)
+
+    prefetcher = ImagePrefetcher(starting_loader, max_workers=1)
+
+    # The first job blocks the only worker, so the second one stays queued.
+    prefetcher.schedule([("a.jpg",), ("b.jpg",)])
+    started.wait(timeout=5)
+    assert prefetcher.wait("b.jpg") is False
+    release.set()
+    assert prefetcher.wait("a.jpg") is True
+    prefetcher.shutdown()
+
+    assert loaded == ["a.jpg"]
+
+
+def test_schedule_cancels_outdated_requests(blocking_loader):
+    loader, release, loaded = blocking_loader
+    prefetcher = ImagePrefetcher(loader, max_workers=1)
+
+    # The first job blocks the only worker, so the rest stay queued.
+    prefetcher.schedule([("a.jpg",), ("b.jpg",), ("c.jpg",)])
+    prefetcher.schedule([("a.jpg",), ("d.jpg",)])
+    release.set()
+    wait_for(loaded, 2)
+    prefetcher.shutdown()
+
+    assert loaded == ["a.jpg", "d.jpg"]
+
+
+def test_wait_without_job_returns_false(blocking_loader):
+    loader, _, _ = blocking_loader
+    prefetcher = ImagePrefetcher(loader)
+
+    assert prefetcher.wait("a.jpg") is False
@@ -0,0 +1,101 @@
+import os
+
+import numpy as np
+import pytest
+
+from nimocr.model.row_cache import RowCache
+from nimocr.model.row_store import PathColumn, RowStore, StringColumn
+
+COLUMNS = ("path", "text", "orientation")
+
+
+@pytest.fixture
+def row_cache(tmp_path):
+    return RowCache(str(tmp_path / "rows"), min_bytes=0)
+
+
+@pytest.fixture
+def label_path(tmp_path):
+    path = tmp_path / "labels.csv"
+    path.write_text("path,text\n/data/a.png,a\n/data/sub/b.png,b\n")
+    return str(path)
+
+
+@pytest.fixture
+def rows():
+    return RowStore(
+        PathColumn.from_strings(["/data/a.png", "/data/sub/b.png"]),
+        StringColumn.from_strings(["a", "ü"]),
+        np.array([0, 90], dtype=np.int16),
+    )
+
+
+def test_put_and_get(row_cache, label_path, rows):
+    row_cache.put(label_path, os.stat(label_path), COLUMNS, rows)
+
+    cached = row_cache.get(label_path, COLUMNS)
+
+    assert cached.paths.to_numpy().tolist() == ["/data/a.png", "/data/sub/b.png"]
+    assert cached.paths.get(1) == "/data/sub/b.png"
+    assert cached.texts.get(1) == "ü"
+    # The cached rows can be edited without touching the cache.
+    cached.texts.set(0, "edited")
+    cached.orientations[0] = 180
+    assert row_cache.get(label_path, COLUMNS).texts.to_numpy().tolist() == ["a", "ü"]
+    assert row_cache.get(label_path, COLUMNS).orientations.tolist() == [0, 90]
+    assert row_cache.get(label_path, ("path", "label", "orientation")) is None
+
+
+def test_changed_source_is_not_served(row_cache, label_path, rows):
+    row_cache.put(label_path, os.stat(label_path), COLUMNS, rows)
+    with open(label_path, "a") as f:
+        f.write("/data/c.png,c\n")
+
+    assert row_cache.get(label_path, COLUMNS) is None
+
+    # Caching the new version removes the old one.
+    row_cache.put(label_path, os.stat(label_path), COLUMNS, rows)
+    source_directory = row_cache.get_source_directory(label_path)
+    key = row_cache.make_key(label_path, os.stat(label_path), COLUMNS)
+    assert sorted(os.listdir(source_directory)) == sorted([key, RowCache.SOURCE_FILE])
+
+
+def test_small_files_are_not_cached(tmp_path, label_path, rows):
+    row_cache = RowCache(str(tmp_path / "rows"))
+
+    row_cache.put(label_path, os.stat(label_path), COLUMNS, rows)
+
+    assert row_cache.get(label_path, COLUMNS) is None
+
+
+def test_evict_least_recently_used(tmp_path, rows):
+    label_paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.csv"
+        path.write_text(f"path,text\n/data/{name}.png,{name}\n")
+        label_paths.append(str(path))
+    row_cache = RowCache(str(tmp_path / "rows"), min_bytes=0)
+    for path in label_paths[:2]:
+        row_cache.put(path, os.stat(path), COLUMNS, rows)
+    # The cache holds two entries, and the second one is the least recently used.
+    row_cache.max_bytes = sum(size for _, _, size in row_cache._scan())
+    second_entry = os.path.join(
+        row_cache.get_source_directory(label_paths[1]),
+        row_cache.make_key(label_paths[1], os.stat(label_paths[1]), COLUMNS),
+    )
+    os.utime(second_entry, (1, 1))
+    row_cache.put(label_paths[2], os.stat(label_paths[2]), COLUMNS, rows)
+
+    assert row_cache.get(label_paths[0], COLUMNS) is not None
+    assert row_cache.get(label_paths[1], COLUMNS) is None
+    assert row_cache.get(label_paths[2], COLUMNS) is not None
+
+
+def test_evict_removed_source(row_cache, label_path, rows):
+    row_cache.put(label_path, os.stat(label_path), COLUMNS, rows)
+    source_directory = row_cache.get_source_directory(label_path)
+    os.remove(label_path)
+
+    row_cache.evict()
+
+    assert not os.path.exists(source_directory)
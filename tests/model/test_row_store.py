@@ -0,0 +1,90 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nimocr.model.row_store import PathColumn, RowStore, StringColumn
+
+
+def test_string_column():
+    strings = ["abc", "", "ภาษาไทย", "x y"]
+    column = StringColumn.from_strings(strings)
+
+    assert len(column) == 4
+    assert [column.get(i) for i in range(4)] == strings
+    assert column.to_numpy().tolist() == strings
+
+
+def test_string_column_overlay():
+    column = StringColumn.from_strings(["a", "b", "c"])
+    column.set(1, "edited")
+
+    assert column.get(1) == "edited"
+    assert column.to_numpy().tolist() == ["a", "edited", "c"]
+    with pytest.raises(IndexError):
+        column.set(3, "d")
+
+
+def test_string_column_with_terminator():
+    strings = ["a\0b", "c"]
+    column = StringColumn.from_strings(strings)
+
+    assert [column.get(i) for i in range(2)] == strings
+    assert column.to_numpy().tolist() == strings
+
+
+def test_string_column_empty():
+    column = StringColumn.from_strings([])
+
+    assert len(column) == 0
+    assert column.to_numpy().tolist() == []
+
+
+def test_path_column():
+    paths = [
+        os.path.join("data", "a", "1.png"),
+        os.path.join("data", "b", "2.png"),
+        os.path.join("data", "a", "3.png"),
+        "4.png",
+    ]
+    column = PathColumn.from_strings(paths)
+
+    assert len(column.directories) == 3
+    assert column.directory_ids[0] == column.directory_ids[2]
+    assert [column.get(i) for i in range(4)] == paths
+    assert column.to_numpy().tolist() == paths
+
+    moved = column.map_directories(lambda directory: "root" + os.sep + directory)
+    assert moved.get(3) == "root" + os.sep + "4.png"
+    merged = column.map_directories(lambda directory: "")
+    assert merged.directories == [""]
+    assert merged.to_numpy().tolist() == ["1.png", "2.png", "3.png", "4.png"]
+
+
+def test_row_store_from_frame():
+    df = pd.DataFrame(
+        {"path": ["a.png", "b.png"], "text": ["x", "y"], "orientation": [0, 90]}
+    )
+    store = RowStore.from_frame(df, "path", "text", "orientation")
+
+    assert len(store) == 2
+    assert store.paths.get(1) == "b.png"
+    assert store.texts.get(0) == "x"
+    assert store.orientations.tolist() == [0, 90]
+
+    # The store does not share memory with the dataframe
+    store.orientations[0] = 180
+    assert df["orientation"].tolist() == [0, 90]
+
+    store = RowStore.from_frame(df.drop(columns="orientation"), "path", "text")
+    assert np.all(store.orientations == 0)
+
+
+def test_parse_orientations():
+    values = pd.Series(["90", "left", "", None, "450.0", "-90", "inf"], dtype=object)
+
+    orientations = RowStore.parse_orientations(values)
+
+    assert orientations.tolist() == [90, 0, 0, 0, 90, 270, 0]
+    assert orientations.dtype == np.int16
@@ -0,0 +1,71 @@
+import os
+
+import pandas as pd
+import pytest
+
+from nimocr.model import ImageListModel
+
+
+@pytest.fixture
+def image_list_model(tmp_path):
+    label_path = str(tmp_path / "labels.csv")
+    pd.DataFrame(
+        {
+            "id": ["01", "02", "03"],
+            "path": ["a.png", "b.png", "c.png"],
+            "text": ["x", "y", "z"],
+        }
+    ).to_csv(label_path, index=False)
+    image_list_model = ImageListModel(_row_cache=None)
+    image_list_model.load_file(label_path, None, "path", "text")
+    image_list_model.cast_types()
+    image_list_model.normalize_path()
+    return image_list_model
+
+
+def test_snapshot_ignores_later_edits(image_list_model, tmp_path):
+    output_path = str(tmp_path / "output.csv")
+    image_list_model.change_text(0, "before")
+    snapshot = image_list_model.snapshot()
+
+    image_list_model.change_text(0, "after")
+    image_list_model.change_text(1, "after")
+    image_list_model.rotate_image(1)
+    image_list_model.delete_item(2)
+    snapshot.save(output_path)
+
+    saved_df = pd.read_csv(output_path, dtype=str)
+    assert saved_df.values.tolist() == [
+        ["01", "a.png", "before"],
+        ["02", "b.png", "y"],
+        ["03", "c.png", "z"],
+    ]
+    assert image_list_model.get_text(0) == "after"
+
+
+def test_snapshot_save_reports_progress(image_list_model, tmp_path):
+    output_path = str(tmp_path / "output.csv")
+    progress = []
+
+    image_list_model.snapshot().save(
+        output_path, lambda done, total: progress.append((done, total))
+    )
+
+    assert progress[-1] == (3, 3)
+
+
+def test_snapshot_save_aborted(image_list_model, tmp_path):
+    output_path = str(tmp_path / "output.csv")
+    with open(output_path, "w") as f:
+        f.write("previous")
+
+    def cancel(done, total):
+        raise InterruptedError
+
+    with pytest.raises(InterruptedError):
+        image_list_model.snapshot().save(output_path, cancel)
+
+    # The previous file is left untouched and no temporary file is left.
+    with open(output_path) as f:
+        assert f.read() == "previous"
+    assert sorted(os.listdir(tmp_path)) == ["labels.csv", "output.csv"]
@@ -0,0 +1,90 @@
+import os
+import os.path as op
+
+import pandas as pd
+import pytest
+from PIL import Image
+
+from nimocr.model.thumbnail_cache import ThumbnailCache, warm
+
+
+@pytest.fixture
+def thumbnail_cache(tmp_path):
+    return ThumbnailCache(str(tmp_path / "thumbnails"), image_format="PNG")
+
+
+@pytest.fixture
+def image_path(tmp_path):
+    path = str(tmp_path / "image.png")
+    Image.new("RGB", (1200, 600), "white").save(path)
+    return path
+
+
+def test_get_thumbnail_size():
+    assert ThumbnailCache.get_thumbnail_size((200, 100)) == 256
+    assert ThumbnailCache.get_thumbnail_size((300, 700)) == 1024
+    assert ThumbnailCache.get_thumbnail_size((4000, 100)) is None
+
+
+def test_load_creates_and_reuses_thumbnail(thumbnail_cache, image_path):
+    thumbnail = thumbnail_cache.load(image_path, (200, 200))
+    assert thumbnail.size == (256, 128)
+
+    # The second load is served from the thumbnail file
+    stat = os.stat(image_path)
+    assert thumbnail_cache.get(image_path, stat, 256) is not None
+    assert thumbnail_cache.load(image_path, (200, 200)).size == (256, 128)
+
+
+def test_load_without_create(thumbnail_cache, image_path):
+    assert thumbnail_cache.load(image_path, (200, 200), create=False) is None
+    assert thumbnail_cache.get_total_bytes() == 0
+
+    thumbnail_cache.load(image_path, (200, 200))
+    thumbnail = thumbnail_cache.load(image_path, (200, 200), create=False)
+    assert thumbnail.size == (256, 128)
+    assert thumbnail_cache.get_total_bytes() > 0
+
+
+def test_changed_source_is_not_served(thumbnail_cache, image_path):
+    thumbnail_cache.load(image_path, (200, 200))
+
+    # Overwrite the source image with a new modification time
+    Image.new("RGB", (600, 1200), "white").save(image_path)
+    os.utime(image_path, ns=(0, 0))
+
+    thumbnail = thumbnail_cache.load(image_path, (200, 200))
+    assert thumbnail.size == (128, 256)
+
+
+def test_evict_least_recently_used(thumbnail_cache, tmp_path):
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f"image{i}.png")
+        Image.effect_noise((256, 256), 100).save(path)
+        paths.append(path)
+
+    thumbnail_cache.load(paths[0], (256, 256))
+    file_size = thumbnail_cache.get_total_bytes()
+    # Only two thumbnails fit in the cache
+    thumbnail_cache.max_bytes = int(file_size * 2.5)
+    thumbnail_cache.load(paths[1], (256, 256))
+    thumbnail_cache.load(paths[2], (256, 256))
+    thumbnail_cache.evict()
+
+    stat = os.stat(paths[2])
+    assert thumbnail_cache.get(paths[2], stat, 256) is not None
+    assert thumbnail_cache.get_total_bytes() <= thumbnail_cache.max_bytes
+
+
+def test_warm(tmp_path, image_path):
+    label_path = str(tmp_path / "labels.csv")
+    pd.DataFrame({"path": [op.basename(image_path)], "text": ["a"]}).to_csv(
+        label_path, index=False
+    )
+    cache_dir = str(tmp_path / "thumbnails")
+
+    cached = warm(label_path, sizes=(256, 512), directory=cache_dir)
+
+    assert cached == 2
+    assert warm(label_path, sizes=(256, 512), directory=cache_dir) == 2
@@ -0,0 +1,47 @@
+import logging
+import os.path as op
+
+import pytest
+
+from nimocr.logger import DeferredQueueHandler, setup_logging
+
+
+@pytest.fixture
+def root_logger():
+    root_logger = logging.getLogger()
+    handlers, level = root_logger.handlers[:], root_logger.level
+    yield root_logger
+    # Restore the handlers of pytest
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    for handler in handlers:
+        root_logger.addHandler(handler)
+    root_logger.setLevel(level)
+
+
+def test_setup_logging_writes_in_background(root_logger, tmp_path):
+    log_path = str(tmp_path / "user.log")
+
+    listener = setup_logging(log_path, level=logging.INFO)
+    logging.getLogger("nimocr").info("Page %d of %d", 2, 10)
+    logging.getLogger("nimocr").debug("Table: %s", "not written")
+    listener.stop()
+
+    assert isinstance(root_logger.handlers[0], DeferredQueueHandler)
+    with open(log_path, encoding="utf-8") as f:
+        content = f.read()
+    assert "Page 2 of 10" in content
+    assert "not written" not in content
+
+
+def test_setup_logging_rotates_previous_session(root_logger, tmp_path):
+    log_path = str(tmp_path / "user.log")
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.write("previous session\n")
+
+    listener = setup_logging(log_path)
+    listener.stop()
+
+    assert op.getsize(log_path) == 0
+    with open(f"{log_path}.1", encoding="utf-8") as f:
+        assert f.read() == "previous session\n"